@@ -0,0 +1,303 @@
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import logging
+from collections import deque
+from typing import Callable, Optional
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+# Exit status of a worker whose lifespan startup failed, the same as uvicorn.run.
+STARTUP_FAILURE = 3
+
+def preload_assets():
+    """
+    Load the read only NLP data of Wordkit and the similarity engine: the spaCy model, the POS table and WordNet.
+    Then warm the word info of the most frequent words once, workers inherit it and skip their own warmup.
+    """
+    import nltk
+    from nltk.corpus import wordnet
+    from word.spacyWord import get_similarity_engine
+    from word.pos_table import get_pos_table
+    from word.lexicon import get_lexicon
+    from word.wordkit import warm_word_info, word_info_memo
+
+    nltk.data.path.append(os.getenv("NLTK_DATA", "./nltk_data"))
+    get_similarity_engine()
+    get_pos_table()
+    if get_lexicon() is None:
+        # Without the snapshot workers read the corpus, load the lazy corpus here so they inherit it.
+        wordnet.synsets('word')
+
+    warm_word_info(int(os.getenv('WORD_INFO_WARMUP', 5000)))
+    if word_info_memo.store is not None:
+        # Workers open their own SQLite connections, one must not be shared across the fork.
+        word_info_memo.store.close()
+
+def read_memory(pid: int) -> dict:
+    """
+    Memory of a process in MB from /proc/<pid>/smaps_rollup. uss is the memory only this process uses,
+    shared counts pages also mapped by other processes and pss splits them between those processes.
+    """
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as file:
+        for line in file:
+            name, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                fields[name] = int(value.split()[0])
+
+    def mb(*names: str) -> float:
+        return round(sum(fields.get(name, 0) for name in names) / 1024, 1)
+
+    return {
+        'pid': pid,
+        'rss': mb('Rss'),
+        'pss': mb('Pss'),
+        'uss': mb('Private_Clean', 'Private_Dirty'),
+        'shared': mb('Shared_Clean', 'Shared_Dirty'),
+    }
+
+def format_memory_report(report: list[dict]) -> str:
+    lines = [f"{'pid':>8}{'rss MB':>10}{'pss MB':>10}{'uss MB':>10}{'shared MB':>12}"]
+    for usage in report:
+        lines.append(f"{usage['pid']:>8}{usage['rss']:>10}{usage['pss']:>10}{usage['uss']:>10}{usage['shared']:>12}")
+    return '\n'.join(lines)
+
+class PreforkServer:
+    """
+    Runs the app in forked uvicorn workers that share one listening socket.
+
+    The master loads the read only assets before forking, so workers inherit their pages copy on write instead of
+    loading their own copy. Objects are frozen out of the garbage collector first, collections in the workers then
+    don't write to the inherited pages. SIGUSR1 logs the memory of every worker, SIGINT and SIGTERM shut the workers
+    down gracefully.
+
+    Workers that exit are restarted after a delay that doubles with every exit of the last restart_window seconds.
+    After max_restarts exits in the window, or when a worker fails its lifespan startup, the master stops every worker
+    and exits non-zero, like the server does in a single process.
+
+    Nothing may open connections or start threads before the fork, clients are created per worker in the lifespan.
+    """
+    def __init__(self, app, host: str = '0.0.0.0', port: int = 8000, workers: int = 2,
+                 preload: Optional[Callable[[], None]] = preload_assets, restart_window: float = 60.0,
+                 max_restarts: int = 10, backoff: float = 0.5, max_backoff: float = 30.0, **uvicorn_options):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.preload = preload
+        self.restart_window = restart_window
+        self.max_restarts = max_restarts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.uvicorn_options = uvicorn_options
+        self.socket: Optional[socket.socket] = None
+        self.pids: set[int] = set()
+        self._exits: deque[float] = deque()
+        self._restarts: list[float] = []
+        self._stopping = False
+        self._report_requested = False
+
+    def bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET6 if ':' in self.host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self.port = sock.getsockname()[1]
+        self.socket = sock
+        return sock
+
+    def _serve_worker(self):
+        # The master's handlers must not run in the worker, uvicorn installs its own.
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGUSR1):
+            signal.signal(signum, signal.SIG_DFL)
+
+        config = uvicorn.Config(self.app, host=self.host, port=self.port, **self.uvicorn_options)
+        server = uvicorn.Server(config)
+        server.run(sockets=[self.socket])
+        return 0 if server.started else STARTUP_FAILURE
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = self._serve_worker()
+            except BaseException:
+                logger.exception('Worker failed')
+            finally:
+                os._exit(code)
+
+        self.pids.add(pid)
+        return pid
+
+    def start(self):
+        """
+        Bind the socket, load the assets and fork the workers.
+        """
+        if self.socket is None:
+            self.bind()
+
+        if self.preload:
+            start = time.perf_counter()
+            self.preload()
+            logger.info(f'Preloaded assets in {time.perf_counter() - start:.1f}s')
+
+        gc.collect()
+        gc.freeze()
+
+        for _ in range(self.workers):
+            self.spawn()
+        logger.info(f'Started {self.workers} workers on {self.host}:{self.port}')
+
+    def memory_report(self) -> list[dict]:
+        report = []
+        for pid in sorted(self.pids):
+            try:
+                report.append(read_memory(pid))
+            except OSError:
+                pass  # The worker exited meanwhile.
+        return report
+
+    def reap(self) -> list[tuple[int, int]]:
+        """
+        Collect the workers that exited.
+
+        Returns:
+            list[tuple[int, int]]: The pid and exit code of every exited worker, negative if killed by a signal.
+        """
+        exited = []
+        while self.pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if pid in self.pids:
+                self.pids.discard(pid)
+                exited.append((pid, os.waitstatus_to_exitcode(status)))
+        return exited
+
+    def restart_delay(self, now: float) -> Optional[float]:
+        """
+        Record a worker exit and get the delay before its replacement starts, None once too many workers exited.
+        """
+        self._exits.append(now)
+        while self._exits and now - self._exits[0] > self.restart_window:
+            self._exits.popleft()
+
+        if len(self._exits) > self.max_restarts:
+            return None
+        return min(self.max_backoff, self.backoff * 2 ** (len(self._exits) - 1))
+
+    def supervise(self) -> Optional[int]:
+        """
+        Replace exited workers once their delay is over.
+
+        Returns:
+            Optional[int]: The exit status of the master if the workers can't be kept running, None otherwise.
+        """
+        now = time.monotonic()
+        for pid, code in self.reap():
+            if code == STARTUP_FAILURE:
+                logger.error(f'Worker {pid} failed to start, stopping')
+                return STARTUP_FAILURE
+
+            delay = self.restart_delay(now)
+            if delay is None:
+                logger.error(f'{len(self._exits)} workers exited in {self.restart_window}s, stopping')
+                return 1
+
+            logger.warning(f'Worker {pid} exited with {code}, starting a new one in {delay:.1f}s')
+            self._restarts.append(now + delay)
+
+        for restart_at in [restart_at for restart_at in self._restarts if restart_at <= now]:
+            self._restarts.remove(restart_at)
+            self.spawn()
+        return None
+
+    def stop(self, timeout: float = 30.0):
+        """
+        Ask the workers to finish their requests and exit, workers still running after timeout are killed.
+        """
+        self._stopping = True
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + timeout
+        while self.pids and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+
+        for pid in list(self.pids):
+            logger.warning(f'Killing worker {pid}, it did not exit in {timeout}s')
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            os.waitpid(pid, 0)
+            self.pids.discard(pid)
+
+        if self.socket is not None:
+            self.socket.close()
+        gc.unfreeze()
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_report(self, signum, frame):
+        self._report_requested = True
+
+    def serve_forever(self, report_interval: float = 0.0) -> int:
+        """
+        Start the workers and supervise them until SIGINT or SIGTERM. With report_interval the memory of the workers
+        is also logged every report_interval seconds.
+
+        Returns:
+            int: The exit status of the master.
+        """
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGUSR1, self._on_report)
+        self.start()
+
+        next_report = time.monotonic() + report_interval
+        code = None
+        try:
+            while code is None and not self._stopping:
+                code = self.supervise()
+                if self._report_requested or (report_interval and time.monotonic() >= next_report):
+                    self._report_requested = False
+                    next_report = time.monotonic() + report_interval
+                    logger.info(f'Worker memory\n{format_memory_report(self.memory_report())}')
+
+                time.sleep(0.5)
+        finally:
+            self.stop()
+        return code or 0
+
+def run(app):
+    """
+    Serve the app as configured by the environment. With WEB_WORKERS above 1 the app runs in forked workers that share
+    the preloaded assets, otherwise in this process like before.
+    """
+    host = os.getenv('HOST', '127.0.0.1')
+    port = int(os.getenv('PORT', 8000))
+    workers = int(os.getenv('WEB_WORKERS', 1))
+
+    if workers <= 1:
+        uvicorn.run(app, host=host, port=port)
+        return
+
+    logging.basicConfig(level=logging.INFO)
+    server = PreforkServer(app, host=host, port=port, workers=workers)
+    sys.exit(server.serve_forever(float(os.getenv('WEB_MEMORY_REPORT_INTERVAL', 0.0))))
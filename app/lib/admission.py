@@ -0,0 +1,158 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Tiers of USER_LIMITS from the highest to the lowest priority. Unknown tiers are served after all of them.
+TIER_PRIORITY = ('premium_plus', 'premium', 'free')
+
+def normalize_tier(tier: Optional[str]) -> str:
+    return (tier or 'free').lower().replace(' ', '_')
+
+class AdmissionController:
+    """
+    Bound the number of concurrent upstream calls of a worker.
+
+    Up to max_concurrency calls run at once, the rest wait in a queue of max_queue entries ordered by tier
+    and arrival. A freed slot is handed to the waiter with the highest priority. When the queue is full a
+    request is rejected with 503 and Retry-After, unless it outranks the lowest queued request, which is
+    rejected in its place. Requests that wait longer than queue_timeout are rejected the same way.
+    """
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float, retry_after: int = 5,
+                 tiers: tuple[str, ...] = TIER_PRIORITY, wait_samples: int = 1000):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.priorities = {tier: priority for priority, tier in enumerate(tiers)}
+        self.in_flight = 0
+        self.waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._waits = deque(maxlen=wait_samples)
+        self.metrics = {'admitted': 0, 'queued': 0, 'shed': 0, 'timed_out': 0}
+
+    def priority(self, tier: Optional[str]) -> int:
+        return self.priorities.get(normalize_tier(tier), len(self.priorities))
+
+    def _overloaded(self) -> HTTPException:
+        self.metrics['shed'] += 1
+        return HTTPException(
+            status_code=503,
+            detail='AI service is busy. Please try again later.',
+            headers={'Retry-After': str(self.retry_after)}
+        )
+
+    def _remove(self, entry: tuple):
+        try:
+            self.waiters.remove(entry)
+            heapq.heapify(self.waiters)
+        except ValueError:
+            pass
+
+    async def acquire(self, tier: Optional[str]):
+        """
+        Wait for a slot. Raises HTTPException 503 when the request is shed.
+        """
+        priority = self.priority(tier)
+
+        if self.in_flight < self.max_concurrency and not self.waiters:
+            self.in_flight += 1
+            self.metrics['admitted'] += 1
+            self._waits.append(0.0)
+            return
+
+        if len(self.waiters) >= self.max_queue:
+            lowest = max(self.waiters)
+            if lowest[0] <= priority:
+                raise self._overloaded()
+
+            # Higher tier request takes the place of the lowest queued one.
+            self._remove(lowest)
+            lowest[2].set_exception(self._overloaded())
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._sequence), future)
+        heapq.heappush(self.waiters, entry)
+        self.metrics['queued'] += 1
+        started = time.perf_counter()
+
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # The slot was handed over while giving up, pass it on.
+                self.release()
+            else:
+                self._remove(entry)
+
+            if isinstance(exc, asyncio.TimeoutError):
+                self.metrics['timed_out'] += 1
+                raise self._overloaded() from exc
+            raise
+
+        self.metrics['admitted'] += 1
+        self._waits.append(time.perf_counter() - started)
+
+    def release(self):
+        """
+        Hand the slot to the next waiter or free it.
+        """
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, tier: Optional[str]):
+        await self.acquire(tier)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """
+        Get slot usage, queue depth per tier and wait times in milliseconds of the last admitted requests.
+        """
+        tiers = {priority: tier for tier, priority in self.priorities.items()}
+        depth = {tier: 0 for tier in self.priorities}
+        for priority, _, _ in self.waiters:
+            tier = tiers.get(priority, 'other')
+            depth[tier] = depth.get(tier, 0) + 1
+
+        waits = sorted(self._waits)
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2) if waits else 0.0
+
+        return {
+            **self.metrics,
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'queue_depth': len(self.waiters),
+            'queue_depth_by_tier': depth,
+            'wait_ms_p50': percentile(0.5),
+            'wait_ms_p95': percentile(0.95),
+            'wait_ms_max': round(waits[-1] * 1000, 2) if waits else 0.0
+        }
+
+def admission_from_env() -> AdmissionController:
+    """
+    Create an AdmissionController configured with AI_* environment variables.
+    """
+    return AdmissionController(
+        max_concurrency=int(os.getenv('AI_MAX_CONCURRENCY', 32)),
+        max_queue=int(os.getenv('AI_MAX_QUEUE', 128)),
+        queue_timeout=float(os.getenv('AI_QUEUE_TIMEOUT', 10.0)),
+        retry_after=int(os.getenv('AI_RETRY_AFTER', 5)),
+    )
@@ -0,0 +1,210 @@
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Iterable, Optional
+from redis.exceptions import RedisError
+from app.lib.rd import get_redis
+
+logger = logging.getLogger(__name__)
+
+class RedisCache:
+    """
+    JSON values in Redis with a TTL, a size cap with LRU eviction, tags for invalidation and hit/miss counters.
+    Keys are tracked in a sorted set by last access time and in one set per tag, the tags of every key are kept in a
+    hash so evicted, expired and invalidated keys are removed from all their tag sets.
+    Hits extend the TTL of a key, values expire ttl seconds after their last access like their score says.
+    Redis errors never fail a request, reads are treated as misses and writes are skipped.
+    """
+    def __init__(self, prefix: str, ttl: int, max_entries: int, client=None):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._client = client
+        self.lru_key = f'{prefix}:lru'
+        self.stats_key = f'{prefix}:stats'
+        self.tags_key = f'{prefix}:tags'
+
+    @property
+    def client(self):
+        # The worker's client unless one was given, it is only created once the lifespan starts.
+        return self._client or get_redis()
+
+    def make_key(self, *parts) -> str:
+        """
+        Build a key from JSON serializable parts, callers should normalize them first.
+        """
+        digest = hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()
+        return f'{self.prefix}:key:{digest}'
+
+    def _tag_key(self, tag: str) -> str:
+        return f'{self.prefix}:tag:{tag}'
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Get a cached value and count the hit or miss.
+        """
+        try:
+            value = await self.client.get(key)
+
+            pipe = self.client.pipeline()
+            if value is None:
+                pipe.hincrby(self.stats_key, 'misses', 1)
+            else:
+                pipe.hincrby(self.stats_key, 'hits', 1)
+                pipe.zadd(self.lru_key, {key: time.time()})
+                pipe.expire(key, self.ttl)
+            await pipe.execute()
+        except RedisError as redis_err:
+            logger.error(f'Error while reading {self.prefix} {redis_err}')
+            return None
+
+        return json.loads(value) if value is not None else None
+
+    async def get_many(self, keys: list[str]) -> list[Optional[Any]]:
+        """
+        Get many cached values in one round trip, None for misses.
+        """
+        if not keys:
+            return []
+
+        try:
+            values = await self.client.mget(keys)
+
+            hits = {key: time.time() for key, value in zip(keys, values) if value is not None}
+            pipe = self.client.pipeline()
+            if len(hits) < len(keys):
+                pipe.hincrby(self.stats_key, 'misses', len(keys) - len(hits))
+            if hits:
+                pipe.hincrby(self.stats_key, 'hits', len(hits))
+                pipe.zadd(self.lru_key, hits)
+                for key in hits:
+                    pipe.expire(key, self.ttl)
+            await pipe.execute()
+        except RedisError as redis_err:
+            logger.error(f'Error while reading {self.prefix} {redis_err}')
+            return [None] * len(keys)
+
+        return [json.loads(value) if value is not None else None for value in values]
+
+    async def set_many(self, items: dict[str, Any]):
+        """
+        Cache many values in one round trip, see set.
+        """
+        if not items:
+            return
+
+        try:
+            pipe = self.client.pipeline()
+            for key, value in items.items():
+                pipe.set(key, json.dumps(value), ex=self.ttl)
+            pipe.zadd(self.lru_key, {key: time.time() for key in items})
+            self._queue_expired(pipe)
+            pipe.zcard(self.lru_key)
+            *_, expired, size = await pipe.execute()
+
+            await self._prune(expired, size)
+        except RedisError as redis_err:
+            logger.error(f'Error while writing {self.prefix} {redis_err}')
+
+    async def set(self, key: str, value: Any, tags: Iterable[str] = ()):
+        """
+        Cache a value and evict least recently used values above the size cap.
+
+        Args:
+            key (str): Key from make_key.
+            value: JSON serializable value.
+            tags (Iterable[str], optional): Tags to invalidate the value with.
+        """
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(key, json.dumps(value), ex=self.ttl)
+            pipe.zadd(self.lru_key, {key: time.time()})
+            tags = sorted(set(tags))
+            for tag in tags:
+                pipe.sadd(self._tag_key(tag), key)
+                # Read keys outlive any TTL of their tag sets, the sets are emptied by pruning instead.
+                pipe.persist(self._tag_key(tag))
+            if tags:
+                pipe.hset(self.tags_key, key, json.dumps(tags))
+            self._queue_expired(pipe)
+            pipe.zcard(self.lru_key)
+            *_, expired, size = await pipe.execute()
+
+            await self._prune(expired, size)
+        except RedisError as redis_err:
+            logger.error(f'Error while writing {self.prefix} {redis_err}')
+
+    def _queue_expired(self, pipe, limit: int = 100):
+        # A key is read or written at the time of its score at the latest, so keys not touched for ttl have expired.
+        pipe.zrangebyscore(self.lru_key, '-inf', time.time() - self.ttl, start=0, num=limit)
+
+    async def _prune(self, expired: list[str], size: int):
+        if expired:
+            pipe = self.client.pipeline()
+            pipe.zrem(self.lru_key, *expired)
+            self._untag(pipe, expired, await self.client.hmget(self.tags_key, expired))
+            await pipe.execute()
+            size -= len(expired)
+
+        if size > self.max_entries:
+            await self._evict(size - self.max_entries)
+
+    def _untag(self, pipe, keys: list[str], tags: list[Optional[str]]):
+        # Remove keys from the tag sets they were added to, tags are the values of the keys in the tags hash.
+        for key, key_tags in zip(keys, tags):
+            for tag in json.loads(key_tags) if key_tags else []:
+                pipe.srem(self._tag_key(tag), key)
+        pipe.hdel(self.tags_key, *keys)
+
+    async def _evict(self, count: int):
+        evicted = [key for key, _ in await self.client.zpopmin(self.lru_key, count)]
+        if evicted:
+            tags = await self.client.hmget(self.tags_key, evicted)
+            pipe = self.client.pipeline()
+            pipe.delete(*evicted)
+            self._untag(pipe, evicted, tags)
+            pipe.hincrby(self.stats_key, 'evictions', len(evicted))
+            await pipe.execute()
+
+    async def invalidate(self, tags: Iterable[str]):
+        """
+        Remove every value cached with one of the tags.
+        """
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return
+
+        try:
+            keys = list(await self.client.sunion(tag_keys))
+
+            pipe = self.client.pipeline()
+            if keys:
+                # Keys are also removed from the sets of their other tags.
+                tags = await self.client.hmget(self.tags_key, keys)
+                pipe.delete(*keys)
+                pipe.zrem(self.lru_key, *keys)
+                self._untag(pipe, keys, tags)
+                pipe.hincrby(self.stats_key, 'invalidations', len(keys))
+            pipe.delete(*tag_keys)
+            await pipe.execute()
+        except RedisError as redis_err:
+            logger.error(f'Error while invalidating {self.prefix} {redis_err}')
+
+    async def stats(self) -> dict:
+        """
+        Get hit, miss, eviction and invalidation counters.
+        """
+        pipe = self.client.pipeline()
+        pipe.hgetall(self.stats_key)
+        pipe.zcard(self.lru_key)
+        counters, entries = await pipe.execute()
+
+        stats = {name: int(counters.get(name, 0)) for name in ('hits', 'misses', 'evictions', 'invalidations')}
+        lookups = stats['hits'] + stats['misses']
+
+        return {
+            **stats,
+            'entries': entries,
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,29 @@
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+metrics_providers = {}
+
+def register_metrics(name: str):
+    """
+    Decorator to register a function that returns a dict of metrics under a name
+    """
+    def decorator(func):
+        metrics_providers[name] = func
+        return func
+    return decorator
+
+async def collect_metrics() -> dict:
+    """
+    Collect metrics of every registered provider, providers may be async. A failing provider reports its error instead of failing the others.
+    """
+    metrics = {}
+    for name, provider in metrics_providers.items():
+        try:
+            result = provider()
+            metrics[name] = await result if inspect.isawaitable(result) else result
+        except Exception as e:
+            logger.error(f'Error while collecting {name} metrics {e}')
+            metrics[name] = {'error': str(e)}
+    return metrics
@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from redis.exceptions import RedisError
+from app.lib.rd import get_redis
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    prices: list[dict]
+    etag: str
+    fetched_at: float
+
+    @classmethod
+    def build(cls, prices: list[dict], fetched_at: Optional[float] = None) -> 'CatalogSnapshot':
+        body = json.dumps(prices, sort_keys=True, separators=(',', ':'))
+        etag = hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+        return cls(prices, etag, fetched_at if fetched_at is not None else time.time())
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+class PriceCatalog:
+    """
+    Snapshot of the price list, held in process and shared by the workers in Redis.
+
+    Prices change rarely, so requests never wait for the billing provider once a snapshot exists. A snapshot older
+    than max_age is still served while one background refresh replaces it. Workers re-read the shared snapshot every
+    local_ttl seconds, so a refresh done by one worker, e.g. after a price webhook, reaches the others.
+    """
+    def __init__(self, max_age: float = 900.0, local_ttl: float = 30.0, key: str = 'price_catalog', client=None):
+        self.max_age = max_age
+        self.local_ttl = local_ttl
+        self.key = key
+        self._client = client
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._loaded_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self.metrics = {'local_hits': 0, 'redis_hits': 0, 'stale_hits': 0, 'refreshes': 0, 'refresh_errors': 0}
+
+    @property
+    def client(self):
+        return self._client or get_redis()
+
+    async def _load_shared(self) -> Optional[CatalogSnapshot]:
+        try:
+            data = await self.client.get(self.key)
+        except RedisError as redis_err:
+            logger.error(f'Error while reading {self.key} {redis_err}')
+            return None
+
+        if data is None:
+            return None
+        data = json.loads(data)
+        return CatalogSnapshot(data['prices'], data['etag'], data['fetched_at'])
+
+    async def _store_shared(self, snapshot: CatalogSnapshot):
+        data = json.dumps({'prices': snapshot.prices, 'etag': snapshot.etag, 'fetched_at': snapshot.fetched_at})
+        try:
+            await self.client.set(self.key, data)
+        except RedisError as redis_err:
+            logger.error(f'Error while writing {self.key} {redis_err}')
+
+    def _adopt(self, snapshot: CatalogSnapshot):
+        # Keep the newest snapshot, a slow read must not replace a refresh that finished meanwhile.
+        if self.snapshot is None or snapshot.fetched_at >= self.snapshot.fetched_at:
+            self.snapshot = snapshot
+        self._loaded_at = time.monotonic()
+
+    async def get(self, fetch: Callable[[], Awaitable[list[dict]]]) -> CatalogSnapshot:
+        """
+        Get the current snapshot, fetching the prices with fetch only when no worker has one yet.
+        """
+        if self.snapshot is not None and time.monotonic() - self._loaded_at < self.local_ttl:
+            self.metrics['local_hits'] += 1
+            snapshot = self.snapshot
+        else:
+            shared = await self._load_shared()
+            if shared is not None:
+                self.metrics['redis_hits'] += 1
+                self._adopt(shared)
+            snapshot = self.snapshot
+
+        if snapshot is None:
+            # Shielded, a client that goes away must not cancel the refresh other requests wait for.
+            return await asyncio.shield(self.revalidate(fetch))
+
+        if snapshot.age() > self.max_age:
+            self.metrics['stale_hits'] += 1
+            self.revalidate(fetch)
+
+        return snapshot
+
+    def revalidate(self, fetch: Callable[[], Awaitable[list[dict]]]) -> asyncio.Task:
+        """
+        Start a background refresh unless one is running. Await the task to wait for the new snapshot.
+        """
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self.refresh(fetch))
+            # Failures are logged by refresh, nobody may await a background refresh.
+            self._refreshing.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._refreshing
+
+    async def refresh(self, fetch: Callable[[], Awaitable[list[dict]]]) -> CatalogSnapshot:
+        """
+        Fetch the prices and share the new snapshot. On failure the previous snapshot stays in use.
+        """
+        try:
+            snapshot = CatalogSnapshot.build(await fetch())
+        except Exception as e:
+            self.metrics['refresh_errors'] += 1
+            logger.error(f'Error while refreshing {self.key} {e}')
+            raise
+
+        self.metrics['refreshes'] += 1
+        self._adopt(snapshot)
+        await self._store_shared(snapshot)
+        return snapshot
+
+    async def run(self, fetch: Callable[[], Awaitable[list[dict]]], interval: float = 60.0):
+        """
+        Keep the snapshot fresh until cancelled. Run it as a background task of the worker.
+
+        Every interval the shared snapshot is read, it is fetched again only when it is older than max_age,
+        so the provider is called about once per max_age whatever the number of workers.
+        """
+        while True:
+            shared = await self._load_shared()
+            if shared is not None:
+                self._adopt(shared)
+
+            if self.snapshot is None or self.snapshot.age() > self.max_age:
+                try:
+                    await self.revalidate(fetch)
+                except Exception:
+                    pass  # Logged by refresh, the next interval retries.
+
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        return {
+            **self.metrics,
+            'etag': self.snapshot.etag if self.snapshot else None,
+            'age': round(self.snapshot.age(), 1) if self.snapshot else None,
+        }
+
+def price_catalog_from_env() -> PriceCatalog:
+    """
+    Create a PriceCatalog configured with PRICE_CATALOG_* environment variables.
+    """
+    return PriceCatalog(
+        max_age=float(os.getenv('PRICE_CATALOG_MAX_AGE', 900.0)),
+        local_ttl=float(os.getenv('PRICE_CATALOG_LOCAL_TTL', 30.0)),
+    )
@@ -0,0 +1,243 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class ProviderError(HTTPException):
+    """
+    Failure of the provider itself: a 5xx answer, a timeout or a lost connection. Only these count against the
+    breaker, rejected requests and answers that can't be parsed would fail the same way on a healthy provider.
+    """
+    def __init__(self, detail: str, status_code: int = 500):
+        super().__init__(status_code=status_code, detail=detail)
+
+class CircuitBreaker:
+    """
+    Stop calling a backend after failure_threshold consecutive failures. After reset_timeout seconds
+    one probe call is let through, its success closes the breaker and its failure opens it again.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """
+        Whether a call may be made now. In half open state this takes the single probe.
+        """
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+
+        return self.state != OPEN
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def record_abandoned(self):
+        # A cancelled call tells nothing about the backend, let another probe through.
+        self._probing = False
+
+class Backend:
+    """
+    A provider the router can call, with its breaker and recent latencies of successful calls.
+    """
+    def __init__(self, name: str, call: Callable[..., Awaitable[Any]], breaker: Optional[CircuitBreaker] = None,
+                 default_hedge_delay: float = 10.0, min_hedge_delay: float = 0.5, samples: int = 200):
+        self.name = name
+        self.call = call
+        self.breaker = breaker or CircuitBreaker()
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.latencies = deque(maxlen=samples)
+        self.metrics = {'calls': 0, 'successes': 0, 'failures': 0, 'rejected': 0, 'cancelled': 0}
+
+    def latency(self, p: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+    def hedge_delay(self) -> float:
+        """
+        Seconds to wait for this backend before asking the next one, its p95 once there are enough samples.
+        """
+        if len(self.latencies) < 20:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, self.latency(0.95))
+
+    def stats(self) -> dict:
+        p50, p95 = self.latency(0.5), self.latency(0.95)
+        return {
+            **self.metrics,
+            'state': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'times_opened': self.breaker.times_opened,
+            'latency_ms_p50': round(p50 * 1000, 2) if p50 is not None else None,
+            'latency_ms_p95': round(p95 * 1000, 2) if p95 is not None else None
+        }
+
+class ProviderRouter:
+    """
+    Send a completion to the first backend whose breaker allows it. If it fails the next backend is tried,
+    and if it has not answered by its p95 latency the next backend is asked too and the first answer wins.
+    Errors other than ProviderError are raised to the caller as they are, without trying the next backend.
+    """
+    def __init__(self, backends: list[Backend], hedge: bool = True, retry_after: int = 30):
+        self.backends = backends
+        self.hedge = hedge
+        self.retry_after = retry_after
+        self.metrics = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'failovers': 0, 'unavailable': 0}
+
+    def _next_backend(self, tried: list[Backend]) -> Optional[Backend]:
+        for backend in self.backends:
+            if backend not in tried and backend.breaker.allow():
+                return backend
+        return None
+
+    async def _call(self, backend: Backend, *args) -> Any:
+        backend.metrics['calls'] += 1
+        start = time.perf_counter()
+
+        try:
+            result = await backend.call(*args)
+        except asyncio.CancelledError:
+            backend.metrics['cancelled'] += 1
+            raise
+        except ProviderError:
+            backend.metrics['failures'] += 1
+            backend.breaker.record_failure()
+            raise
+        except Exception:
+            # The provider answered, the request or its answer was wrong.
+            backend.metrics['rejected'] += 1
+            backend.breaker.record_abandoned()
+            raise
+
+        backend.latencies.append(time.perf_counter() - start)
+        backend.metrics['successes'] += 1
+        backend.breaker.record_success()
+        return result
+
+    async def complete(self, content: dict, temperature: float = 1.3, response_format: str = 'text') -> Any:
+        """
+        Get a chat completion from the fastest healthy backend.
+
+        Args:
+            content (dict): The user message to send.
+            temperature (float): Sampling temperature, used by backends that support it.
+            response_format (str): 'text' or 'json_object'.
+        Returns:
+            The answer of the first backend to succeed.
+        """
+        self.metrics['requests'] += 1
+        tried: list[Backend] = []
+        tasks: dict[asyncio.Task, Backend] = {}
+        hedge_delay = None
+        hedged = False
+        last_error = None
+
+        try:
+            while True:
+                if not tasks:
+                    backend = self._next_backend(tried)
+                    if backend is None:
+                        break
+                    if tried:
+                        self.metrics['failovers'] += 1
+                    tried.append(backend)
+                    tasks[asyncio.create_task(self._call(backend, content, temperature, response_format))] = backend
+                    hedge_delay = backend.hedge_delay() if self.hedge else None
+
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Slower than usual, ask the next backend too and take whichever answers first.
+                    hedge_delay = None
+                    backend = self._next_backend(tried)
+                    if backend is not None:
+                        hedged = True
+                        self.metrics['hedged'] += 1
+                        tried.append(backend)
+                        tasks[asyncio.create_task(self._call(backend, content, temperature, response_format))] = backend
+                    continue
+
+                for task in done:
+                    backend = tasks.pop(task)
+                    if task.exception() is None:
+                        if hedged and backend is tried[-1]:
+                            self.metrics['hedge_wins'] += 1
+                        return task.result()
+
+                    last_error = task.exception()
+                    if not isinstance(last_error, ProviderError):
+                        raise last_error
+                    logger.warning(f'AI provider {backend.name} failed {last_error}')
+        finally:
+            for task, backend in tasks.items():
+                task.cancel()
+                backend.breaker.record_abandoned()
+
+        if last_error is not None:
+            raise last_error
+
+        self.metrics['unavailable'] += 1
+        raise HTTPException(
+            status_code=503,
+            detail='AI service is unavailable. Please try again later.',
+            headers={'Retry-After': str(self.retry_after)}
+        )
+
+    def stats(self) -> dict:
+        return {**self.metrics, 'backends': {backend.name: backend.stats() for backend in self.backends}}
+
+def backend_from_env(name: str, call: Callable[..., Awaitable[Any]]) -> Backend:
+    """
+    Create a Backend configured with AI_BREAKER_* and AI_HEDGE_* environment variables.
+    """
+    return Backend(
+        name,
+        call,
+        CircuitBreaker(
+            failure_threshold=int(os.getenv('AI_BREAKER_FAILURES', 5)),
+            reset_timeout=float(os.getenv('AI_BREAKER_RESET_TIMEOUT', 30.0)),
+        ),
+        default_hedge_delay=float(os.getenv('AI_HEDGE_DEFAULT_DELAY', 10.0)),
+        min_hedge_delay=float(os.getenv('AI_HEDGE_MIN_DELAY', 0.5)),
+    )
+
+def router_from_env(backends: list[Backend]) -> ProviderRouter:
+    return ProviderRouter(
+        backends,
+        hedge=os.getenv('AI_HEDGE', 'true').lower() == 'true',
+        retry_after=int(float(os.getenv('AI_BREAKER_RESET_TIMEOUT', 30.0))),
+    )
@@ -0,0 +1,122 @@
+import time
+import hashlib
+from typing import Optional
+from redis.exceptions import NoScriptError
+from app.lib.rd import get_redis
+
+QUOTA_PERIOD = 86400  # Request limits reset one day after the first request.
+
+DIRTY_KEY = 'quota:dirty'
+RESET_FIELD = '_reset_at'
+
+QUOTA_MISSING = -1
+QUOTA_EXCEEDED = 0
+QUOTA_ALLOWED = 1
+
+# Checks the counter against the limit and increments it in one atomic step, so concurrent requests can't both
+# take the last slot. A missing hash means the period is over or was never loaded, the caller seeds it first.
+# KEYS: quota hash of the user, set of users to reconcile. ARGV: request type, limit, increment, user id.
+CONSUME_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return {-1, 0}
+end
+local used = tonumber(redis.call('hget', KEYS[1], ARGV[1]) or '0')
+if used + tonumber(ARGV[3]) > tonumber(ARGV[2]) then
+    return {0, used}
+end
+used = redis.call('hincrby', KEYS[1], ARGV[1], ARGV[3])
+redis.call('sadd', KEYS[2], ARGV[4])
+return {1, used}
+"""
+
+# Creates the hash of a new period unless another request already did. The hash expires at the reset time.
+# KEYS: quota hash of the user. ARGV: reset timestamp, then request type and count pairs.
+SEED_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    redis.call('hset', KEYS[1], '_reset_at', ARGV[1])
+    for i = 2, #ARGV, 2 do
+        redis.call('hset', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+    redis.call('expireat', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+SCRIPT_SHAS = {script: hashlib.sha1(script.encode('utf-8')).hexdigest() for script in (CONSUME_SCRIPT, SEED_SCRIPT)}
+
+def quota_key(user_id: str) -> str:
+    return f'quota:{user_id}'
+
+class QuotaEngine:
+    """
+    Per user request counters of the current period in one Redis hash per user.
+    Users whose counters changed are collected in a set, so they can be written to the database later.
+    """
+    def __init__(self, client=None, period: int = QUOTA_PERIOD):
+        self._client = client
+        self.period = period
+
+    @property
+    def client(self):
+        return self._client or get_redis()
+
+    async def _run_script(self, script: str, num_keys: int, *args):
+        # Scripts are sent once per Redis server and called by their hash after that.
+        try:
+            return await self.client.evalsha(SCRIPT_SHAS[script], num_keys, *args)
+        except NoScriptError:
+            return await self.client.eval(script, num_keys, *args)
+
+    async def consume(self, user_id: str, request_type: str, limit: int, increment: int = 1) -> tuple[int, int]:
+        """
+        Count a request if it fits in the limit.
+
+        Returns:
+            tuple[int, int]: QUOTA_ALLOWED, QUOTA_EXCEEDED or QUOTA_MISSING and the used count.
+        """
+        status, used = await self._run_script(CONSUME_SCRIPT, 2, quota_key(user_id), DIRTY_KEY, request_type, limit, increment, user_id)
+        return int(status), int(used)
+
+    async def seed(self, user_id: str, counts: dict[str, int], reset_at: Optional[float] = None):
+        """
+        Start the period of a user with known counts, for example the ones stored in the database.
+        """
+        reset_at = int(reset_at or time.time() + self.period)
+        args = [reset_at]
+        for request_type, count in counts.items():
+            args += [request_type, count]
+
+        await self._run_script(SEED_SCRIPT, 1, quota_key(user_id), *args)
+
+    async def pop_dirty(self, count: int) -> list[str]:
+        """
+        Take up to count users whose counters changed since they were last taken.
+        """
+        return await self.client.spop(DIRTY_KEY, count) or []
+
+    async def dirty_count(self) -> int:
+        return await self.client.scard(DIRTY_KEY)
+
+    async def mark_dirty(self, user_ids: list[str]):
+        if user_ids:
+            await self.client.sadd(DIRTY_KEY, *user_ids)
+
+    async def read(self, user_ids: list[str]) -> list[dict]:
+        """
+        Get the counters and reset timestamp of users. Users whose period already ended are left out.
+        """
+        pipe = self.client.pipeline()
+        for user_id in user_ids:
+            pipe.hgetall(quota_key(user_id))
+
+        records = []
+        for user_id, counters in zip(user_ids, await pipe.execute()):
+            if not counters or RESET_FIELD not in counters:
+                continue
+
+            reset_at = float(counters.pop(RESET_FIELD))
+            records.append({'user_id': user_id, 'counts': {name: int(value) for name, value in counters.items()}, 'reset_at': reset_at})
+
+        return records
+
+quota_engine = QuotaEngine()
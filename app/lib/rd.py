@@ -1,13 +1,39 @@
-import redis
 import os
+from typing import Optional
+import redis.asyncio as redis
 
-host = os.getenv('REDIS_HOST')
-password = os.getenv('REDIS_PASSWORD')
+REDIS_OPTIONS = {
+    'host': os.getenv('REDIS_HOST'),
+    'port': int(os.getenv('REDIS_PORT', 10918)),
+    'username': os.getenv('REDIS_USERNAME', 'default'),
+    'password': os.getenv('REDIS_PASSWORD'),
+    'max_connections': int(os.getenv('REDIS_MAX_CONNECTIONS', 100)),
+    'socket_timeout': float(os.getenv('REDIS_SOCKET_TIMEOUT', 5.0)),
+    'decode_responses': True,
+}
 
-r = redis.Redis(
-    host=host,
-    port=10918,
-    decode_responses=True,
-    username="default",
-    password=password,
-)
\ No newline at end of file
+def create_redis(**options) -> redis.Redis:
+    """
+    Create a pooled asyncio Redis client. Connections are bound to the event loop they are opened on,
+    so one client is created per worker in the lifespan, see app.lib.resources.
+    """
+    return redis.Redis(**{**REDIS_OPTIONS, **options})
+
+_client: Optional[redis.Redis] = None
+
+def get_redis() -> redis.Redis:
+    """
+    Get the Redis client of the worker. Modules that are not request scoped, like caches, use this one.
+    """
+    global _client
+
+    if _client is None:
+        _client = create_redis()
+    return _client
+
+def set_redis(client: Optional[redis.Redis]):
+    """
+    Replace the Redis client of the worker, with the lifespan client or a local stand-in.
+    """
+    global _client
+    _client = client
@@ -1,21 +1,69 @@
-from app.lib.rd import r
-from app.user.user import check_request_limit
+import time
+import asyncio
+import logging
+from fastapi import HTTPException
+from app.lib.admission import normalize_tier
+from app.lib.quota import quota_engine, QUOTA_ALLOWED, QUOTA_MISSING
+from app.user.user import get_user_tier, get_request_limit, get_request_metrics, save_request_metrics
 
-# In this solution if users had reached their limit, check_request_limit function going to run every request which is not efficient.
-# Instead we could track a key for checking request type if paymend required or not and not run check_request_limit function at all.
-# We could just check the top and raise appropriate 402 message here.
-def track_requests(user_id: str, request_type: str, request_count: int = 5):
+logger = logging.getLogger(__name__)
 
+async def track_requests(user_id: str, request_type: str, increment: int = 1):
+
+    """
+    Check the request against the daily limit of the user's tier and count it.
+    The check and the increment are one atomic Redis call, so concurrent requests can't go over the limit.
+    Counts are written to the database later by reconcile_request_metrics.
+    """
+    limit = get_request_limit(normalize_tier(await get_user_tier(user_id)), request_type)
+    status, _ = await quota_engine.consume(user_id, request_type, limit, increment)
+
+    if status == QUOTA_MISSING:
+        # First request of the period in Redis, continue from the stored counts if the period is still running.
+        counts, reset_date = await get_request_metrics(user_id)
+        await quota_engine.seed(user_id, counts, reset_date.timestamp() if reset_date else None)
+        status, _ = await quota_engine.consume(user_id, request_type, limit, increment)
+
+    if status != QUOTA_ALLOWED:
+        logger.info('Request limit exceeded.')
+        raise HTTPException(status_code=402, detail=f'Request limit exceed. {request_type}. Payment Required.')
+
+async def reconcile_request_metrics(batch_size: int = 500) -> int:
+    """
+    Write the counts of users who made requests since the last run to the database.
+
+    Returns:
+        int: Number of users written.
+    """
+    written = 0
+    while user_ids := await quota_engine.pop_dirty(batch_size):
+        records = await quota_engine.read(user_ids)
+        try:
+            await save_request_metrics(records)
+        except Exception:
+            await quota_engine.mark_dirty(user_ids)
+            raise
+        written += len(records)
+
+    return written
+
+async def run_request_metrics_reconciler(interval: float, flush_size: int = 500, tick: float = 1.0):
     """
-    Track requests to insert after number of requests for optimizing database operations.
+    Reconcile request metrics every interval seconds, or sooner once flush_size users are waiting,
+    until cancelled. Then once more, so no counts are left behind on shutdown.
     """
-    key = f"user:{user_id}:requests"
-    current_count = int(r.hget(key, request_type)) if r.hget(key, request_type) else 0
+    last_run = time.monotonic()
 
-    if current_count % request_count == 0:
-        is_payment_required = check_request_limit(user_id, request_type, request_count)
-        if not is_payment_required:
-            r.hincrby(key, request_type, 1)
+    try:
+        while True:
+            await asyncio.sleep(min(tick, interval))
+            if time.monotonic() - last_run < interval and await quota_engine.dirty_count() < flush_size:
+                continue
 
-    r.hincrby(key, request_type, 1)
-    r.expire(key, 86400)  # 24 hours
\ No newline at end of file
+            last_run = time.monotonic()
+            try:
+                await reconcile_request_metrics(flush_size)
+            except Exception as e:
+                logger.error(f'Error while reconciling request metrics {e}')
+    finally:
+        await reconcile_request_metrics(flush_size)
@@ -0,0 +1,111 @@
+import os
+import asyncio
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, Coroutine, Optional
+from fastapi import Request
+from paddle_billing import Client, Environment, Options
+from app.lib import rd
+from app.utils.request_helpers import create_llm_client, create_hf_client
+from app.user.utils.google import create_google_client
+from app.lib.word_batch import create_word_pool
+
+logger = logging.getLogger(__name__)
+
+class Resources:
+    """
+    Clients shared by every request of a worker. They are created once in the lifespan, handed to routes
+    through dependencies and closed in reverse order on shutdown, after the background tasks are cancelled.
+
+    Any resource can be replaced with a local stand-in through overrides, stand-ins are owned by the caller
+    and are not closed here.
+    """
+    def __init__(self, overrides: Optional[dict[str, Any]] = None):
+        self.overrides = overrides or {}
+        self._resources: dict[str, Any] = {}
+        self._closers: list[tuple[str, Callable[[Any], Awaitable]]] = []
+        self._tasks: list[asyncio.Task] = []
+
+    def add(self, name: str, factory: Callable[[], Any], close: Optional[Callable[[Any], Awaitable]] = None) -> Any:
+        """
+        Create a resource with factory, or take its stand-in, and register how to close it.
+        """
+        if name in self.overrides:
+            self._resources[name] = self.overrides[name]
+            return self._resources[name]
+
+        resource = factory()
+        self._resources[name] = resource
+        if close and resource is not None:
+            self._closers.append((name, close))
+        return resource
+
+    def __getitem__(self, name: str) -> Any:
+        return self._resources[name]
+
+    def start_task(self, coro: Coroutine) -> asyncio.Task:
+        """
+        Run a background task of the worker until shutdown.
+        """
+        task = asyncio.create_task(coro)
+        self._tasks.append(task)
+        return task
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        for name, close in reversed(self._closers):
+            try:
+                result = close(self._resources[name])
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f'Error while closing {name} {e}')
+
+def create_llm_resource():
+    if not os.getenv("DEEPSEEK_API_KEY"):
+        logger.error("DEEPSEEK_API_KEY is not set in the environment.")
+        raise ValueError("Missing DEEPSEEK_API_KEY")
+    return create_llm_client(os.getenv('DEEPSEEK_API_KEY'))
+
+def create_paddle_resource() -> Client:
+    if not os.getenv("PADDLE_API_SECRET"):
+        raise ValueError("PADDLE_API_SECRET is not set in the environment.")
+    return Client(os.getenv('PADDLE_API_SECRET'), options=Options(Environment.SANDBOX))
+
+def create_resources(overrides: Optional[dict[str, Any]] = None) -> Resources:
+    """
+    Create the pooled clients of a worker: redis, mongo, llm (DeepSeek), hf (Hugging Face, None without HF_API_KEY),
+    google (tokeninfo), paddle and word_pool (WordNet lookups, None for the default thread pool).
+    """
+    resources = Resources(overrides)
+
+    # Caches and quotas use the worker's Redis client through app.lib.rd.
+    redis_client = resources.add('redis', rd.create_redis, lambda client: client.aclose())
+    rd.set_redis(redis_client)
+
+    # Modules import the database handle directly, the registry owns the client's lifetime.
+    # Imported here as the module connects on import and needs DATABASE_URI.
+    from app.models import async_database
+    resources.add('mongo', lambda: async_database.client, lambda client: client.close())
+
+    resources.add('llm', create_llm_resource, lambda client: client.close())
+    resources.add('hf', lambda: create_hf_client() if os.getenv('HF_API_KEY') else None, lambda client: client.aclose())
+    resources.add('google', create_google_client, lambda client: client.aclose())
+    resources.add('paddle', create_paddle_resource)
+    resources.add('word_pool', create_word_pool, lambda pool: pool.shutdown(wait=False, cancel_futures=True))
+
+    return resources
+
+def get_resources(request: Request) -> Resources:
+    return request.app.state.resources
+
+def get_resource(name: str) -> Callable[[Request], Any]:
+    """
+    Dependency of one resource, e.g. Depends(get_resource('google')).
+    """
+    def dependency(request: Request) -> Any:
+        return request.app.state.resources[name]
+    return dependency
@@ -0,0 +1,48 @@
+import os
+from typing import Optional
+from app.lib.cache import RedisCache
+from app.lib.metrics import register_metrics
+
+# Cache of /api/sentences pages. Every page is stored under a key made from its normalized filters
+# and tagged with its categories, so ingesting sentences only invalidates the pages they can appear on.
+sentence_cache = RedisCache(
+    'sentence_cache',
+    ttl=int(os.getenv('SENTENCE_CACHE_TTL', 3600)),
+    max_entries=int(os.getenv('SENTENCE_CACHE_MAX_ENTRIES', 10000)),
+)
+
+# Pages without a category filter can change whenever a sentence of any category is ingested.
+ALL_CATEGORIES = '*'
+
+def make_cache_key(word: str, categories: Optional[list[str]], min_length: Optional[int], max_length: Optional[int],
+                   page: int, page_size: int, cursor: Optional[str] = None, offsets: bool = False) -> str:
+    """
+    Build the cache key of a sentences page from its normalized filters.
+    """
+    return sentence_cache.make_key(
+        word.strip().lower(),
+        sorted(set(categories or [])),
+        min_length,
+        max_length,
+        None if cursor else page,
+        cursor,
+        page_size,
+        offsets
+    )
+
+async def get_cached_page(key: str) -> Optional[dict]:
+    return await sentence_cache.get(key)
+
+async def set_cached_page(key: str, page: dict, categories: Optional[list[str]] = None):
+    await sentence_cache.set(key, page, categories or [ALL_CATEGORIES])
+
+async def invalidate_categories(categories: set[str]):
+    """
+    Remove cached pages that can contain sentences of the given categories.
+    Call this after new sentences are ingested.
+    """
+    await sentence_cache.invalidate({category for category in categories if category} | {ALL_CATEGORIES})
+
+@register_metrics('sentence_cache')
+async def get_cache_stats() -> dict:
+    return await sentence_cache.stats()
@@ -0,0 +1,140 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+from redis.exceptions import RedisError
+from app.lib.rd import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Deletes the lock only if it is still held by the same leader.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls so they share one upstream call and all receive its result.
+
+    Calls with the same key in one worker await the same task. With use_redis, one worker takes a lock per key
+    and publishes the result, other workers wait for the result key instead of calling upstream themselves.
+    Results have to be JSON serializable to be shared across workers.
+    """
+    def __init__(self, prefix: str, use_redis: bool = False, lock_ttl: float = 30.0, result_ttl: float = 5.0,
+                 poll_interval: float = 0.05, client=None):
+        self.prefix = prefix
+        self.use_redis = use_redis
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._client = client
+        self._calls: dict[str, asyncio.Task] = {}
+        self.metrics = {'calls': 0, 'leaders': 0, 'coalesced': 0, 'remote_coalesced': 0}
+
+    @property
+    def client(self):
+        return self._client or get_redis()
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func, or join the call that is already running for the same key.
+        """
+        self.metrics['calls'] += 1
+
+        task = self._calls.get(key)
+        if task is None:
+            # Shared work runs in its own task so a cancelled caller does not cancel it for the others.
+            task = asyncio.ensure_future(self._lead(key, func))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.metrics['coalesced'] += 1
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+        # Mark the exception as retrieved in case every caller was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    async def _lead(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.use_redis:
+            self.metrics['leaders'] += 1
+            return await func()
+
+        lock_key = f'{self.prefix}:lock:{key}'
+        result_key = f'{self.prefix}:result:{key}'
+        token = uuid.uuid4().hex
+
+        try:
+            is_leader = await self.client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+        except RedisError as redis_err:
+            logger.error(f'Error while taking single flight lock {redis_err}')
+            is_leader = True
+            token = None
+
+        if is_leader:
+            self.metrics['leaders'] += 1
+            try:
+                result = await func()
+                if token:
+                    await self.client.set(result_key, json.dumps(result), px=int(self.result_ttl * 1000))
+                return result
+            finally:
+                if token:
+                    await self._release(lock_key, token)
+
+        result = await self._wait_for_result(lock_key, result_key)
+        if result is not None:
+            self.metrics['remote_coalesced'] += 1
+            return json.loads(result)
+
+        # The other worker failed or timed out, call upstream ourselves.
+        self.metrics['leaders'] += 1
+        return await func()
+
+    async def _wait_for_result(self, lock_key: str, result_key: str):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_ttl
+
+        try:
+            while loop.time() < deadline:
+                await asyncio.sleep(self.poll_interval)
+
+                result = await self.client.get(result_key)
+                if result is not None:
+                    return result
+                if not await self.client.exists(lock_key):
+                    return await self.client.get(result_key)
+        except RedisError as redis_err:
+            logger.error(f'Error while waiting for single flight result {redis_err}')
+
+        return None
+
+    async def _release(self, lock_key: str, token: str):
+        try:
+            await self.client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except RedisError as redis_err:
+            logger.error(f'Error while releasing single flight lock {redis_err}')
+
+    def stats(self) -> dict:
+        return {**self.metrics, 'in_flight': len(self._calls)}
+
+def single_flight_from_env(prefix: str) -> SingleFlight:
+    """
+    Create a SingleFlight configured with SINGLE_FLIGHT_* environment variables.
+    """
+    return SingleFlight(
+        prefix,
+        use_redis=os.getenv('SINGLE_FLIGHT_REDIS', 'false').lower() == 'true',
+        lock_ttl=float(os.getenv('SINGLE_FLIGHT_LOCK_TTL', 30.0)),
+        result_ttl=float(os.getenv('SINGLE_FLIGHT_RESULT_TTL', 5.0)),
+    )
@@ -0,0 +1,186 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+from redis.exceptions import RedisError
+from app.lib.rd import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Caches a loaded tier only if the tier was not invalidated since its version was read.
+SET_IF_VERSION_SCRIPT = """
+if (redis.call('get', KEYS[2]) or '') == ARGV[1] then
+    return redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+end
+return 0
+"""
+
+class LocalTTLCache:
+    """
+    Thread safe in-process LRU cache whose entries expire after ttl seconds, or sooner if set with a shorter ttl.
+    """
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl)), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class TierCache:
+    """
+    Two level cache of user tiers, an in-process TTL LRU in front of Redis in front of the database.
+
+    Tiers change only in Paddle webhooks, which call invalidate. It deletes the Redis entry and publishes the user id,
+    every worker listening on the channel drops its local entry, so the change applies on the next request.
+    Invalidations also bump a version per user, a tier loaded before one is not written to Redis afterwards.
+    """
+    def __init__(self, local_ttl: float = 60.0, local_max_entries: int = 10000, redis_ttl: int = 3600,
+                 channel: str = 'tier_cache:invalidate', client=None):
+        self.local = LocalTTLCache(local_max_entries, local_ttl)
+        self.redis_ttl = redis_ttl
+        self.channel = channel
+        self._client = client
+        self.prefix = 'tier_cache'
+        self.metrics = {'local_hits': 0, 'redis_hits': 0, 'misses': 0, 'invalidations': 0}
+        self._generation = 0
+
+    @property
+    def client(self):
+        return self._client or get_redis()
+
+    def _key(self, user_id: str) -> str:
+        return f'{self.prefix}:{user_id}'
+
+    def _version_key(self, user_id: str) -> str:
+        return f'{self.prefix}:{user_id}:version'
+
+    async def get(self, user_id: str, load: Callable[[str], Awaitable[str]]) -> str:
+        """
+        Get the tier of a user, loading it from the database with load on a miss of both levels.
+        """
+        tier = self.local.get(user_id)
+        if tier is not None:
+            self.metrics['local_hits'] += 1
+            return tier
+
+        version = None
+        try:
+            tier, version = await self.client.mget(self._key(user_id), self._version_key(user_id))
+            version = version or ''
+        except RedisError as redis_err:
+            logger.error(f'Error while reading {self.prefix} {redis_err}')
+            tier = None
+
+        if tier is not None:
+            self.metrics['redis_hits'] += 1
+            self.local.set(user_id, tier)
+            return tier
+
+        self.metrics['misses'] += 1
+        generation = self._generation
+        tier = await load(user_id)
+
+        # A tier invalidated while it was loading may be stale, serve it but don't cache it.
+        # The generation covers invalidations seen by this worker, the version those of every worker.
+        if tier is not None and generation == self._generation:
+            self.local.set(user_id, tier)
+            if version is not None:
+                try:
+                    await self.client.eval(SET_IF_VERSION_SCRIPT, 2, self._key(user_id), self._version_key(user_id),
+                                           version, tier, self.redis_ttl)
+                except RedisError as redis_err:
+                    logger.error(f'Error while writing {self.prefix} {redis_err}')
+
+        return tier
+
+    def _drop(self, user_id: str):
+        self._generation += 1
+        self.local.pop(user_id)
+
+    async def invalidate(self, user_id: str):
+        """
+        Drop the cached tier of a user in every worker.
+        """
+        self.metrics['invalidations'] += 1
+        self._drop(user_id)
+
+        try:
+            pipe = self.client.pipeline()
+            pipe.delete(self._key(user_id))
+            pipe.incr(self._version_key(user_id))
+            # Loads take far less than the ttl, the version can expire with the tier it guards.
+            pipe.expire(self._version_key(user_id), self.redis_ttl)
+            pipe.publish(self.channel, user_id)
+            await pipe.execute()
+        except RedisError as redis_err:
+            logger.error(f'Error while invalidating {self.prefix} {redis_err}')
+
+    async def listen(self, retry_delay: float = 1.0):
+        """
+        Drop local entries invalidated by other workers until cancelled. Run it as a background task of the worker.
+        """
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self._drop(message['data'])
+            except RedisError as redis_err:
+                # Invalidations may have been missed while disconnected.
+                logger.error(f'Error while listening {self.prefix} invalidations {redis_err}')
+                self.local.clear()
+                await asyncio.sleep(retry_delay)
+            finally:
+                await pubsub.aclose()
+
+    def stats(self) -> dict:
+        lookups = self.metrics['local_hits'] + self.metrics['redis_hits'] + self.metrics['misses']
+        hits = self.metrics['local_hits'] + self.metrics['redis_hits']
+        return {
+            **self.metrics,
+            'local_entries': len(self.local),
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+        }
+
+def tier_cache_from_env() -> TierCache:
+    """
+    Create a TierCache configured with TIER_CACHE_* environment variables.
+    """
+    return TierCache(
+        local_ttl=float(os.getenv('TIER_CACHE_LOCAL_TTL', 60.0)),
+        local_max_entries=int(os.getenv('TIER_CACHE_LOCAL_MAX_ENTRIES', 10000)),
+        redis_ttl=int(os.getenv('TIER_CACHE_REDIS_TTL', 3600)),
+    )
@@ -0,0 +1,108 @@
+import os
+import time
+import hashlib
+import logging
+from typing import Awaitable, Callable, Optional
+from redis.exceptions import RedisError
+from app.lib.rd import get_redis
+from app.lib.tier_cache import LocalTTLCache
+from app.lib.single_flight import SingleFlight, single_flight_from_env
+
+logger = logging.getLogger(__name__)
+
+class TokenCache:
+    """
+    Cache of bearer tokens to user ids, an in-process TTL LRU in front of Redis in front of the identity provider.
+
+    Keys are a sha256 of the token, so tokens are never stored. Entries live for ttl seconds at most and never
+    outlive the token's expiry when it is known. Concurrent misses for the same token share one resolve call.
+    """
+    def __init__(self, ttl: int = 300, local_ttl: float = 60.0, local_max_entries: int = 10000,
+                 flights: Optional[SingleFlight] = None, client=None):
+        self.ttl = ttl
+        self.local = LocalTTLCache(local_max_entries, local_ttl)
+        self.flights = flights or SingleFlight('token_flight', client=client)
+        self._client = client
+        self.prefix = 'token_cache'
+        self.metrics = {'local_hits': 0, 'redis_hits': 0, 'misses': 0}
+
+    @property
+    def client(self):
+        return self._client or get_redis()
+
+    def _key(self, token_hash: str) -> str:
+        return f'{self.prefix}:{token_hash}'
+
+    def _ttl(self, expires_at: Optional[float]) -> int:
+        if expires_at is None:
+            return self.ttl
+        return min(self.ttl, int(expires_at - time.time()))
+
+    async def get(self, token: str, resolve: Callable[[], Awaitable[tuple[str, Optional[float]]]]) -> str:
+        """
+        Get the user id of a token, calling resolve on a miss of both levels.
+
+        Args:
+            token (str): The bearer token.
+            resolve (Callable): Returns the user id and the expiry timestamp of the token, or None if unknown.
+        Returns:
+            str: The user id.
+        """
+        token_hash = hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+        user_id = self.local.get(token_hash)
+        if user_id is not None:
+            self.metrics['local_hits'] += 1
+            return user_id
+
+        try:
+            pipe = self.client.pipeline()
+            pipe.get(self._key(token_hash))
+            pipe.ttl(self._key(token_hash))
+            user_id, remaining = await pipe.execute()
+        except RedisError as redis_err:
+            logger.error(f'Error while reading {self.prefix} {redis_err}')
+            user_id = None
+
+        if user_id is not None:
+            self.metrics['redis_hits'] += 1
+            if remaining > 0:
+                self.local.set(token_hash, user_id, remaining)
+            return user_id
+
+        self.metrics['misses'] += 1
+
+        async def fetch():
+            user_id, expires_at = await resolve()
+            ttl = self._ttl(expires_at)
+            if ttl > 0:
+                self.local.set(token_hash, user_id, ttl)
+                try:
+                    await self.client.set(self._key(token_hash), user_id, ex=ttl)
+                except RedisError as redis_err:
+                    logger.error(f'Error while writing {self.prefix} {redis_err}')
+            return [user_id, expires_at]
+
+        user_id, _ = await self.flights.run(token_hash, fetch)
+        return user_id
+
+    def stats(self) -> dict:
+        lookups = self.metrics['local_hits'] + self.metrics['redis_hits'] + self.metrics['misses']
+        hits = self.metrics['local_hits'] + self.metrics['redis_hits']
+        return {
+            **self.metrics,
+            'local_entries': len(self.local),
+            'coalesced': self.flights.metrics['coalesced'],
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+        }
+
+def token_cache_from_env() -> TokenCache:
+    """
+    Create a TokenCache configured with TOKEN_CACHE_* environment variables.
+    """
+    return TokenCache(
+        ttl=int(os.getenv('TOKEN_CACHE_TTL', 300)),
+        local_ttl=float(os.getenv('TOKEN_CACHE_LOCAL_TTL', 60.0)),
+        local_max_entries=int(os.getenv('TOKEN_CACHE_LOCAL_MAX_ENTRIES', 10000)),
+        flights=single_flight_from_env('token_flight'),
+    )
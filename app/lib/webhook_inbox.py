@@ -0,0 +1,185 @@
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+from pymongo.errors import DuplicateKeyError
+from redis.exceptions import RedisError
+from app.lib.rd import get_redis
+from app.lib.single_flight import RELEASE_LOCK_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+EVENT_PENDING = 'pending'
+EVENT_PROCESSED = 'processed'
+EVENT_FAILED = 'failed'
+
+class WebhookInbox:
+    """
+    Durable inbox of webhook events, stored in a collection under their event id before they are acknowledged.
+
+    A retried delivery of a stored event is recognized and dropped. Stored events are applied in the background,
+    in batches and in the order they occurred. One worker at a time processes the inbox, holding a Redis lock, so
+    events of the same subscription are never applied concurrently or out of order. A batch that fails is retried
+    up to max_attempts times before its events are marked failed, later events wait for it.
+    """
+    def __init__(self, collection, apply: Callable[[list[dict]], Awaitable[None]], name: str = 'webhook_inbox',
+                 batch_size: int = 100, poll_interval: float = 5.0, lock_ttl: float = 60.0, max_attempts: int = 5,
+                 retention: int = 30 * 24 * 3600, client=None):
+        self.collection = collection
+        self.apply = apply
+        self.name = name
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lock_ttl = lock_ttl
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self._client = client
+        self._wake = asyncio.Event()
+        self.metrics = {'received': 0, 'duplicates': 0, 'processed': 0, 'batches': 0, 'batch_errors': 0, 'failed': 0}
+
+    @property
+    def client(self):
+        return self._client or get_redis()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([('status', 1), ('occurred_at', 1)])
+        # Processed events are kept long enough to recognize retried deliveries, pending ones have no processed_at.
+        await self.collection.create_index('processed_at', expireAfterSeconds=self.retention)
+
+    async def receive(self, event_id: str, event_type: str, occurred_at: Optional[str], payload: Any) -> bool:
+        """
+        Store an event for processing.
+
+        Returns:
+            bool: False if the event was already received.
+        """
+        try:
+            await self.collection.insert_one({
+                '_id': event_id,
+                'event_type': event_type,
+                'occurred_at': occurred_at or datetime.now(timezone.utc).isoformat(),
+                'payload': payload,
+                'status': EVENT_PENDING,
+                'attempts': 0,
+                'received_at': datetime.now(timezone.utc),
+            })
+        except DuplicateKeyError:
+            self.metrics['duplicates'] += 1
+            return False
+
+        self.metrics['received'] += 1
+        self._wake.set()
+        return True
+
+    async def _lock(self) -> Optional[str]:
+        token = uuid.uuid4().hex
+        try:
+            if await self.client.set(f'{self.name}:lock', token, nx=True, px=int(self.lock_ttl * 1000)):
+                return token
+            return None
+        except RedisError as redis_err:
+            # Applying events is idempotent, processing without the lock only risks doing it twice.
+            logger.error(f'Error while taking {self.name} lock {redis_err}')
+            return ''
+
+    async def _unlock(self, token: str):
+        if not token:
+            return
+        try:
+            await self.client.eval(RELEASE_LOCK_SCRIPT, 1, f'{self.name}:lock', token)
+        except RedisError as redis_err:
+            logger.error(f'Error while releasing {self.name} lock {redis_err}')
+
+    async def _apply_batch(self, events: list[dict]) -> bool:
+        ids = [event['_id'] for event in events]
+        self.metrics['batches'] += 1
+
+        try:
+            await self.apply(events)
+        except Exception as e:
+            self.metrics['batch_errors'] += 1
+            logger.error(f'Error while applying {len(events)} {self.name} events {e}')
+            await self.collection.update_many({'_id': {'$in': ids}},
+                                              {'$inc': {'attempts': 1}, '$set': {'error': str(e)}})
+            res = await self.collection.update_many(
+                {'_id': {'$in': ids}, 'attempts': {'$gte': self.max_attempts}},
+                {'$set': {'status': EVENT_FAILED}}
+            )
+            self.metrics['failed'] += res.modified_count
+            return False
+
+        await self.collection.update_many(
+            {'_id': {'$in': ids}},
+            {'$set': {'status': EVENT_PROCESSED, 'processed_at': datetime.now(timezone.utc)}}
+        )
+        self.metrics['processed'] += len(events)
+        return True
+
+    async def process(self) -> int:
+        """
+        Apply pending events until none are left, unless another worker is processing them.
+
+        Returns:
+            int: The number of events applied.
+        """
+        token = await self._lock()
+        if token is None:
+            return 0
+
+        processed = 0
+        try:
+            while True:
+                cursor = self.collection.find({'status': EVENT_PENDING})
+                events = await cursor.sort([('occurred_at', 1), ('received_at', 1)]).limit(self.batch_size).to_list(None)
+                if not events or not await self._apply_batch(events):
+                    break
+
+                processed += len(events)
+                if len(events) < self.batch_size:
+                    break
+        finally:
+            await self._unlock(token)
+
+        return processed
+
+    async def run(self):
+        """
+        Process received events until cancelled, right after a receive in this worker and every poll_interval
+        for events received by others. Run it as a background task of the worker.
+        """
+        try:
+            await self.ensure_indexes()
+        except Exception as e:
+            logger.error(f'Error while creating {self.name} indexes {e}')
+
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            try:
+                await self.process()
+            except Exception as e:
+                logger.error(f'Error while processing {self.name} {e}')
+
+    def stats(self) -> dict:
+        return dict(self.metrics)
+
+def webhook_inbox_from_env(collection, apply: Callable[[list[dict]], Awaitable[None]], name: str) -> WebhookInbox:
+    """
+    Create a WebhookInbox configured with WEBHOOK_INBOX_* environment variables.
+    """
+    return WebhookInbox(
+        collection,
+        apply,
+        name=name,
+        batch_size=int(os.getenv('WEBHOOK_INBOX_BATCH_SIZE', 100)),
+        poll_interval=float(os.getenv('WEBHOOK_INBOX_POLL_INTERVAL', 5.0)),
+        lock_ttl=float(os.getenv('WEBHOOK_INBOX_LOCK_TTL', 60.0)),
+        max_attempts=int(os.getenv('WEBHOOK_INBOX_MAX_ATTEMPTS', 5)),
+        retention=int(os.getenv('WEBHOOK_INBOX_RETENTION', 30 * 24 * 3600)),
+    )
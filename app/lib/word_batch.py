@@ -0,0 +1,85 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import AsyncIterator, Callable, Optional
+from app.lib.cache import RedisCache
+from app.lib.metrics import register_metrics
+from word.wordkit import get_word_infos, load_wordkit
+
+logger = logging.getLogger(__name__)
+
+# WordNet results only change with the NLTK data, they are cached for a week by default.
+word_info_cache = RedisCache(
+    'word_info_cache',
+    ttl=int(os.getenv('WORD_INFO_CACHE_TTL', 7 * 24 * 3600)),
+    max_entries=int(os.getenv('WORD_INFO_CACHE_MAX_ENTRIES', 100000)),
+)
+register_metrics('word_info_cache')(word_info_cache.stats)
+
+def create_word_pool(workers: Optional[int] = None) -> Optional[Executor]:
+    """
+    Create the pool of processes that look words up in WordNet, lookups are CPU bound Python and hold the GIL.
+    Every process loads WordNet once when it starts. With WORD_INFO_WORKERS=0 lookups run on the default
+    thread pool of the event loop instead.
+    """
+    if workers is None:
+        workers = int(os.getenv('WORD_INFO_WORKERS', min(4, os.cpu_count() or 1)))
+    if workers <= 0:
+        return None
+
+    # Spawned, forking a process with a running event loop and client threads is not safe.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=load_wordkit)
+
+def normalize_words(words: list[str]) -> list[str]:
+    """
+    Lowercase and deduplicate words, keeping their first position.
+    """
+    return list(dict.fromkeys(word.strip().lower() for word in words if word.strip()))
+
+def word_info_line(word: str, info: dict) -> dict:
+    if info.get('pos') is None:
+        return {"word": word, "error": "Word not found."}
+    return {"word": word, "info": info}
+
+async def stream_word_infos(words: list[str], executor: Optional[Executor], cache: RedisCache = word_info_cache,
+                            compute: Callable[[list[str]], list[tuple[str, dict]]] = get_word_infos,
+                            chunk_size: int = 25) -> AsyncIterator[dict]:
+    """
+    Yield the information of each distinct word, cached words first and the others as their chunk is computed.
+
+    Args:
+        words (list[str]): The words, duplicates are looked up once.
+        executor (Executor): Pool the chunks are computed on, None for the default thread pool.
+        compute (Callable): Looks a chunk of words up, runs in the executor.
+        chunk_size (int): Words per task, small enough for the first results to arrive early.
+    """
+    unique = normalize_words(words)
+    cached = await cache.get_many([cache.make_key(word) for word in unique])
+
+    missing = []
+    for word, info in zip(unique, cached):
+        if info is None:
+            missing.append(word)
+        else:
+            yield word_info_line(word, info)
+
+    if not missing:
+        return
+
+    loop = asyncio.get_running_loop()
+    futures = [loop.run_in_executor(executor, compute, missing[i:i + chunk_size])
+               for i in range(0, len(missing), chunk_size)]
+
+    try:
+        for future in asyncio.as_completed(futures):
+            results = await future
+            await cache.set_many({cache.make_key(word): info for word, info in results})
+            for word, info in results:
+                yield word_info_line(word, info)
+    finally:
+        # Chunks that have not started are dropped when the client goes away or a chunk fails.
+        for future in futures:
+            future.cancel()
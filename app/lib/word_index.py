@@ -0,0 +1,247 @@
+import re
+import time
+import asyncio
+import argparse
+import logging
+from typing import AsyncIterator, Optional
+from datetime import datetime, timezone
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import OperationFailure
+from app.models.async_database import db, sentences_collection
+from app.lib.sentence_cache import invalidate_categories
+
+logger = logging.getLogger(__name__)
+
+# Inverted index of the sentences collection. Every entry maps one lowercased token to one sentence id.
+# Category and length are copied from the sentence so filters can be resolved on the index alone.
+word_index_collection = db['wordIndex']
+
+# Marker of the last complete build, searches use the index only once it exists.
+index_status_collection = db['indexStatus']
+
+INDEXED_FIELDS = ('category', 'length')
+
+TOKEN_REGEX = re.compile(r'\w+')
+
+# Sentence changes that update the index, followed by the watcher and replayed after rebuilds.
+CHANGE_PIPELINE = [{'$match': {'operationType': {'$in': ['insert', 'update', 'replace', 'delete']}}}]
+
+def tokenize(text: str) -> set[str]:
+    """
+    Split a text into the set of lowercased word tokens used as keys of the index.
+    """
+    return set(TOKEN_REGEX.findall(text.lower()))
+
+def lookup_token(word: str) -> Optional[str]:
+    """
+    Pick the token used to resolve candidates for a searched word or phrase.
+    Longest token is used since it is usually the rarest one. Returns None if the word has no tokens.
+    """
+    tokens = tokenize(word)
+    if not tokens:
+        return None
+
+    return max(tokens, key=len)
+
+def build_entries(sentence: dict) -> list[dict]:
+    """
+    Build index entries for a sentence document. Sentence should contain at least '_id' and 'text'.
+    """
+    return [
+        {
+            'word': token,
+            'sentence_id': sentence['_id'],
+            **{field: sentence.get(field) for field in INDEXED_FIELDS}
+        }
+        for token in tokenize(sentence.get('text') or '')
+    ]
+
+class IndexStatus:
+    """
+    Whether a complete build of the index exists. Until the marker is written, the status is read again every
+    recheck_interval seconds, once it exists it stays ready since rebuilds replace the index in one rename.
+    """
+    def __init__(self, recheck_interval: float = 60.0):
+        self.recheck_interval = recheck_interval
+        self._ready = False
+        self._checked_at = float('-inf')
+
+    async def is_ready(self) -> bool:
+        if self._ready or time.monotonic() - self._checked_at < self.recheck_interval:
+            return self._ready
+
+        self._checked_at = time.monotonic()
+        try:
+            self._ready = await index_status_collection.find_one({'_id': word_index_collection.name}) is not None
+        except Exception as e:
+            logger.error(f'Error while reading word index status {e}')
+        return self._ready
+
+index_status = IndexStatus()
+
+async def ensure_indexes(collection=None):
+    collection = collection if collection is not None else word_index_collection
+    # Scans for one word are ordered by sentence id, category and length are filtered from the index keys.
+    await collection.create_index(
+        [('word', ASCENDING), ('sentence_id', ASCENDING), ('category', ASCENDING), ('length', ASCENDING)],
+        unique=True
+    )
+    await collection.create_index('sentence_id')
+
+async def index_sentences(sentences: list[dict]):
+    """
+    Add or update index entries for ingested sentences. Call this whenever new sentences are saved.
+    """
+    operations = [
+        UpdateOne({'word': entry['word'], 'sentence_id': entry['sentence_id']}, {'$set': entry}, upsert=True)
+        for sentence in sentences
+        for entry in build_entries(sentence)
+    ]
+
+    if operations:
+        await word_index_collection.bulk_write(operations, ordered=False)
+
+    # Cached search pages of these categories may miss the new sentences.
+    await invalidate_categories({sentence.get('category') for sentence in sentences})
+
+async def remove_sentences(sentence_ids: list):
+    """
+    Remove index entries of deleted sentences.
+    """
+    # Entries carry the category of their sentence, cached pages of those categories may show the removed sentences.
+    categories = await word_index_collection.distinct('category', {'sentence_id': {'$in': sentence_ids}})
+    await word_index_collection.delete_many({'sentence_id': {'$in': sentence_ids}})
+    await invalidate_categories(set(categories))
+
+async def iter_candidate_ids(word: str, filter_query: dict, after=None, batch_size: int = 500) -> AsyncIterator[list]:
+    """
+    Yield batches of sentence ids that contain the word, ordered by sentence id.
+    Category and length filters are taken from the filter query of the sentences collection.
+
+    Args:
+        word (str): The searched word or phrase.
+        filter_query (dict): Filter query built for the sentences collection.
+        after (optional): Only yield sentence ids greater than this one.
+        batch_size (int): Number of ids to yield per batch.
+    """
+    index_query = {
+        'word': lookup_token(word),
+        **{field: filter_query[field] for field in INDEXED_FIELDS if field in filter_query}
+    }
+
+    if after is not None:
+        index_query['sentence_id'] = {'$gt': after}
+
+    while True:
+        entries = word_index_collection.find(index_query, {'_id': 0, 'sentence_id': 1}).sort('sentence_id', ASCENDING).limit(batch_size)
+        candidate_ids = [entry['sentence_id'] async for entry in entries]
+
+        if not candidate_ids:
+            return
+
+        yield candidate_ids
+
+        if len(candidate_ids) < batch_size:
+            return
+
+        index_query['sentence_id'] = {'$gt': candidate_ids[-1]}
+
+async def rebuild_index(batch_size: int = 1000) -> int:
+    """
+    Rebuild the whole index from the sentences collection. The new index is built in a separate collection and
+    renamed over the live one when complete, so searches keep using the previous index meanwhile.
+    Changes of sentences during the build went to the replaced collection, they are replayed after the rename.
+
+    Returns:
+        int: Number of indexed sentences.
+    """
+    build_collection = db[f'{word_index_collection.name}_build']
+    await build_collection.drop()
+    await ensure_indexes(build_collection)
+
+    try:
+        # Opened before the scan, the stream holds every change the scan may miss.
+        stream = await sentences_collection.watch(CHANGE_PIPELINE, full_document='updateLookup')
+    except OperationFailure as e:
+        logger.warning(f'Change streams are not available, updates and deletes during the build are not replayed {e}')
+        stream = None
+
+    try:
+        count = 0
+        batch = []
+        last_id = None
+        projection = {'_id': 1, 'text': 1, **{field: 1 for field in INDEXED_FIELDS}}
+        async for sentence in sentences_collection.find({}, projection).sort('_id', ASCENDING):
+            batch.append(sentence)
+            last_id = sentence['_id']
+            if len(batch) >= batch_size:
+                count += await _insert_batch(build_collection, batch)
+                batch = []
+
+        count += await _insert_batch(build_collection, batch)
+        await build_collection.rename(word_index_collection.name, dropTarget=True)
+
+        if stream is not None:
+            # Changes after the stream runs dry are applied to the new index by the watcher.
+            while (change := await stream.try_next()) is not None:
+                await apply_change(change)
+                count += change['operationType'] == 'insert'
+        else:
+            newer = await sentences_collection.find({'_id': {'$gt': last_id}} if last_id is not None else {}, projection).to_list()
+            await index_sentences(newer)
+            count += len(newer)
+    finally:
+        if stream is not None:
+            await stream.close()
+
+    await index_status_collection.replace_one(
+        {'_id': word_index_collection.name},
+        {'built_at': datetime.now(timezone.utc), 'sentences': count},
+        upsert=True
+    )
+    logger.info(f'Indexed {count} sentences.')
+    return count
+
+async def _insert_batch(collection, batch: list[dict]) -> int:
+    entries = [entry for sentence in batch for entry in build_entries(sentence)]
+    if entries:
+        await collection.insert_many(entries, ordered=False)
+
+    return len(batch)
+
+async def apply_change(change: dict):
+    """
+    Update the index for one change of the sentences collection.
+    """
+    sentence_id = change['documentKey']['_id']
+
+    if change['operationType'] != 'insert':
+        await remove_sentences([sentence_id])
+
+    if change.get('fullDocument'):
+        await index_sentences([change['fullDocument']])
+
+async def watch_sentences():
+    """
+    Keep the index up to date with sentences saved by other services using a change stream.
+    """
+    async with await sentences_collection.watch(CHANGE_PIPELINE, full_document='updateLookup') as stream:
+        async for change in stream:
+            await apply_change(change)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the inverted word index of the sentences collection.")
+    parser.add_argument('command', choices=['rebuild', 'watch'], help="rebuild: build a new index and replace the current one, watch: follow new sentences")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Number of sentences per write batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        if args.command == 'rebuild':
+            await rebuild_index(args.batch_size)
+        else:
+            await ensure_indexes()
+            await watch_sentences()
+
+    asyncio.run(main())
@@ -1,15 +1,82 @@
 from fastapi import FastAPI
+from contextlib import asynccontextmanager
 from app.routes.sentences import router as sentences_route
 from app.routes.ai import router as ai_route
-from app.routes.paddle.server import router as paddle_route
+from app.routes.paddle.server import router as paddle_route, price_catalog, price_fetcher
+from app.routes.paddle.events import paddle_inbox
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes.wordInfo import router as wordInfo_route
+from app.routes.metrics import router as metrics_route
 from app.error_handlers.handlers import setup_exception_handlers
+from word.spacyWord import get_similarity_engine
+from word.word_assistant import WordAssistant
+from word.wordkit import warm_word_info
+from word.lexicon import get_lexicon
+from app.utils.request_helpers import get_chat_completion, get_hf_completion
+from app.lib.provider_router import backend_from_env, router_from_env
+from app.lib.metrics import register_metrics
+from app.lib.request import run_request_metrics_reconciler
+from app.user.user import tier_cache
+from app.lib.resources import create_resources
+import asyncio
+import threading
 import nltk
 import os
-import sys
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the spaCy model once per process before serving requests.
+    await asyncio.to_thread(get_similarity_engine)
+
+    # Map the WordNet and Brown snapshot, word lookups then don't load the NLTK corpora.
+    get_lexicon()
+
+    # Pooled clients of the worker, shared by every request. Tests and benchmarks can set
+    # app.state.resource_overrides to run against local stand-ins.
+    resources = create_resources(getattr(app.state, 'resource_overrides', None))
+    app.state.resources = resources
+
+    llm_client = resources['llm']
+    backends = [backend_from_env('deepseek', lambda *args: get_chat_completion(llm_client, *args))]
+
+    # Hugging Face inference is the fallback of DeepSeek when HF_API_KEY is set.
+    hf_client = resources['hf']
+    if hf_client:
+        backends.append(backend_from_env('huggingface', lambda content, temperature, response_format:
+                                         get_hf_completion(hf_client, os.getenv('HF_API_KEY'), content, response_format)))
+
+    router = router_from_env(backends)
+    register_metrics('ai_providers')(router.stats)
+    app.state.word_assistant = WordAssistant(llm_client, router=router)
+
+    # Request counts live in Redis, the userMetrics collection is updated in the background.
+    resources.start_task(run_request_metrics_reconciler(
+        float(os.getenv('REQUEST_METRICS_RECONCILE_INTERVAL', 10.0)),
+        int(os.getenv('REQUEST_METRICS_FLUSH_SIZE', 500))
+    ))
+
+    # Tier changes of Paddle webhooks handled by other workers are published on a Redis channel.
+    resources.start_task(tier_cache.listen())
+
+    # Preload the info of the most frequent words in the background, first lookups of common words hit memory.
+    # Skipped when the launcher already warmed it before forking, set on shutdown so the thread stops early.
+    warmup_stop = threading.Event()
+    resources.start_task(asyncio.to_thread(warm_word_info, int(os.getenv('WORD_INFO_WARMUP', 5000)), warmup_stop))
+
+    # Paddle webhooks are acknowledged once stored, their events are applied here in batches.
+    resources.start_task(paddle_inbox.run())
+
+    # The Paddle price list is fetched in the background, the pricing page never waits for Paddle.
+    resources.start_task(price_catalog.run(price_fetcher(resources['paddle']),
+                                           float(os.getenv('PRICE_CATALOG_REFRESH_INTERVAL', 60.0))))
+
+    try:
+        yield
+    finally:
+        warmup_stop.set()
+        await resources.close()
+
+app = FastAPI(lifespan=lifespan)
 
 #Setup all exception handlers
 setup_exception_handlers(app)
@@ -26,12 +93,7 @@ app.include_router(sentences_route, prefix="/api", tags=["Sentences"])
 app.include_router(ai_route, prefix="/api", tags=["AI"])
 app.include_router(wordInfo_route, prefix="/api", tags=["WordInfo"])
 app.include_router(paddle_route, prefix="/api", tags=["Paddle"])
-
-async def validate_env():
-    if not os.getenv("DEEPSEEK_API_KEY"):
-        import logging
-        logging.error("DEEPSEEK_API_KEY is not set in the environment.")
-        sys.exit("Missing DEEPSEEK_API_KEY")
+app.include_router(metrics_route, prefix="/api", tags=["Metrics"])
 
 nltk.data.path.append(os.getenv("NLTK_DATA", "./nltk_data"))
 
@@ -39,7 +101,7 @@ nltk.data.path.append(os.getenv("NLTK_DATA", "./nltk_data"))
 async def root():
     return 'Welcome to articlew backend app!'
 
-# Run the app
+# Run the app, WEB_WORKERS=N forks N workers that share the preloaded spaCy model and NLTK data.
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    from app.launcher import run
+    run(app)
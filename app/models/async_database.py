@@ -0,0 +1,35 @@
+from pymongo import AsyncMongoClient, errors
+import os
+from dotenv import load_dotenv
+import logging
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Retrieve environment variables
+mongo_uri = os.getenv('DATABASE_URI')
+mongo_db = os.getenv('MONGO_DB')
+
+# Check if environment variables are set
+if not mongo_uri or not mongo_db:
+    raise ValueError("Environment variables DATABASE_URI or MONGO_DB are not set.")
+
+# Connection pool settings, shared by all requests of a worker.
+POOL_OPTIONS = {
+    'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', 100)),
+    'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 10)),
+    'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000)),
+    'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000)),
+    'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+}
+
+try:
+    # asyncio native client, connections are opened on first use and never block the event loop.
+    client = AsyncMongoClient(mongo_uri, **POOL_OPTIONS)
+    db = client[mongo_db]  # Access the database
+    sentences_collection = db['sentences']  # Access the sentences collection
+except errors.ConfigurationError as exc:
+    logger.error(f'Database configuration failed. {exc}')
+    raise
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional, Annotated
 
 class WordInfo(BaseModel):
     definition: str
@@ -12,9 +12,25 @@ class WordInfoResponse(BaseModel):
     noun: List[WordInfo]
     pos : str
 
+class WordInfoBatchRequest(BaseModel):
+    words: List[Annotated[str, Field(min_length=1, max_length=30, strip_whitespace=True)]] = Field(..., min_length=1, max_length=1000)
+
 class WordSimilarityResponse(BaseModel):
     score: float
 
 class WordSimilarityRequest(BaseModel):
     word1: str = Field(..., min_length=1, max_length=12, strip_whitespace=True)
-    word2: str = Field(..., min_length=1, max_length=12, strip_whitespace=True)
\ No newline at end of file
+    word2: str = Field(..., min_length=1, max_length=12, strip_whitespace=True)
+
+class WordSimilarityBatchRequest(BaseModel):
+    anchor: str = Field(..., min_length=1, max_length=30, strip_whitespace=True)
+    candidates: List[Annotated[str, Field(min_length=1, max_length=30, strip_whitespace=True)]] = Field(..., min_length=1, max_length=500)
+    top_k: Optional[int] = Field(None, ge=1, le=500)
+
+class WordScore(BaseModel):
+    word: str
+    score: float
+
+class WordSimilarityBatchResponse(BaseModel):
+    anchor: str
+    scores: List[WordScore]
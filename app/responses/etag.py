@@ -0,0 +1,14 @@
+from typing import Optional
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an entity tag, weak tags compare equal to strong ones.
+    """
+    if not if_none_match:
+        return False
+
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag.removeprefix('W/').strip('"') == etag:
+            return True
+    return False
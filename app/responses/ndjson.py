@@ -0,0 +1,45 @@
+import json
+import logging
+from typing import AsyncIterator
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+def format_ndjson_line(item: dict) -> str:
+    """
+    Format one newline delimited JSON line.
+    """
+    return json.dumps(item, separators=(',', ':')) + "\n"
+
+async def ndjson_response(items: AsyncIterator[dict]) -> StreamingResponse:
+    """
+    Stream dicts as newline delimited JSON, one line each, so clients can use results as they arrive.
+    The first item is awaited before the response starts, so errors before it keep their status code.
+    Later errors are sent as a last line with an 'error' object.
+    """
+    try:
+        first = await anext(items)
+    except StopAsyncIteration:
+        first = None
+
+    async def stream():
+        try:
+            if first is not None:
+                yield format_ndjson_line(first)
+                async for item in items:
+                    yield format_ndjson_line(item)
+        except HTTPException as http_exc:
+            yield format_ndjson_line({'error': {'status_code': http_exc.status_code, 'detail': http_exc.detail}})
+        except Exception as e:
+            logger.error(f'Error while streaming NDJSON {e}')
+            yield format_ndjson_line({'error': {'status_code': 500, 'detail': 'Internal Server Error'}})
+        finally:
+            # Stop the remaining work when the client goes away mid stream.
+            await items.aclose()
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
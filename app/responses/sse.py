@@ -0,0 +1,46 @@
+import json
+import logging
+from typing import AsyncIterator
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+def format_sse_event(event: str, data: dict) -> str:
+    """
+    Format one server-sent event with a JSON payload.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def sse_response(events: AsyncIterator[tuple[str, dict]]) -> StreamingResponse:
+    """
+    Stream (event, data) pairs as server-sent events, followed by a 'done' event.
+    The first event is awaited before the response starts, so errors before it (like a full AI queue)
+    keep their status code and headers. Later errors are sent as an 'error' event.
+    """
+    try:
+        first = await anext(events)
+    except StopAsyncIteration:
+        first = None
+
+    async def stream():
+        try:
+            if first is not None:
+                yield format_sse_event(*first)
+                async for event, data in events:
+                    yield format_sse_event(event, data)
+            yield format_sse_event('done', {})
+        except HTTPException as http_exc:
+            yield format_sse_event('error', {'status_code': http_exc.status_code, 'detail': http_exc.detail})
+        except ValueError as v_err:
+            logger.error(f'Invalid streamed AI response {v_err}')
+            yield format_sse_event('error', {'status_code': 500, 'detail': str(v_err)})
+        finally:
+            # Release the upstream call and its slot when the client goes away mid stream.
+            await events.aclose()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
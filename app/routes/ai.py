@@ -1,10 +1,9 @@
-from fastapi import APIRouter , HTTPException, Path
+from fastapi import APIRouter , HTTPException, Path, Request
 from typing import Literal
 from app.models.aiResponse import *
 from word.word_assistant import WordAssistant
 from app.responses.validate import validate_json_response
 from dotenv import load_dotenv
-import os
 from urllib.parse import unquote
 import json
 import logging
@@ -12,21 +11,32 @@ from typing import Annotated
 from fastapi import Depends
 from app.user.extract_jwt_token import get_user_id
 from app.lib.request import track_requests
+from app.user.user import get_user_tier
+from app.responses.sse import sse_response
 
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
-api_key = os.getenv('DEEPSEEK_API_KEY')
-word_assistant = WordAssistant(api_key)
 
 router = APIRouter()
 
+def get_word_assistant(request: Request) -> WordAssistant:
+    """
+    Get the WordAssistant created in the app lifespan with the shared LLM client.
+    """
+    return request.app.state.word_assistant
+
+async def get_request_tier(user_id : Annotated[str, Depends(get_user_id)]) -> str:
+    """
+    Get the tier of the user, AI calls of higher tiers are served first when the provider is busy.
+    """
+    return await get_user_tier(user_id)
+
 @router.get("/generate/{word}", response_model=AIFeedbackResponse, response_description="Check if word is valid and generate a response about how this word is used in a sentence.")
-async def generate_response(user_id : Annotated[str, Depends(get_user_id)], word: str = Path(description="The word to generate a response about", min_length=1, max_length=30)):
-    #Check for request limit.
-    track_requests(user_id, 'generateReq')
-    results = await word_assistant.analyze_word(word)
+async def generate_response(user_id : Annotated[str, Depends(get_user_id)], word_assistant: Annotated[WordAssistant, Depends(get_word_assistant)], tier: Annotated[str, Depends(get_request_tier)], word: str = Path(description="The word to generate a response about", min_length=1, max_length=30)):
+    #Check for request limit. Cached answers may skip the check, see AI_CACHE_SKIP_QUOTA.
+    results = await word_assistant.analyze_word(word, charge=lambda: track_requests(user_id, 'generateReq'), tier=tier)
 
     if not results: 
         logger.warning('Response from AI is not a string or it is empty')
@@ -38,52 +48,94 @@ async def generate_response(user_id : Annotated[str, Depends(get_user_id)], word
 @router.get("/analysis/{sentence}/{word}", response_model=AIBasicResponse, response_description="Analyze a sentence and generate a response about its grammar structure.")
 async def analyze_sentence(
     user_id : Annotated[str, Depends(get_user_id)],
+    word_assistant: Annotated[WordAssistant, Depends(get_word_assistant)],
+    tier: Annotated[str, Depends(get_request_tier)],
     sentence: str = Path(description="The sentence to analyze", min_length=1, max_length=400),
     word: str = Path(description="The word to analyze", min_length=1, max_length=30),):
 
     #Check for request limit.
-    track_requests(user_id, 'grammarReq')
+    await track_requests(user_id, 'grammarReq')
 
     sentence = unquote(sentence) # filter out special characters from url like ? , . etc
-    results = await word_assistant.analyze_sentence_with_word(sentence, word)
+    results = await word_assistant.analyze_sentence_with_word(sentence, word, tier=tier)
     
     return {"response": results}
 
+@router.get("/analysis/{sentence}/{word}/stream", response_description="Stream the sentence analysis as server-sent events, one 'token' event per chunk of text.")
+async def analyze_sentence_stream(
+    user_id : Annotated[str, Depends(get_user_id)],
+    word_assistant: Annotated[WordAssistant, Depends(get_word_assistant)],
+    tier: Annotated[str, Depends(get_request_tier)],
+    sentence: str = Path(description="The sentence to analyze", min_length=1, max_length=400),
+    word: str = Path(description="The word to analyze", min_length=1, max_length=30),):
+
+    #Check for request limit before the stream starts, errors can't change the status code afterwards.
+    await track_requests(user_id, 'grammarReq')
+
+    sentence = unquote(sentence) # filter out special characters from url like ? , . etc
+    return await sse_response(word_assistant.stream_sentence_analysis(sentence, word, tier=tier))
+
 @router.get("/grammar/{sentence}", response_model=FixGrammarResponse, response_description="Fix all grammar errors in a sentence. Additionally fixing spelling errors or typos.")
-async def fix_grammar(user_id : Annotated[str, Depends(get_user_id)], sentence : str = Path(description="The sentence to fix", min_length=1, max_length=500)):
+async def fix_grammar(user_id : Annotated[str, Depends(get_user_id)], word_assistant: Annotated[WordAssistant, Depends(get_word_assistant)], tier: Annotated[str, Depends(get_request_tier)], sentence : str = Path(description="The sentence to fix", min_length=1, max_length=500)):
 
     #Check for request limit.
-    track_requests(user_id, 'fixSentenceReq')
+    await track_requests(user_id, 'fixSentenceReq')
 
     sentence = unquote(sentence) # filter out special characters from url like ? , . etc
-    results = await word_assistant.fix_grammar_errors(sentence)
+    results = await word_assistant.fix_grammar_errors(sentence, tier=tier)
     return {"original_sentence": results[0], "corrected_sentence": results[1], "raw_sentence": results[2]}
+
+@router.get("/grammar/{sentence}/stream", response_description="Stream the grammar fix as server-sent events, 'token' events followed by one 'result' event.")
+async def fix_grammar_stream(user_id : Annotated[str, Depends(get_user_id)], word_assistant: Annotated[WordAssistant, Depends(get_word_assistant)], tier: Annotated[str, Depends(get_request_tier)], sentence : str = Path(description="The sentence to fix", min_length=1, max_length=500)):
+
+    #Check for request limit before the stream starts, errors can't change the status code afterwards.
+    await track_requests(user_id, 'fixSentenceReq')
+
+    sentence = unquote(sentence) # filter out special characters from url like ? , . etc
+    return await sse_response(word_assistant.stream_grammar_fix(sentence, tier=tier))
     
 @router.get("/paraphrase/{sentence}/{context}" , response_model=ParaphraseResponse, response_description="Generate a paraphrase of a sentence.")
 async def generate_paraphrase(
     user_id : Annotated[str, Depends(get_user_id)],
+    word_assistant: Annotated[WordAssistant, Depends(get_word_assistant)],
+    tier: Annotated[str, Depends(get_request_tier)],
     sentence : str = Path(description="The sentence to paraphrase", min_length=1, max_length=200),
     context: Literal['Casual', 'Formal', 'Sortened', 'Extended', 'Academic'] = Path(description="Context for the paraphrase", min_length=1, max_length=20),
     ):
     
     #Check for request limit.
-    track_requests(user_id, 'paraphraseReq')
+    await track_requests(user_id, 'paraphraseReq')
 
     sentence = unquote(sentence) # filter out special characters from url like ? , . etc
-    results = await word_assistant.paraphrase(sentence, context=context)
+    results = await word_assistant.paraphrase(sentence, context=context, tier=tier)
     return {"paraphrase": results}
 
+@router.get("/paraphrase/{sentence}/{context}/stream", response_description="Stream paraphrases as server-sent events, one 'sentence' event per finished paraphrase.")
+async def generate_paraphrase_stream(
+    user_id : Annotated[str, Depends(get_user_id)],
+    word_assistant: Annotated[WordAssistant, Depends(get_word_assistant)],
+    tier: Annotated[str, Depends(get_request_tier)],
+    sentence : str = Path(description="The sentence to paraphrase", min_length=1, max_length=200),
+    context: Literal['Casual', 'Formal', 'Sortened', 'Extended', 'Academic'] = Path(description="Context for the paraphrase", min_length=1, max_length=20),
+    ):
+
+    #Check for request limit before the stream starts, errors can't change the status code afterwards.
+    await track_requests(user_id, 'paraphraseReq')
+
+    sentence = unquote(sentence) # filter out special characters from url like ? , . etc
+    return await sse_response(word_assistant.stream_paraphrase(sentence, context=context, tier=tier))
+
 @router.get("/compare/{word1}/{word2}", response_model=CompareResponse, response_description="Compare two words and generate a response about their similarities and differences.")
 async def compare(
     user_id : Annotated[str, Depends(get_user_id)],
+    word_assistant: Annotated[WordAssistant, Depends(get_word_assistant)],
+    tier: Annotated[str, Depends(get_request_tier)],
     word1: str = Path(description="The first word to compare", min_length=1, max_length=30),
     word2: str = Path(description="The second word to compare", min_length=1, max_length=30),
     ):
 
-    #Check for request limit.
-    track_requests(user_id, 'compareWordsReq')
-
-    results = await word_assistant.compare_words(word1, word2)
+    #Check for request limit. Cached answers may skip the check, see AI_CACHE_SKIP_QUOTA.
+    results = await word_assistant.compare_words(word1, word2, charge=lambda: track_requests(user_id, 'compareWordsReq'), tier=tier)
 
     if not results:
         logger.warning('Response from AI is not a string or it is empty')
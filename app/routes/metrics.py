@@ -0,0 +1,27 @@
+import os
+import hmac
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.lib.metrics import collect_metrics
+
+router = APIRouter()
+
+security = HTTPBearer(
+    description="Metrics token of the operators, set with METRICS_TOKEN",
+    auto_error=False
+)
+
+async def verify_metrics_token(credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]):
+    # Metrics expose internals of the worker, they are disabled unless a token is configured.
+    token = os.getenv('METRICS_TOKEN')
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if credentials is None or not hmac.compare_digest(credentials.credentials.encode('utf-8'), token.encode('utf-8')):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={'WWW-Authenticate': 'Bearer'})
+
+@router.get("/metrics", response_description="Cache, coalescing and queue metrics of this worker",
+            dependencies=[Depends(verify_metrics_token)])
+async def metrics():
+    return await collect_metrics()
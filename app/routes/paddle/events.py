@@ -1,91 +1,36 @@
-from app.models.database import db
-from fastapi import HTTPException
-from pymongo import ReturnDocument
+from app.models.async_database import db
+from pymongo import UpdateOne
 from app.routes.paddle.utils import *
-from app.routes.paddle.operations import *
+from app.user.user import tier_cache
+from app.lib.webhook_inbox import webhook_inbox_from_env
+from app.lib.metrics import register_metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
-def handleSubscriptionCreated(data: dict):
-    """
-    Handle the subscription created event from Paddle.
-    This function should be called when a subscription is created.
-
-    It should update the user's subscription status in the database.
-    """
-
-    try:
-        # Get relevant fields
-        sub_id = data.get("id")
-        package_name = data.get("items")[0]["price"]["name"]
-
-        # Get the customer email from Paddle
-        customer_email = get_customer_email(data)
-
-        users_collection = db.get_collection('users')
-        res = users_collection.find_one_and_update(
-            {"email": customer_email},
-            {"$set": {"subscription_status": 'active',
-                    "userType": package_name,
-                    "subscription_id": sub_id,
-                    }},
-            upsert=True,
-            return_document=ReturnDocument.AFTER
-        )
-        logger.info(f"Subscription created for {customer_email}: {res}")
-    except Exception as e:
-        print(f"Error handling subscription created event: {e}")
-        raise HTTPException(status_code=500, detail=f"Error handling subscription created event: {e}")
-
-def handleSubscriptionUpdated(data: dict):
-    """
-    Handle the subscription updated event from Paddle.
-    This function should be called when a subscription is updated.
+users_collection = db.get_collection('users')
 
-    It should update the user's subscription status in the database.
+async def apply_subscription_events(events: list[dict]):
     """
-
-    try:
-        # Get action type
-        action_type = data.get("scheduled_change")["action"] if data.get("scheduled_change") else None
-        
-        if action_type == 'cancel':
-            # Handle cancel action
-            res = cancel_subscription(data)
-            logger.info(f"Subscription status updated to cancelled: {res}")
-        else:
-            # Activate the subscription status again
-            res = reactivate_subscription(data)
-            logger.info(f"Subscription status updated to active: {res}")
-            
-    except Exception as e:
-        print(f"Error handling subscription updated event: {e}")
-        raise HTTPException(status_code=500, detail=f"Error handling subscription updated event: {e}")
-
-def handleSubscriptionCanceled(data: dict):
-    """
-    Handle the subscription cancelled event from Paddle.
-    This function should be called when a subscription is cancelled.
-
-    It should update the user's subscription status in the database.
+    Apply a batch of Paddle events to users with one bulk write. Applying a batch again leaves users unchanged.
     """
-    try:
-        customer_email = get_customer_email(data)
-        users_collection = db.get_collection('users')
-
-        res = users_collection.find_one_and_update(
-            {"email": customer_email},
-            {"$set": {"subscription_status": 'inactive',
-                    "userType": "Free",
-                    "subscription_id": '',
-                    }},
-        )
-
-        logger.info(f"Subscription cancelled for {customer_email}: {res}")
-        
-    except Exception as e:
-        print(f"Error handling subscription cancelled event: {e}")
-        raise HTTPException(status_code=500, detail=f"Error handling subscription cancelled event: {e}")
-
-
+    folded = fold_subscription_events(events)
+    if not folded:
+        return
+
+    operations = [
+        UpdateOne({"email": email}, guarded_update(change['fields'], change['occurred_at']), upsert=change['upsert'])
+        for email, change in folded.items()
+    ]
+    res = await users_collection.bulk_write(operations, ordered=False)
+    logger.info(f"Applied {len(events)} Paddle events to {len(operations)} users: {res.bulk_api_result}")
+
+    # Every worker serves the new tier from the next request on.
+    tier_changes = [email for email, change in folded.items() if 'userType' in change['fields']]
+    if tier_changes:
+        async for user in users_collection.find({"email": {"$in": tier_changes}}, {"_id": 1}):
+            await tier_cache.invalidate(str(user['_id']))
+
+# Webhooks store events here and are acknowledged at once, they are applied by a background task.
+paddle_inbox = webhook_inbox_from_env(db['paddleEvents'], apply_subscription_events, 'paddle_events')
+register_metrics('paddle_webhooks')(paddle_inbox.stats)
@@ -1,71 +1,93 @@
-from paddle_billing import Client, Environment, Options
+from paddle_billing import Client
 from typing import List, Annotated
 from bson import ObjectId
-from os import getenv
-from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, Response, Depends
 from app.utils.signature import verify_paddle_signature
 from app.routes.paddle.events import *
 from app.models.paddle import *
 from app.user.extract_jwt_token import get_user_id
-from app.models.database import db
+from app.models.async_database import db
+from app.lib.resources import get_resource
+from app.lib.price_catalog import price_catalog_from_env
+from app.responses.etag import etag_matches
+from app.lib.metrics import register_metrics
+import asyncio
+import logging
 
-if not getenv("PADDLE_API_SECRET"):
-    raise ValueError("PADDLE_API_SECRET is not set in the environment.")
-
-paddle = Client(getenv('PADDLE_API_SECRET'), options=Options(Environment.SANDBOX))
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/paddle/prices", response_model=List[PaddlePrice])
-async def get_prices():
+# Prices change rarely, the pricing page is served from a snapshot refreshed in the background.
+price_catalog = price_catalog_from_env()
+register_metrics('price_catalog')(price_catalog.stats)
+
+# Webhook events after which the snapshot is refreshed.
+PRICE_EVENTS = ('price.created', 'price.updated', 'price.imported', 'product.created', 'product.updated', 'product.imported')
+
+def list_prices(paddle: Client) -> list[dict]:
     """
-    Get the prices from Paddle.
+    Get the prices from Paddle, with a free tier for free users first. It blocks on Paddle, run it in a thread.
     """
-    try:
-        paddle_prices = paddle.prices.list()
-
-        #Create a free tier for free users
-        free_tier = {
-            "name" : "Free",
-            "description" : "Basic plan for free users",
-            "price_id" : "",
-            "amount" : '0',
-            "currency": "USD",
-            "product_id" : "",
-            "limits": {
-                "search" : "50 / day",
-                "generate" : "10 / day",
-                "grammar" : "7 / day",
-                "paraphrase" : "7 / day",
-                "fix" : "7 / day",
-                "compare": "7 / day",
-            }
+    #Create a free tier for free users
+    free_tier = {
+        "name" : "Free",
+        "description" : "Basic plan for free users",
+        "price_id" : "",
+        "amount" : '0',
+        "currency": "USD",
+        "product_id" : "",
+        "limits": {
+            "search" : "50 / day",
+            "generate" : "10 / day",
+            "grammar" : "7 / day",
+            "paraphrase" : "7 / day",
+            "fix" : "7 / day",
+            "compare": "7 / day",
+        }
+    }
+
+    all_prices = [
+        {
+            "name" : price.name,
+            "description" : price.description,
+            "price_id": price.id,
+            "amount": price.unit_price.amount,
+            "currency": price.unit_price.currency_code.value,
+            "product_id": price.product_id,
+            "limits": price.custom_data.data if price.custom_data else {}
         }
+        for price in paddle.prices.list()
+    ]
+
+    # Add the free tier to the list of prices
+    all_prices.insert(0, free_tier)
 
-        all_prices = [
-            {
-                "name" : price.name,
-                "description" : price.description,
-                "price_id": price.id,
-                "amount": price.unit_price.amount,
-                "currency": price.unit_price.currency_code.value,
-                "product_id": price.product_id,
-                "limits": price.custom_data.data if price.custom_data else {}
-            }
-            for price in paddle_prices
-            
-        ]
-
-        # Add the free tier to the list of prices
-        all_prices.insert(0, free_tier)
-
-        return all_prices
+    return all_prices
+
+def price_fetcher(paddle: Client):
+    return lambda: asyncio.to_thread(list_prices, paddle)
+
+@router.get("/paddle/prices", response_model=List[PaddlePrice])
+async def get_prices(request: Request, response: Response, paddle: Annotated[Client, Depends(get_resource('paddle'))]):
+    """
+    Get the prices from Paddle. Browsers revalidate with If-None-Match and get a 304 while the prices are unchanged.
+    """
+    try:
+        snapshot = await price_catalog.get(price_fetcher(paddle))
     except Exception as e:
         print(f"Error retrieving prices: {e}")
         raise HTTPException(status_code=500, detail=f"Error retrieving prices: {e}")
 
+    headers = {"ETag": f'"{snapshot.etag}"', "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return snapshot.prices
+
 @router.get("/paddle/subscriptions/{subscription_id}", response_model=PaddleSubscription)
-async def get_subscription(subscription_id: str):
+async def get_subscription(subscription_id: str, paddle: Annotated[Client, Depends(get_resource('paddle'))]):
     """
     Get the subscription details from Paddle.
     """
@@ -88,7 +110,7 @@ async def get_subscription_id(user_id: Annotated[str, Depends(get_user_id)]):
     if not user_id:
         raise HTTPException(status_code=401, detail='Unauthorized')
     
-    subId = db['users'].find_one({"_id": ObjectId(user_id)}, {"subscription_id" : 1, "_id": 0})
+    subId = await db['users'].find_one({"_id": ObjectId(user_id)}, {"subscription_id" : 1, "_id": 0})
 
     if not subId:
         raise HTTPException(status_code=404, detail=f'Subscription id cannot found for user: {user_id}')
@@ -96,7 +118,11 @@ async def get_subscription_id(user_id: Annotated[str, Depends(get_user_id)]):
     return subId.get("subscription_id")
 
 @router.post("/webhook")
-async def webhook(req: Request):
+async def webhook(req: Request, paddle: Annotated[Client, Depends(get_resource('paddle'))]):
+    """
+    Store a Paddle event and acknowledge it at once, subscription events are applied by the paddle_inbox task.
+    Retried deliveries of a stored event are acknowledged without being applied again.
+    """
     try:
         # Verify the signature
         body = await req.body()
@@ -108,31 +134,25 @@ async def webhook(req: Request):
         json_data = await req.json()
         data = json_data.get("data")
         
-        # Check if the event type is present
+        # Check if the event id and type are present
+        event_id = json_data.get("event_id")
         event_type = json_data.get("event_type")
-        if not event_type:
-            return HTTPException(status_code=400, detail="Missing event_type in request body")
-        
-        # Handle different event types
-        if event_type == "subscription.created":
-            # Handle subscription created event
-            handleSubscriptionCreated(data)
-        
-        elif event_type == "subscription.updated":
-            # Handle subscription updated event
-            print(data)
-            handleSubscriptionUpdated(data)
-        
-        elif event_type == "subscription.cancelled":
-            # Handle subscription cancelled event
-            handleSubscriptionCanceled(data)
-    
-        else:
-            print(f"Unhandled event type: {event_type}")
-        
-        
+        if not event_id or not event_type:
+            raise HTTPException(status_code=400, detail="Missing event_id or event_type in request body")
+
+        is_new = await paddle_inbox.receive(event_id, event_type, json_data.get("occurred_at"), data)
+
+        if not is_new:
+            logger.info(f"Duplicate Paddle event {event_id}")
+
+        elif event_type in PRICE_EVENTS:
+            # Refresh in the background, other workers pick the snapshot up from Redis
+            price_catalog.revalidate(price_fetcher(paddle))
+
         return {"status": "success"}
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error handling webhook: {e}")
         raise HTTPException(status_code=500, detail=f"Error handling webhook: {e}")
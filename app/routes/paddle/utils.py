@@ -1,4 +1,8 @@
 from fastapi import HTTPException
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
 
 def get_customer_email(data: dict) -> str:
     """
@@ -9,4 +13,76 @@ def get_customer_email(data: dict) -> str:
     if not customer_email:
         raise HTTPException(status_code=400, detail="Missing customer email in request data")
     
-    return customer_email
\ No newline at end of file
+    return customer_email
+
+def subscription_changes(event_type: str, data: dict) -> Optional[tuple[str, dict, bool]]:
+    """
+    Get the changes of a Paddle subscription event to the user.
+
+    Returns:
+        tuple: The customer email, the fields to set and whether the user is created if missing,
+        or None for events that do not change users.
+    """
+    if event_type == "subscription.created":
+        # Activate the subscription with the package of its first item
+        return get_customer_email(data), {
+            "subscription_status": 'active',
+            "userType": data.get("items")[0]["price"]["name"],
+            "subscription_id": data.get("id"),
+        }, True
+
+    if event_type == "subscription.updated":
+        # A scheduled cancel keeps the service until the end of the billing cycle, anything else reactivates it
+        action_type = data.get("scheduled_change")["action"] if data.get("scheduled_change") else None
+        status = 'cancelled' if action_type == 'cancel' else 'active'
+        return get_customer_email(data), {"subscription_status": status}, False
+
+    if event_type in ("subscription.cancelled", "subscription.canceled"):
+        return get_customer_email(data), {
+            "subscription_status": 'inactive',
+            "userType": "Free",
+            "subscription_id": '',
+        }, False
+
+    return None
+
+def fold_subscription_events(events: list[dict]) -> dict[str, dict]:
+    """
+    Fold inbox events into one change per customer, applied in the order the events occurred.
+    Every field keeps the time of the event that set it last. Events that cannot be read are logged
+    and skipped so they don't hold up the others.
+    """
+    folded = {}
+    for event in sorted(events, key=lambda event: event['occurred_at']):
+        try:
+            changes = subscription_changes(event['event_type'], event['payload'])
+        except Exception as e:
+            logger.error(f"Skipping Paddle event {event['_id']} of type {event['event_type']}: {e}")
+            continue
+        if changes is None:
+            continue
+
+        email, fields, upsert = changes
+        change = folded.setdefault(email, {'fields': {}, 'occurred_at': {}, 'upsert': False})
+        change['fields'].update(fields)
+        change['occurred_at'].update(dict.fromkeys(fields, event['occurred_at']))
+        change['upsert'] = change['upsert'] or upsert
+
+    return folded
+
+def guarded_update(fields: dict, occurred_at: dict[str, str]) -> list[dict]:
+    """
+    Update pipeline that sets every field only if it was not set by a later event, so an event arriving after newer
+    ones still sets the fields they did not touch. The time of the last event is kept per field in paddle_field_event_at.
+    """
+    def is_newer(field: str) -> dict:
+        # Users updated before times were kept per field fall back to the time of their last event.
+        applied_at = {'$ifNull': [f'$paddle_field_event_at.{field}', {'$ifNull': ['$paddle_event_at', '']}]}
+        return {'$lt': [applied_at, occurred_at[field]]}
+
+    return [{'$set': {
+        **{field: {'$cond': [is_newer(field), {'$literal': value}, f'${field}']} for field, value in fields.items()},
+        **{f'paddle_field_event_at.{field}': {'$cond': [is_newer(field), occurred_at[field],
+                                                        f'$paddle_field_event_at.{field}']}
+           for field in fields},
+    }}]
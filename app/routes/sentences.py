@@ -1,19 +1,29 @@
 from fastapi import APIRouter, HTTPException, Query, Path, Depends
-from app.models.database import sentences_collection
+from app.models.async_database import sentences_collection
 from app.utils.text_helpers import extract_sentences_from_raw_text
 from pymongo.errors import CursorNotFound
-from pymongo.cursor import Cursor
 from typing import Annotated
 from app.user.extract_jwt_token import get_user_id
 from app.lib.request import track_requests
+from app.lib.word_index import iter_candidate_ids, lookup_token, index_status
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.lib.sentence_cache import make_cache_key, get_cached_page, set_cached_page
 import logging
-import asyncio
+import os
+import re
 
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Resolve searched words from the inverted word index instead of scanning the whole collection with a regex.
+# The index is used once `python -m app.lib.word_index rebuild` completed, until then searches use the regex.
+USE_WORD_INDEX = os.getenv('USE_WORD_INDEX', 'true').lower() == 'true'
+
+# _id is the sort key of every page and is removed before returning sentences.
+SENTENCE_PROJECTION = {'_id': 1, 'text': 1, 'category': 1, 'source': 1}
+
 @router.get("/sentences/{word}")
 async def sentences(
     user_id : Annotated[str, Depends(get_user_id)],
@@ -21,25 +31,28 @@ async def sentences(
     categories: str = Query(None, description="Comma-separated list of categories"),
     min_length: int = Query(None, description="Minimum sentence length"),
     max_length: int = Query(None, description="Maximum sentence length"),
-    page: int = Query(1, description="Page number"),
+    page: int = Query(1, description="Page number, ignored when a cursor is given"),
+    cursor: str = Query(None, description="Opaque cursor token from the 'next' field of a previous response"),
     page_size: int = Query(10, description="Number of items per page"),
+    offsets: bool = Query(False, description="Add start and end offsets of the word inside every sentence"),
 ):
     """
     Get sentences containing the word, optionally filtered by categories, length, and sorted.
     """
     #Check for request limit for specific user and route
-    await asyncio.to_thread(track_requests, user_id, 'sentenceReq')
+    await track_requests(user_id, 'sentenceReq')
 
     try:
         # Base filter to search for the word in sentences
         filter_query = {
             'text': {
-                '$regex': rf'(?<!\w)(?:[A-Z][^.!?]*?\b{word}\b[^.!?]*[.!?])',
+                '$regex': rf'(?<!\w)(?:[A-Z][^.!?]*?\b{re.escape(word)}\b[^.!?]*[.!?])',
                 '$options': 'i'
             }
         }
 
         # Add categories to the filter if provided
+        category_list = None
         if categories:
             category_list = categories.split(',')
             filter_query['category'] = {'$in': category_list}
@@ -55,29 +68,66 @@ async def sentences(
             if max_length is not None:
                 filter_query['length']['$lte'] = max_length
 
-        skip = (page - 1) * page_size
+        # Cursor tokens continue after the last seen sentence so deep pages cost the same as the first one.
+        after = decode_cursor(cursor) if cursor else None
+        skip = 0 if cursor else (page - 1) * page_size
+
+        # Same filters return the same page, so popular searches are served from the cache.
+        cache_key = make_cache_key(word, category_list, min_length, max_length, page, page_size, cursor, offsets)
+        cached_page = await get_cached_page(cache_key)
 
-        results = get_cursors(filter_query, skip, page_size)
-        filtered_results = get_filtered_sentences(results, word)
+        if cached_page is None:
+            results, last_id = await get_cursors(word, filter_query, skip, page_size, after)
+            filtered_results = get_filtered_sentences(results, word, offsets)
+
+            cached_page = {
+                'sentences': filtered_results,
+                'next': encode_cursor(last_id) if last_id is not None else None
+            }
+            await set_cached_page(cache_key, cached_page, category_list)
 
         return {
             'word': word,
             'categories': categories,
             'min_length': min_length,
             'max_length': max_length,
-            'sentences': filtered_results
+            **cached_page
         }
     except CursorNotFound as cursor_err:
         logger.error(f'Cursor not found! {cursor_err}')
         raise HTTPException(status_code=400, detail=f'Curson not found! {cursor_err}')
 
-def get_cursors(filter_query: dict, skip: int, page_size: int) -> list[Cursor]:
-    cursor = sentences_collection.find(filter_query, {'_id': 0, 'text': 1, 'category': 1, 'source': 1}).skip(skip).limit(page_size)
-    return list(cursor)
+async def get_cursors(word: str, filter_query: dict, skip: int, page_size: int, after=None) -> tuple[list[dict], object]:
+    """
+    Get one page of sentences ordered by _id.
+
+    Returns:
+        tuple: Sentences of the page and the _id of the last one, or None if there are no more pages.
+    """
+    if not USE_WORD_INDEX or lookup_token(word) is None or not await index_status.is_ready():
+        page_query = {**filter_query, '_id': {'$gt': after}} if after is not None else filter_query
+        results = await sentences_collection.find(page_query, SENTENCE_PROJECTION).sort('_id', 1).skip(skip).limit(page_size).to_list()
+    else:
+        # Only run the exact match regex on sentences that contain the word according to the index.
+        results = []
+        async for candidate_ids in iter_candidate_ids(word, filter_query, after):
+            cursor = sentences_collection.find({**filter_query, '_id': {'$in': candidate_ids}}, SENTENCE_PROJECTION).sort('_id', 1)
+            results.extend(await cursor.to_list())
+
+            if len(results) >= skip + page_size:
+                break
+
+        results = results[skip:skip + page_size]
+
+    last_id = results[-1]['_id'] if len(results) == page_size else None
+    for result in results:
+        del result['_id']
+
+    return results, last_id
 
 
-def get_filtered_sentences(results: list[Cursor], word: str) -> list[str]:
-    filtered_results = extract_sentences_from_raw_text(results, word)
+def get_filtered_sentences(results: list[dict], word: str, with_offsets: bool = False) -> list[str]:
+    filtered_results = extract_sentences_from_raw_text(results, word, with_offsets)
 
     # Handle no results
     if not results:
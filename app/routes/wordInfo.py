@@ -1,21 +1,28 @@
 from fastapi import APIRouter, HTTPException, Depends, Path
+from concurrent.futures import Executor
+from typing import Annotated, Optional
 from app.models.word_info import *
-from word.wordkit import Wordkit
+from word.wordkit import get_word_info as lookup_word_info, word_info_memo
 import asyncio
 import logging
-from word.spacyWord import calculate_similarity_score
+from word.spacyWord import calculate_similarity_score, get_similarity_engine
+from app.lib.word_batch import stream_word_infos
+from app.lib.resources import get_resource
+from app.responses.ndjson import ndjson_response
+from app.lib.metrics import register_metrics
 
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+register_metrics('word_info_memo')(word_info_memo.stats)
+
 @router.get("/wordInfo/{word}" , response_model=WordInfoResponse, response_description="Get word info like definition, synonyms, examples")
 async def get_word_info(word: str = Path(description="The word to get info about", min_length=1, max_length=30, strip_whitespace=True)):
     try:
         # Call the function to get word information
-        wordkit = Wordkit(word)
-        word_info = await asyncio.to_thread(wordkit.get_word_info_extended)
+        word_info = await asyncio.to_thread(lookup_word_info, word)
         if word_info.get('pos') is None:
             logger.error(f"Word not found! : {word}")
             raise HTTPException(status_code=404, detail="Word not found.")
@@ -31,6 +38,18 @@ async def get_word_info(word: str = Path(description="The word to get info about
         logger.error(f"Unexpected error occurred! : {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+@router.post("/wordInfo/batch", response_description="Stream word info of many words as NDJSON, one line per distinct word")
+async def get_word_info_batch(inputs: WordInfoBatchRequest, pool: Annotated[Optional[Executor], Depends(get_resource('word_pool'))]):
+    """
+    Get the info of up to 1000 words. Words are deduplicated, cached ones are sent first and the others as they are
+    looked up on the word pool. Lines are {"word", "info"} or {"word", "error"} for unknown words.
+    """
+    try:
+        return await ndjson_response(stream_word_infos(inputs.words, pool))
+    except LookupError:
+        logger.error(f"NLTK data not found!")
+        raise HTTPException(status_code=404, detail="NTLK Data not found.")
+
 @router.get('/wordSimilarity/{word1}/{word2}', response_model=WordSimilarityResponse, response_description="Get a similarity score between two words")
 async def get_word_similarity(inputs : WordSimilarityRequest = Depends()):
     #Validete inputs
@@ -41,4 +60,15 @@ async def get_word_similarity(inputs : WordSimilarityRequest = Depends()):
     # Call the function to get word information
     score = await asyncio.to_thread(calculate_similarity_score, inputs.word1, inputs.word2)
 
-    return {"score" : round((score * 100), 2)}
\ No newline at end of file
+    return {"score" : round((score * 100), 2)}
+
+@router.post('/wordSimilarity/batch', response_model=WordSimilarityBatchResponse, response_description="Get similarity scores between one word and many candidates")
+async def get_word_similarity_batch(inputs: WordSimilarityBatchRequest):
+    # All candidates are vectorized in one pipeline pass and scored with one matrix product.
+    engine = get_similarity_engine()
+    ranked = await asyncio.to_thread(engine.rank, inputs.anchor, inputs.candidates, inputs.top_k)
+
+    return {
+        "anchor": inputs.anchor,
+        "scores": [{"word": word, "score": round((score * 100), 2)} for word, score in ranked]
+    }
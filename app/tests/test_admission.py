@@ -0,0 +1,115 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.lib.admission import AdmissionController
+
+def test_calls_above_the_cap_wait_for_a_slot():
+    # Test case 1: Only max_concurrency calls run at the same time
+    admission = AdmissionController(max_concurrency=2, max_queue=10, queue_timeout=1)
+    running = []
+    peak = []
+
+    async def call():
+        async with admission.slot('free'):
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(main())
+
+    assert max(peak) == 2
+    assert admission.stats()['admitted'] == 6
+    assert admission.stats()['queued'] == 4
+    assert admission.in_flight == 0
+
+def test_waiters_are_served_by_tier():
+    # Test case 2: Freed slots go to the highest tier first, then by arrival
+    admission = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=1)
+    order = []
+
+    async def call(tier, name):
+        async with admission.slot(tier):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        first = asyncio.create_task(call('free', 'first'))
+        await asyncio.sleep(0)
+        waiting = [asyncio.create_task(call(tier, name)) for tier, name in
+                   [('free', 'free'), ('premium', 'premium'), ('Premium Plus', 'premium_plus'), ('premium', 'premium_2')]]
+        await asyncio.gather(first, *waiting)
+
+    asyncio.run(main())
+
+    assert order == ['first', 'premium_plus', 'premium', 'premium_2', 'free']
+
+def test_full_queue_sheds_with_retry_after():
+    # Test case 3: A request that can not be queued is rejected with 503 and Retry-After
+    admission = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=1, retry_after=7)
+
+    async def main():
+        holder = asyncio.create_task(admission.acquire('free'))
+        await holder
+        waiter = asyncio.create_task(admission.acquire('free'))
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await admission.acquire('free')
+
+        admission.release()
+        await waiter
+        admission.release()
+        return exc_info.value
+
+    error = asyncio.run(main())
+
+    assert error.status_code == 503
+    assert error.headers == {'Retry-After': '7'}
+    assert admission.stats()['shed'] == 1
+    assert admission.in_flight == 0
+
+def test_higher_tier_displaces_lowest_waiter():
+    # Test case 4: With a full queue a premium request takes the place of a queued free request
+    admission = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=1)
+
+    async def main():
+        await admission.acquire('free')
+        free = asyncio.create_task(admission.acquire('free'))
+        await asyncio.sleep(0)
+        premium = asyncio.create_task(admission.acquire('premium'))
+        await asyncio.sleep(0)
+
+        admission.release()
+        await premium
+        admission.release()
+        return await asyncio.gather(free, return_exceptions=True)
+
+    free_result, = asyncio.run(main())
+
+    assert isinstance(free_result, HTTPException) and free_result.status_code == 503
+    assert admission.in_flight == 0
+
+def test_queue_timeout_sheds_request():
+    # Test case 5: Waiting longer than queue_timeout is rejected and removed from the queue
+    admission = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=0.01)
+
+    async def main():
+        await admission.acquire('free')
+        with pytest.raises(HTTPException):
+            await admission.acquire('premium')
+        admission.release()
+
+    asyncio.run(main())
+
+    stats = admission.stats()
+    assert stats['timed_out'] == 1
+    assert stats['queue_depth'] == 0
+    assert admission.in_flight == 0
@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import asyncio
+import word.word_assistant as word_assistant_module
+from app.lib.cache import RedisCache
+from word.word_assistant import WordAssistant
+
+class DictCache(RedisCache):
+    """In memory stand-in for the Redis cache."""
+    def __init__(self):
+        super().__init__('test_cache', ttl=60, max_entries=100, client=None)
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, tags=()):
+        self.values[key] = value
+
+def make_assistant(monkeypatch, response: dict):
+    calls = []
+
+    async def fake_chat_completion(client, content, temperature=1.3, response_format='text'):
+        calls.append(content['content'])
+        return response
+
+    monkeypatch.setattr(word_assistant_module, 'get_chat_completion', fake_chat_completion)
+    return WordAssistant(client=None, cache=DictCache()), calls
+
+def test_analyze_word_is_cached_by_normalized_word(monkeypatch):
+    # Test case 1: Same word with different case is answered from the cache
+    assistant, calls = make_assistant(monkeypatch, {'check': 'ok', 'analysis': 'fine'})
+
+    first = asyncio.run(assistant.analyze_word('Prevent'))
+    second = asyncio.run(assistant.analyze_word('prevent '))
+
+    assert first == second == {'check': 'ok', 'analysis': 'fine'}
+    assert len(calls) == 1
+
+def test_compare_words_is_order_insensitive(monkeypatch):
+    # Test case 2: Reversed pairs share the cache entry and get swapped examples
+    assistant, calls = make_assistant(monkeypatch, {
+        'similarities': 's', 'differences': 'd', 'examples_word1': ['big one'], 'examples_word2': ['large one']
+    })
+
+    forward = asyncio.run(assistant.compare_words('big', 'large'))
+    backward = asyncio.run(assistant.compare_words('large', 'big'))
+
+    assert len(calls) == 1
+    assert forward['examples_word1'] == backward['examples_word2'] == ['big one']
+    assert forward['examples_word2'] == backward['examples_word1'] == ['large one']
+
+def test_cache_hits_are_charged_by_default(monkeypatch):
+    # Test case 3: Quota is still tracked for cache hits unless the policy allows skipping it
+    assistant, _ = make_assistant(monkeypatch, {'check': 'ok', 'analysis': 'fine'})
+    charges = []
+
+    async def charge():
+        charges.append(1)
+
+    asyncio.run(assistant.analyze_word('prevent', charge=charge))
+    asyncio.run(assistant.analyze_word('prevent', charge=charge))
+    assert len(charges) == 2
+
+    monkeypatch.setattr(word_assistant_module, 'AI_CACHE_SKIP_QUOTA', True)
+    asyncio.run(assistant.analyze_word('prevent', charge=charge))
+    assert len(charges) == 2
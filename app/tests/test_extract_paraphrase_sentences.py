@@ -3,7 +3,7 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
 import pytest
-from app.utils.text_helpers import extract_paraphrase_sentences
+from app.utils.text_helpers import extract_paraphrase_sentences, ParaphraseStreamParser
 
 def test_extract_paraphrase_sentences():
     # Test case 1: Paraphrase with a default results
@@ -66,3 +66,31 @@ def test_extract_paraphrase_sentences_with_wrong_ai_response():
 
     with pytest.raises(ValueError, match="AI Agent response is not correct. Please check your prompt."):
         extract_paraphrase_sentences(results, num_sentences)
+
+def test_paraphrase_stream_parser_matches_extract():
+    # Test case 6: Streamed response split into single characters
+    results = "1. This is the first sentence. 2. This is the second sentence. 3. This is the third sentence. 4. This is the fourth sentence. 5. This is the fifth sentence."
+    parser = ParaphraseStreamParser(5)
+
+    streamed = []
+    for char in results:
+        streamed.extend(parser.feed(char))
+    streamed.extend(parser.close())
+
+    assert streamed == extract_paraphrase_sentences(results, 5)
+
+def test_paraphrase_stream_parser_yields_before_end():
+    # Test case 7: A sentence is returned as soon as the next number arrives
+    parser = ParaphraseStreamParser(3)
+
+    assert parser.feed("1. This is the first sentence.") == []
+    assert parser.feed(" 2. This is") == ["This is the first sentence."]
+    assert parser.feed(" the second sentence. 3. This is the third sentence.") == ["This is the second sentence."]
+    assert parser.close() == ["This is the third sentence."]
+
+def test_paraphrase_stream_parser_with_wrong_ai_response():
+    # Test case 8: A wrong AI response fails on the first chunk
+    parser = ParaphraseStreamParser(1)
+
+    with pytest.raises(ValueError, match="AI Agent response is not correct. Please check your prompt."):
+        parser.feed("This is a wrong AI response.")
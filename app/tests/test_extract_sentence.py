@@ -2,7 +2,7 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from app.utils.text_helpers import extract_sentence
+from app.utils.text_helpers import extract_sentences_from_raw_text as extract_sentence
 
 def test_extract_sentence():
     # Test case 1: Test default behavior
@@ -42,4 +42,25 @@ def test_extract_sentence_with_same_word_in_sentence():
     expected_output = [{'text': 'He was visited by his friends and family and visited by his girlfriend which is pretty cool.'}]
     func_results = extract_sentence(results, word)
 
-    assert func_results == expected_output
\ No newline at end of file
+    assert func_results == expected_output
+
+def test_extract_sentence_with_offsets():
+    # Test case 5: Test offsets of the word inside extracted sentences
+    results = [{'text': 'Hi, I am ahmet. He was visited by friends and visited by family. Nothing here. Again Visited!'}]
+    word = 'visited'
+
+    func_results = extract_sentence(results, word, with_offsets=True)
+    text = func_results[0]['text']
+
+    assert text == 'He was visited by friends and visited by family. Again Visited!'
+    assert [text[start:end] for start, end in func_results[0]['offsets']] == ['visited', 'visited', 'Visited']
+
+def test_extract_sentence_with_regex_characters():
+    # Test case 6: Test that the word is matched literally
+    results = [{'text': 'It costs 5 dollars. It costs 5x dollars.'}]
+    word = '5.'
+
+    expected_output = [{'text': ''}]
+    func_results = extract_sentence(results, word)
+
+    assert func_results == expected_output
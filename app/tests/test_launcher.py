@@ -0,0 +1,104 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import time
+import httpx
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from app.launcher import PreforkServer, STARTUP_FAILURE, read_memory
+
+assets = {}
+
+def preload():
+    assets['loaded_by'] = os.getpid()
+
+app = FastAPI()
+
+@app.get("/assets")
+async def get_assets():
+    return {'loaded_by': assets.get('loaded_by'), 'worker': os.getpid()}
+
+def wait_for(url: str) -> dict:
+    deadline = time.monotonic() + 20
+    while True:
+        try:
+            return httpx.get(url, timeout=1.0).json()
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+def test_read_memory():
+    # Test case 1: Memory of a process is read from smaps_rollup, unique memory is part of the resident memory
+    usage = read_memory(os.getpid())
+    assert usage['pid'] == os.getpid()
+    assert 0 < usage['uss'] <= usage['rss']
+    assert usage['pss'] <= usage['rss']
+
+def test_workers_inherit_preloaded_assets():
+    # Test case 2: Assets are loaded once in the master and every forked worker serves with them
+    server = PreforkServer(app, host='127.0.0.1', port=0, workers=2, preload=preload, log_level='warning')
+    server.start()
+    try:
+        body = wait_for(f'http://127.0.0.1:{server.port}/assets')
+        assert body['loaded_by'] == os.getpid()
+        assert body['worker'] in server.pids
+
+        report = server.memory_report()
+        assert sorted(usage['pid'] for usage in report) == sorted(server.pids)
+        assert all(usage['uss'] > 0 for usage in report)
+    finally:
+        server.stop(timeout=10)
+
+    assert not server.pids
+
+def test_exited_workers_are_reaped():
+    # Test case 3: A worker that exits is collected so the master can replace it
+    server = PreforkServer(app, host='127.0.0.1', port=0, workers=1, preload=None, log_level='warning')
+    server.start()
+    try:
+        wait_for(f'http://127.0.0.1:{server.port}/assets')
+        pid = next(iter(server.pids))
+        os.kill(pid, 9)
+
+        deadline = time.monotonic() + 10
+        exited = []
+        while not exited and time.monotonic() < deadline:
+            exited = server.reap()
+            time.sleep(0.05)
+        assert exited == [(pid, -9)]
+
+        server.spawn()
+        assert wait_for(f'http://127.0.0.1:{server.port}/assets')['worker'] != pid
+    finally:
+        server.stop(timeout=10)
+
+def test_restart_delay_backs_off_and_gives_up():
+    # Test case 4: Restart delays double with every exit in the window, too many exits stop restarting
+    server = PreforkServer(app, workers=1, preload=None, restart_window=60.0, max_restarts=3, backoff=0.5)
+    assert [server.restart_delay(10.0) for _ in range(3)] == [0.5, 1.0, 2.0]
+    assert server.restart_delay(10.0) is None
+
+    # Exits older than the window are forgotten.
+    assert server.restart_delay(100.0) == 0.5
+
+def test_startup_failure_stops_the_master():
+    # Test case 5: A worker whose lifespan fails is not restarted, the master gets a non-zero status
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        raise RuntimeError('DEEPSEEK_API_KEY is not set')
+        yield
+
+    server = PreforkServer(FastAPI(lifespan=lifespan), host='127.0.0.1', port=0, workers=2, preload=None,
+                           log_level='critical')
+    server.start()
+    try:
+        deadline = time.monotonic() + 20
+        code = None
+        while code is None and time.monotonic() < deadline:
+            code = server.supervise()
+            time.sleep(0.05)
+        assert code == STARTUP_FAILURE
+    finally:
+        server.stop(timeout=10)
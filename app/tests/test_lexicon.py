@@ -0,0 +1,90 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+from collections import defaultdict
+from nltk.corpus.reader.wordnet import WordNetCorpusReader
+from word.lexicon import Lexicon, compile_lexicon, write_lexicon
+from word.pos_table import PosTable, UNIVERSAL_TAGS, table_dtype
+
+class Synset:
+    def __init__(self, pos, definition, lemma_names, examples=()):
+        self._pos = pos
+        self._definition = definition
+        self._lemma_names = list(lemma_names)
+        self._examples = list(examples)
+
+    def pos(self):
+        return self._pos
+
+    def definition(self):
+        return self._definition
+
+    def lemma_names(self):
+        return self._lemma_names
+
+    def examples(self):
+        return self._examples
+
+class SmallWordNet(WordNetCorpusReader):
+    """
+    A few synsets behind the lookup code of nltk's reader, which the snapshot has to match.
+    """
+    def __init__(self):
+        self.data = {
+            ('n', 1): Synset('n', 'a domestic animal', ['dog', 'domestic_dog'], ['the dog barked']),
+            ('n', 2): Synset('n', 'a woody plant', ['tree']),
+            ('n', 3): Synset('n', 'an adult person', ['man', 'adult_male']),
+            ('v', 4): Synset('v', 'move fast on foot', ['run'], ['he runs daily']),
+            ('v', 5): Synset('v', 'follow closely', ['dog', 'tail']),
+            ('a', 6): Synset('a', 'having good qualities', ['good']),
+            ('a', 7): Synset('s', 'moving fast', ['quick', 'speedy']),
+            ('r', 8): Synset('r', 'with speed', ['quickly']),
+            ('a', 9): Synset('s', 'of a large size', ['large', 'big']),
+        }
+        self._lemma_pos_offset_map = defaultdict(dict)
+        for (pos, offset), synset in self.data.items():
+            for name in synset.lemma_names():
+                self._lemma_pos_offset_map[name.lower()].setdefault(pos, []).append(offset)
+                if pos == 'a':
+                    self._lemma_pos_offset_map[name.lower()]['s'] = self._lemma_pos_offset_map[name.lower()]['a']
+        self._exception_map = {'n': {'men': ['man']}, 'v': {'ran': ['run']}, 'a': {'better': ['good'], 'bigger': ['big']}, 'r': {}}
+        self._exception_map['s'] = self._exception_map['a']
+
+    def synset_from_pos_and_offset(self, pos, offset):
+        return self.data[(pos, offset)]
+
+def make_lexicon(tmp_path, reader):
+    table = np.zeros(4, dtype=table_dtype(8))
+    table['word'] = [b'tree', b'run', b'dog', b'guide']
+    table['counts'][:, UNIVERSAL_TAGS.index('NOUN')] = [5, 1, 9, 3]
+    table['counts'][:, UNIVERSAL_TAGS.index('VERB')] = [0, 7, 1, 3]
+    # 'guide' was tagged VERB first, the tie goes to it.
+    table['first_seen'][3, UNIVERSAL_TAGS.index('NOUN')] = 1
+
+    path = str(tmp_path / 'lexicon.bin')
+    write_lexicon(path, compile_lexicon(reader, table), {'wordnet': 'test'})
+    return Lexicon.load(path), PosTable(table)
+
+def describe(synsets):
+    return [(synset.pos(), synset.definition(), synset.lemma_names(), synset.examples()) for synset in synsets]
+
+def test_synsets_match_wordnet(tmp_path):
+    # Test case 1: Lookups return the synsets of nltk's reader in its order, morphology included
+    reader = SmallWordNet()
+    lexicon, _ = make_lexicon(tmp_path, reader)
+
+    words = ['dog', 'Dogs', 'dogged', 'tree', 'trees', 'men', 'man', 'run', 'ran', 'running', 'runs', 'good', 'better',
+             'quick', 'quicker', 'quickest', 'quickly', 'big', 'bigger', 'large', 'xylophone', 'domestic_dog', '']
+    for word in words:
+        assert describe(lexicon.synsets(word)) == describe(reader.synsets(word)), word
+
+def test_most_common_pos_matches_pos_table(tmp_path):
+    # Test case 2: Parts of speech are read from the snapshot like from the POS table
+    lexicon, table = make_lexicon(tmp_path, SmallWordNet())
+
+    for word in ['tree', 'Run', 'dog', 'guide', 'cat', 'zzz', '']:
+        assert lexicon.most_common_pos(word) == table.most_common_pos(word), word
+    assert lexicon.most_common_pos('guide') == 'verb'
+    assert lexicon.meta == {'wordnet': 'test'}
@@ -0,0 +1,29 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routes.metrics import router
+
+app = FastAPI()
+app.include_router(router, prefix="/api")
+client = TestClient(app)
+
+def test_metrics_are_disabled_without_token(monkeypatch):
+    # Test case 1: Without METRICS_TOKEN the route does not exist for anyone
+    monkeypatch.delenv('METRICS_TOKEN', raising=False)
+
+    assert client.get('/api/metrics').status_code == 404
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer anything'}).status_code == 404
+
+def test_metrics_need_the_token(monkeypatch):
+    # Test case 2: Requests without the configured token are rejected, the token gets the metrics
+    monkeypatch.setenv('METRICS_TOKEN', 'secret')
+
+    assert client.get('/api/metrics').status_code == 401
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    response = client.get('/api/metrics', headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    assert isinstance(response.json(), dict)
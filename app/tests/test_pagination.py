@@ -0,0 +1,28 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from app.utils.pagination import encode_cursor, decode_cursor
+
+def test_cursor_round_trip_with_object_id():
+    # Test case 1: Sentence ids are ObjectIds by default
+    last_id = ObjectId()
+
+    token = encode_cursor(last_id)
+    assert decode_cursor(token) == last_id
+
+def test_cursor_is_url_safe():
+    # Test case 2: Token should be usable as a query parameter without escaping
+    token = encode_cursor(ObjectId())
+
+    assert all(char.isalnum() or char in '-_' for char in token)
+
+def test_invalid_cursor():
+    # Test case 3: Tampered tokens should be rejected with 400
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor('not a valid token')
+
+    assert exc_info.value.status_code == 400
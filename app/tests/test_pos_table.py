@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+from word.pos_table import PosTable, UNIVERSAL_TAGS, table_dtype
+
+def make_table(counts: dict) -> PosTable:
+    # Tags of a word are given in the order they were first seen.
+    table = np.zeros(len(counts), dtype=table_dtype(16))
+    for row, (word, tags) in enumerate(counts.items()):
+        table['word'][row] = word.encode('utf-8')
+        for seen, (tag, count) in enumerate(tags.items()):
+            table['counts'][row, UNIVERSAL_TAGS.index(tag)] = count
+            table['first_seen'][row, UNIVERSAL_TAGS.index(tag)] = seen
+    return PosTable(table)
+
+def test_most_common_pos():
+    # Test case 1: Most frequent tag is returned in lowercase
+    table = make_table({'run': {'VERB': 10, 'NOUN': 3}, 'light': {'NOUN': 5, 'ADJ': 2, 'VERB': 1}})
+
+    assert table.most_common_pos('run') == 'verb'
+    assert table.most_common_pos('Light') == 'noun'
+
+def test_missing_word():
+    # Test case 2: Words that are not in the corpus have no part of speech
+    table = make_table({'run': {'VERB': 1}})
+
+    assert table.most_common_pos('xylophone') is None
+    assert table.tag_counts('xylophone') == {}
+
+def test_tag_counts():
+    # Test case 3: Only tags that appear are returned
+    table = make_table({'light': {'NOUN': 5, 'ADJ': 2}})
+
+    assert table.tag_counts('light') == {'ADJ': 2, 'NOUN': 5}
+
+def test_ties_go_to_first_seen_tag():
+    # Test case 4: Like Counter.most_common, a tie goes to the tag seen first in the corpus, not the first column
+    table = make_table({'guide': {'VERB': 4, 'NOUN': 4}, 'stark': {'ADV': 2, 'ADJ': 2, 'NOUN': 1}})
+
+    assert table.most_common_pos('guide') == 'verb'
+    assert table.most_common_pos('stark') == 'adv'
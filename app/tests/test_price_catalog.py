@@ -0,0 +1,85 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import asyncio
+import pytest
+from app.lib.price_catalog import PriceCatalog
+from app.responses.etag import etag_matches
+
+fakeredis = pytest.importorskip('fakeredis')
+
+PRICES = [{'name': 'Free', 'amount': '0'}, {'name': 'Premium', 'amount': '500'}]
+
+def make_fetch(prices: list, delay: float = 0.0):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if isinstance(prices[0], Exception):
+            raise prices[0]
+        return list(prices)
+
+    return fetch, calls
+
+def test_prices_are_fetched_once():
+    # Test case 1: Concurrent first requests share one fetch, later ones and other workers use the snapshot
+    fetch, calls = make_fetch(PRICES, delay=0.02)
+
+    async def main():
+        server = fakeredis.FakeServer()
+        worker_1 = PriceCatalog(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+        worker_2 = PriceCatalog(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+        snapshots = await asyncio.gather(*(worker_1.get(fetch) for _ in range(10)))
+        return snapshots + [await worker_1.get(fetch), await worker_2.get(fetch)]
+
+    snapshots = asyncio.run(main())
+    assert all(snapshot.prices == PRICES for snapshot in snapshots)
+    assert len({snapshot.etag for snapshot in snapshots}) == 1
+    assert len(calls) == 1
+
+def test_stale_snapshot_is_served_while_revalidating():
+    # Test case 2: An old snapshot is returned at once and replaced by a background refresh
+    prices = list(PRICES)
+    fetch, calls = make_fetch(prices, delay=0.02)
+
+    async def main():
+        catalog = PriceCatalog(max_age=0.0, client=fakeredis.FakeAsyncRedis(decode_responses=True))
+        first = await catalog.get(fetch)
+        prices[1] = {'name': 'Premium', 'amount': '600'}
+
+        stale = await catalog.get(fetch)
+        await catalog.revalidate(fetch)
+        return first, stale, catalog.snapshot
+
+    first, stale, fresh = asyncio.run(main())
+    assert stale.etag == first.etag
+    assert fresh.prices[1]['amount'] == '600' and fresh.etag != first.etag
+    assert len(calls) == 2
+
+def test_failed_refresh_keeps_previous_snapshot():
+    # Test case 3: The provider failing does not take the prices down
+    prices = list(PRICES)
+    fetch, calls = make_fetch(prices)
+
+    async def main():
+        catalog = PriceCatalog(max_age=0.0, client=fakeredis.FakeAsyncRedis(decode_responses=True))
+        first = await catalog.get(fetch)
+        prices[0] = ConnectionError('paddle is down')
+        with pytest.raises(ConnectionError):
+            await catalog.refresh(fetch)
+        return first, await catalog.get(fetch), catalog.metrics['refresh_errors']
+
+    first, second, errors = asyncio.run(main())
+    assert second.etag == first.etag
+    assert errors >= 1
+
+def test_etag_matches_if_none_match():
+    # Test case 4: Strong, weak, listed and wildcard tags match
+    assert etag_matches('"abc"', 'abc')
+    assert etag_matches('W/"abc"', 'abc')
+    assert etag_matches('"x", "abc"', 'abc')
+    assert etag_matches('*', 'abc')
+    assert not etag_matches('"x"', 'abc')
+    assert not etag_matches(None, 'abc')
@@ -0,0 +1,144 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from openai import AsyncOpenAI
+from app.lib.provider_router import Backend, CircuitBreaker, ProviderError, ProviderRouter, OPEN, HALF_OPEN, CLOSED
+from app.utils.request_helpers import get_chat_completion
+
+def make_backend(name, delay=0.0, error=None, exception=ProviderError, **kwargs):
+    calls = []
+
+    async def call(content, temperature, response_format):
+        calls.append(content)
+        await asyncio.sleep(delay)
+        if error:
+            raise exception(detail=error)
+        return name
+
+    return Backend(name, call, **kwargs), calls
+
+def test_breaker_opens_and_probes_after_reset():
+    # Test case 1: Breaker opens after consecutive failures and lets one probe through after the timeout
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    assert breaker.allow() is True
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is False
+
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow() is True
+
+def test_failover_to_next_backend():
+    # Test case 2: A failing primary is followed by the secondary
+    primary, _ = make_backend('primary', error='down')
+    secondary, _ = make_backend('secondary')
+    router = ProviderRouter([primary, secondary])
+
+    assert asyncio.run(router.complete({'content': 'hi'})) == 'secondary'
+    assert router.metrics['failovers'] == 1
+    assert primary.metrics['failures'] == 1
+
+def test_open_breaker_skips_backend():
+    # Test case 3: Once the breaker is open the failing backend is not called anymore
+    primary, primary_calls = make_backend('primary', error='down', breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    secondary, _ = make_backend('secondary')
+    router = ProviderRouter([primary, secondary])
+
+    async def main():
+        return [await router.complete({'content': 'hi'}) for _ in range(5)]
+
+    assert asyncio.run(main()) == ['secondary'] * 5
+    assert len(primary_calls) == 2
+    assert primary.stats()['state'] == OPEN
+
+def test_slow_primary_is_hedged():
+    # Test case 4: The secondary is asked when the primary is slower than its hedge delay, the first answer wins
+    primary, _ = make_backend('primary', delay=0.5, default_hedge_delay=0.02)
+    secondary, _ = make_backend('secondary', delay=0.01)
+    router = ProviderRouter([primary, secondary])
+
+    assert asyncio.run(router.complete({'content': 'hi'})) == 'secondary'
+    assert router.metrics['hedged'] == 1
+    assert router.metrics['hedge_wins'] == 1
+    assert primary.metrics['cancelled'] == 1
+    assert primary.breaker.failures == 0
+
+def test_fast_primary_is_not_hedged():
+    # Test case 5: Answers within the hedge delay never reach the secondary
+    primary, _ = make_backend('primary', delay=0.01, default_hedge_delay=0.5)
+    secondary, secondary_calls = make_backend('secondary')
+    router = ProviderRouter([primary, secondary])
+
+    assert asyncio.run(router.complete({'content': 'hi'})) == 'primary'
+    assert secondary_calls == []
+
+def test_all_backends_open_returns_503():
+    # Test case 6: With every breaker open the request is rejected with Retry-After
+    primary, _ = make_backend('primary', breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    primary.breaker.record_failure()
+    router = ProviderRouter([primary], retry_after=30)
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(router.complete({'content': 'hi'}))
+
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {'Retry-After': '30'}
+
+def test_all_backends_failing_raises_last_error():
+    # Test case 7: When every backend fails the last error is raised
+    primary, _ = make_backend('primary', error='primary down')
+    secondary, _ = make_backend('secondary', error='secondary down')
+    router = ProviderRouter([primary, secondary])
+
+    with pytest.raises(HTTPException, match='secondary down'):
+        asyncio.run(router.complete({'content': 'hi'}))
+
+def test_rejected_requests_do_not_trip_the_breaker():
+    # Test case 8: Errors that are not provider failures reach the caller, without failover or breaker failures
+    primary, _ = make_backend('primary', error='Response from AI is not valid.', exception=lambda detail: HTTPException(400, detail),
+                              breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    secondary, secondary_calls = make_backend('secondary')
+    router = ProviderRouter([primary, secondary])
+
+    with pytest.raises(HTTPException, match='not valid') as exc_info:
+        asyncio.run(router.complete({'content': 'hi'}))
+
+    assert not isinstance(exc_info.value, ProviderError)
+    assert secondary_calls == []
+    assert primary.stats()['state'] == CLOSED
+    assert primary.metrics['rejected'] == 1 and primary.metrics['failures'] == 0
+
+@pytest.mark.parametrize('answer, provider_failure', [
+    (httpx.Response(503, json={'error': {'message': 'overloaded'}}), True),
+    (httpx.ConnectTimeout('timed out'), True),
+    (httpx.Response(400, json={'error': {'message': 'bad request'}}), False),
+    (httpx.Response(200, json={'id': '1', 'object': 'chat.completion', 'created': 0, 'model': 'deepseek-chat',
+                               'choices': [{'index': 0, 'finish_reason': 'stop',
+                                            'message': {'role': 'assistant', 'content': 'not json'}}]}), False),
+])
+def test_chat_completion_errors_are_classified(answer, provider_failure):
+    # Test case 9: 5xx answers and timeouts are provider failures, rejected requests and unparsable answers are not
+    def handler(request: httpx.Request):
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    async def main():
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client = AsyncOpenAI(api_key='key', base_url='http://deepseek', http_client=http_client, max_retries=0)
+        async with http_client:
+            return await get_chat_completion(client, {'role': 'user', 'content': 'hi'}, response_format='json_object')
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(main())
+
+    assert isinstance(exc_info.value, ProviderError) == provider_failure
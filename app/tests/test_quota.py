@@ -0,0 +1,83 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import time
+import asyncio
+import pytest
+from app.lib.quota import QuotaEngine, quota_key, QUOTA_ALLOWED, QUOTA_EXCEEDED, QUOTA_MISSING
+
+# The scripts need a Redis that runs Lua, fakeredis does with the lupa package installed.
+fakeredis = pytest.importorskip('fakeredis')
+pytest.importorskip('lupa')
+
+def run(scenario):
+    # Each scenario gets a new engine, async clients are bound to the event loop they are used on
+    async def main():
+        return await scenario(QuotaEngine(client=fakeredis.FakeAsyncRedis(decode_responses=True)))
+    return asyncio.run(main())
+
+def test_missing_period_is_reported_until_seeded():
+    # Test case 1: A user without counters has to be seeded before requests are counted
+    async def scenario(engine):
+        missing = await engine.consume('user', 'generateReq', 10)
+        await engine.seed('user', {'generateReq': 3})
+        return missing, await engine.consume('user', 'generateReq', 10)
+
+    assert run(scenario) == ((QUOTA_MISSING, 0), (QUOTA_ALLOWED, 4))
+
+def test_seed_keeps_existing_period():
+    # Test case 2: A second seed does not reset counters another request already started
+    async def scenario(engine):
+        await engine.seed('user', {})
+        await engine.consume('user', 'generateReq', 10)
+        await engine.seed('user', {'generateReq': 0})
+        return await engine.consume('user', 'generateReq', 10)
+
+    assert run(scenario) == (QUOTA_ALLOWED, 2)
+
+def test_period_expires_at_reset_time():
+    # Test case 3: Counters expire at the reset time of the period
+    async def scenario(engine):
+        await engine.seed('user', {}, time.time() + 100)
+        return await engine.client.ttl(quota_key('user'))
+
+    assert abs(run(scenario) - 100) <= 1
+
+def test_limit_is_not_exceeded_under_concurrency():
+    # Test case 4: Of many concurrent requests exactly limit are allowed
+    async def scenario(engine):
+        await engine.seed('user', {})
+        results = await asyncio.gather(*(engine.consume('user', 'paraphraseReq', 7) for _ in range(200)))
+        return [status for status, _ in results], await engine.client.hget(quota_key('user'), 'paraphraseReq')
+
+    results, count = run(scenario)
+    assert results.count(QUOTA_ALLOWED) == 7
+    assert results.count(QUOTA_EXCEEDED) == 193
+    assert count == '7'
+
+def test_changed_users_are_read_for_reconciliation():
+    # Test case 5: Users with counted requests are collected once with their counters
+    async def scenario(engine):
+        await engine.seed('a', {'generateReq': 2}, time.time() + 100)
+        await engine.seed('b', {})
+        await engine.consume('a', 'generateReq', 10)
+
+        user_ids = await engine.pop_dirty(10)
+        return user_ids, await engine.read(user_ids), await engine.pop_dirty(10)
+
+    user_ids, records, remaining = run(scenario)
+    assert user_ids == ['a']
+    assert records[0]['user_id'] == 'a'
+    assert records[0]['counts'] == {'generateReq': 3}
+    assert remaining == []
+
+def test_quota_calls_do_not_block_the_event_loop():
+    # Test case 6: Requests are counted with the asyncio Redis client, no call of the engine blocks the event loop
+    import inspect
+    import redis.asyncio
+    from app.lib.rd import create_redis
+
+    assert isinstance(create_redis(host='localhost'), redis.asyncio.Redis)
+    for name in ('consume', 'seed', 'pop_dirty', 'dirty_count', 'mark_dirty', 'read'):
+        assert inspect.iscoroutinefunction(getattr(QuotaEngine, name)), name
@@ -0,0 +1,65 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import asyncio
+from app.lib.resources import Resources
+
+class StandIn:
+    def __init__(self, name, closed):
+        self.name = name
+        self.closed = closed
+
+    async def aclose(self):
+        self.closed.append(self.name)
+
+def test_resources_are_closed_in_reverse_order():
+    # Test case 1: Resources are closed last created first, after the background tasks are cancelled
+    closed = []
+
+    async def main():
+        resources = Resources()
+        resources.add('redis', lambda: StandIn('redis', closed), lambda client: client.aclose())
+        resources.add('google', lambda: StandIn('google', closed), lambda client: client.aclose())
+        resources.add('hf', lambda: None, lambda client: client.aclose())
+        task = resources.start_task(asyncio.sleep(3600))
+
+        await resources.close()
+        return task
+
+    task = asyncio.run(main())
+    assert closed == ['google', 'redis']
+    assert task.cancelled()
+
+def test_overrides_replace_and_are_not_closed():
+    # Test case 2: A local stand-in is used instead of the factory and is left to its owner
+    closed = []
+    stand_in = StandIn('google', closed)
+
+    def factory():
+        raise AssertionError('factory of an overridden resource is called')
+
+    async def main():
+        resources = Resources({'google': stand_in})
+        resources.add('google', factory, lambda client: client.aclose())
+        assert resources['google'] is stand_in
+        await resources.close()
+
+    asyncio.run(main())
+    assert closed == []
+
+def test_close_continues_after_a_failure():
+    # Test case 3: A client that fails to close does not keep the others open
+    closed = []
+
+    async def fail(client):
+        raise RuntimeError('connection reset')
+
+    async def main():
+        resources = Resources()
+        resources.add('redis', lambda: StandIn('redis', closed), lambda client: client.aclose())
+        resources.add('google', lambda: StandIn('google', closed), fail)
+        await resources.close()
+
+    asyncio.run(main())
+    assert closed == ['redis']
@@ -0,0 +1,95 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import asyncio
+import pytest
+from app.lib.cache import RedisCache
+from app.lib.sentence_cache import make_cache_key
+
+def test_cache_key_is_normalized():
+    # Test case 1: Word case and category order should not create new keys
+    first = make_cache_key('Visited', ['science', 'health'], 10, None, 1, 10)
+    second = make_cache_key('visited ', ['health', 'science', 'health'], 10, None, 1, 10)
+
+    assert first == second
+
+def test_cache_key_depends_on_filters():
+    # Test case 2: Different pages or filters should have different keys
+    base = make_cache_key('visited', None, None, None, 1, 10)
+
+    assert base != make_cache_key('visited', None, None, None, 2, 10)
+    assert base != make_cache_key('visited', ['science'], None, None, 1, 10)
+    assert base != make_cache_key('visited', None, 5, None, 1, 10)
+    assert base != make_cache_key('visited', None, None, None, 1, 10, offsets=True)
+
+def test_cache_key_with_cursor_ignores_page():
+    # Test case 3: Page is ignored when a cursor token is given
+    assert make_cache_key('visited', None, None, None, 1, 10, 'token') == make_cache_key('visited', None, None, None, 3, 10, 'token')
+
+def make_cache(ttl: int = 60, max_entries: int = 100):
+    fakeredis = pytest.importorskip('fakeredis')
+    return RedisCache('test_cache', ttl=ttl, max_entries=max_entries, client=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+def test_evicted_keys_leave_their_tag_sets():
+    # Test case 4: Keys evicted by the size cap are removed from every tag set they were added to
+    cache = make_cache(max_entries=2)
+
+    async def main():
+        await cache.set('a', 1, ['science', 'health'])
+        await cache.set('b', 2, ['science'])
+        await cache.set('c', 3, ['health'])
+        return (await cache.client.smembers('test_cache:tag:science'), await cache.client.smembers('test_cache:tag:health'),
+                await cache.client.hkeys('test_cache:tags'))
+
+    science, health, tagged = asyncio.run(main())
+    assert science == {'b'}
+    assert health == {'c'}
+    assert sorted(tagged) == ['b', 'c']
+
+def test_expired_keys_leave_their_tag_sets():
+    # Test case 5: Keys not touched for the TTL are pruned from the LRU and the tag sets on the next write
+    cache = make_cache(ttl=60)
+
+    async def main():
+        await cache.set('old', 1, ['science'])
+        # Age the entry past the TTL.
+        await cache.client.zadd('test_cache:lru', {'old': 0})
+        await cache.set('new', 2, ['science'])
+        return await cache.client.smembers('test_cache:tag:science'), await cache.client.zrange('test_cache:lru', 0, -1)
+
+    science, lru = asyncio.run(main())
+    assert science == {'new'}
+    assert lru == ['new']
+
+def test_invalidated_keys_leave_their_other_tag_sets():
+    # Test case 6: Invalidating one tag removes its keys from the sets of their other tags
+    cache = make_cache()
+
+    async def main():
+        await cache.set('a', 1, ['science', 'health'])
+        await cache.set('b', 2, ['health'])
+        await cache.invalidate(['science'])
+        return await cache.get('a'), await cache.client.smembers('test_cache:tag:health')
+
+    value, health = asyncio.run(main())
+    assert value is None
+    assert health == {'b'}
+
+def test_hits_extend_the_ttl():
+    # Test case 7: A read value lives ttl seconds from the read, its tag set stays as long as it does
+    cache = make_cache(ttl=60)
+
+    async def main():
+        await cache.set('a', 1, ['science'])
+        await cache.set_many({'b': 2})
+        # Close to expiring when they are read.
+        await cache.client.expire('a', 1)
+        await cache.client.expire('b', 1)
+        await cache.get('a')
+        await cache.get_many(['b'])
+        return [await cache.client.ttl(key) for key in ('a', 'b')], await cache.client.ttl('test_cache:tag:science')
+
+    value_ttls, tag_ttl = asyncio.run(main())
+    assert all(55 < ttl <= 60 for ttl in value_ttls)
+    assert tag_ttl == -1
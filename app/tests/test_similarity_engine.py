@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pytest
+from word.spacyWord import SimilarityEngine
+
+class FakeDoc:
+    def __init__(self, vector):
+        self.vector = np.array(vector, dtype=np.float32)
+
+class FakeNlp:
+    """Stand-in pipeline with fixed vectors, counting how many texts were processed."""
+    VECTORS = {'cat': [1, 0], 'dog': [1, 1], 'car': [0, 2], 'empty': [0, 0]}
+
+    def __init__(self):
+        self.processed = []
+
+    def pipe(self, texts):
+        self.processed.extend(texts)
+        return [FakeDoc(self.VECTORS[text]) for text in texts]
+
+def test_similarity_is_cosine():
+    # Test case 1: Score is the cosine of the doc vectors
+    engine = SimilarityEngine(FakeNlp())
+
+    assert engine.similarity('cat', 'dog') == pytest.approx(1 / np.sqrt(2))
+    assert engine.similarity('cat', 'car') == pytest.approx(0.0)
+
+def test_zero_vector_scores_zero():
+    # Test case 2: Words without a vector score 0.0 instead of nan
+    engine = SimilarityEngine(FakeNlp())
+
+    assert engine.similarity('empty', 'cat') == 0.0
+
+def test_vectors_are_cached():
+    # Test case 3: Every word goes through the pipeline only once
+    nlp = FakeNlp()
+    engine = SimilarityEngine(nlp)
+
+    engine.similarity('cat', 'dog')
+    engine.similarity('dog', 'car')
+
+    assert nlp.processed == ['cat', 'dog', 'car']
+
+def test_full_cache_starts_over():
+    # Test case 4: Cached words stay correct after the cache is reset
+    engine = SimilarityEngine(FakeNlp(), cache_size=2)
+
+    engine.similarity('cat', 'dog')
+
+    assert engine.similarity('cat', 'car') == pytest.approx(0.0)
+    assert len(engine.rows) == 2
+
+def test_similarities_keep_candidate_order():
+    # Test case 5: Batch scores match pair scores and candidate order
+    engine = SimilarityEngine(FakeNlp())
+
+    scores = engine.similarities('cat', ['dog', 'car', 'cat'])
+
+    assert scores.tolist() == pytest.approx([engine.similarity('cat', 'dog'), 0.0, 1.0])
+
+def test_rank_top_k():
+    # Test case 6: Top k returns the best candidates sorted by score
+    engine = SimilarityEngine(FakeNlp())
+
+    ranked = engine.rank('cat', ['car', 'dog', 'cat', 'empty'], top_k=2)
+
+    assert [word for word, _ in ranked] == ['cat', 'dog']
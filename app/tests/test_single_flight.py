@@ -0,0 +1,63 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import asyncio
+from app.lib.single_flight import SingleFlight
+
+def test_identical_calls_share_one_upstream_call():
+    # Test case 1: Concurrent calls with the same key run func once
+    flights = SingleFlight('test')
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'answer': 42}
+
+    async def main():
+        return await asyncio.gather(*(flights.run('same', fetch) for _ in range(10)))
+
+    results = asyncio.run(main())
+
+    assert results == [{'answer': 42}] * 10
+    assert len(calls) == 1
+    assert flights.stats() == {'calls': 10, 'leaders': 1, 'coalesced': 9, 'remote_coalesced': 0, 'in_flight': 0}
+
+def test_different_keys_are_not_coalesced():
+    # Test case 2: Different arguments get their own upstream call
+    flights = SingleFlight('test')
+
+    async def main():
+        return await asyncio.gather(flights.run('a', lambda: asyncio.sleep(0.01, 'a')), flights.run('b', lambda: asyncio.sleep(0.01, 'b')))
+
+    assert asyncio.run(main()) == ['a', 'b']
+    assert flights.metrics['coalesced'] == 0
+
+def test_errors_are_shared():
+    # Test case 3: Every coalesced caller receives the upstream error
+    flights = SingleFlight('test')
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError('upstream failed')
+
+    async def main():
+        return await asyncio.gather(*(flights.run('same', fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_cancelled_caller_does_not_cancel_others():
+    # Test case 4: A disconnected caller does not cancel the shared call
+    flights = SingleFlight('test')
+
+    async def main():
+        first = asyncio.ensure_future(flights.run('same', lambda: asyncio.sleep(0.02, 'done')))
+        second = asyncio.ensure_future(flights.run('same', lambda: asyncio.sleep(0.02, 'done')))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == 'done'
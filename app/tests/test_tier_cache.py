@@ -0,0 +1,109 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import time
+import asyncio
+import pytest
+from app.lib.tier_cache import LocalTTLCache, TierCache
+
+fakeredis = pytest.importorskip('fakeredis')
+
+def make_loader(tiers: dict):
+    calls = []
+
+    async def load(user_id):
+        calls.append(user_id)
+        return tiers[user_id]
+
+    return load, calls
+
+def test_local_cache_expires_and_evicts():
+    # Test case 1: Entries expire after the ttl and the least recently used entry is evicted
+    cache = LocalTTLCache(max_entries=2, ttl=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+
+    time.sleep(0.06)
+    assert cache.get('a') is None
+
+def make_workers(count: int) -> list[TierCache]:
+    # Workers of one deployment share a Redis server
+    server = fakeredis.FakeServer()
+    return [TierCache(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True)) for _ in range(count)]
+
+def test_tier_is_loaded_once():
+    # Test case 2: Repeated lookups are served from the local cache, other workers from Redis
+    load, calls = make_loader({'user': 'premium'})
+
+    async def main():
+        worker_1, worker_2 = make_workers(2)
+        tiers = [await worker_1.get('user', load) for _ in range(3)] + [await worker_2.get('user', load)]
+        return tiers, worker_1, worker_2
+
+    tiers, worker_1, worker_2 = asyncio.run(main())
+    assert tiers == ['premium'] * 4
+    assert calls == ['user']
+    assert worker_1.metrics['local_hits'] == 2
+    assert worker_2.metrics['redis_hits'] == 1
+
+def test_invalidation_reaches_other_workers():
+    # Test case 3: A tier change in one worker is dropped from the local cache of the others
+    tiers = {'user': 'free'}
+    load, calls = make_loader(tiers)
+
+    async def main():
+        worker_1, worker_2 = make_workers(2)
+        listener = asyncio.create_task(worker_2.listen())
+        try:
+            # Let the listener subscribe before publishing
+            await asyncio.sleep(0.05)
+            first = await worker_2.get('user', load)
+
+            tiers['user'] = 'premium'
+            await worker_1.invalidate('user')
+
+            deadline = time.monotonic() + 2
+            while worker_2.local.get('user') is not None and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+
+            return first, await worker_2.get('user', load)
+        finally:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+
+    assert asyncio.run(main()) == ('free', 'premium')
+    assert calls == ['user', 'user']
+
+def test_load_overlapping_an_invalidation_is_not_cached():
+    # Test case 4: A tier loaded in one worker while another invalidates it is served but not written to Redis
+    tiers = {'user': 'free'}
+    loading = asyncio.Event()
+    invalidated = asyncio.Event()
+
+    async def slow_load(user_id):
+        tier = tiers[user_id]
+        loading.set()
+        await invalidated.wait()
+        return tier
+
+    load, calls = make_loader(tiers)
+
+    async def main():
+        worker_1, worker_2 = make_workers(2)
+        stale = asyncio.create_task(worker_2.get('user', slow_load))
+        await loading.wait()
+
+        tiers['user'] = 'premium'
+        await worker_1.invalidate('user')
+        invalidated.set()
+
+        return await stale, await worker_1.get('user', load)
+
+    assert asyncio.run(main()) == ('free', 'premium')
+    assert calls == ['user']
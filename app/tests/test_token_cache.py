@@ -0,0 +1,102 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import time
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from app.lib.token_cache import TokenCache
+from app.user.utils.google import fetch_google_identity
+
+fakeredis = pytest.importorskip('fakeredis')
+
+USERS = {'ahmet@example.com': 'user-1'}
+
+def make_tokeninfo_stand_in(valid_tokens: dict):
+    """
+    Local stand-in for Google's tokeninfo endpoint, answering after a short delay like the real one.
+    Tokens are opaque, valid ones map to their email and seconds until they expire.
+    """
+    calls = []
+
+    async def handler(request: httpx.Request):
+        token = dict(httpx.QueryParams(request.content.decode()))['access_token']
+        calls.append(token)
+        await asyncio.sleep(0.02)
+        if token not in valid_tokens:
+            return httpx.Response(400, json={'error': 'invalid_token'})
+        email, expires_in = valid_tokens[token]
+        return httpx.Response(200, json={'email': email, 'exp': str(int(time.time()) + expires_in), 'expires_in': str(expires_in)})
+
+    return handler, calls
+
+def make_resolver(handler):
+    async def resolve(token):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url='http://tokeninfo') as client:
+            email, expires_at = await fetch_google_identity(client, token, url='/tokeninfo')
+        return USERS[email], expires_at
+    return resolve
+
+def make_cache(**kwargs):
+    return TokenCache(client=fakeredis.FakeAsyncRedis(decode_responses=True), **kwargs)
+
+def test_token_is_resolved_once():
+    # Test case 1: Later requests with the same token do not call tokeninfo
+    handler, calls = make_tokeninfo_stand_in({'token': ('ahmet@example.com', 3599)})
+    resolve = make_resolver(handler)
+
+    async def main():
+        cache = make_cache()
+        return [await cache.get('token', lambda: resolve('token')) for _ in range(5)], cache
+
+    user_ids, cache = asyncio.run(main())
+    assert user_ids == ['user-1'] * 5
+    assert len(calls) == 1
+    assert cache.metrics['local_hits'] == 4
+
+def test_concurrent_misses_are_coalesced():
+    # Test case 2: Concurrent requests with a new token share one tokeninfo call
+    handler, calls = make_tokeninfo_stand_in({'token': ('ahmet@example.com', 3599)})
+    resolve = make_resolver(handler)
+
+    async def main():
+        cache = make_cache()
+        return await asyncio.gather(*(cache.get('token', lambda: resolve('token')) for _ in range(20)))
+
+    assert asyncio.run(main()) == ['user-1'] * 20
+    assert len(calls) == 1
+
+def test_ttl_is_bounded_by_token_expiry():
+    # Test case 3: A token that expires soon is cached until its expiry, an expired one is not cached
+    soon, expired = 'ya29.soon', 'ya29.expired'
+    handler, calls = make_tokeninfo_stand_in({soon: ('ahmet@example.com', 5), expired: ('ahmet@example.com', -5)})
+    resolve = make_resolver(handler)
+
+    async def main():
+        cache = make_cache(ttl=300)
+        await cache.get(soon, lambda: resolve(soon))
+        await cache.get(expired, lambda: resolve(expired))
+        await cache.get(expired, lambda: resolve(expired))
+        return [await cache.client.ttl(key) for key in await cache.client.keys('token_cache:*')]
+
+    ttls = asyncio.run(main())
+    assert len(ttls) == 1 and 0 < ttls[0] <= 5
+    assert len(calls) == 3
+
+def test_rejected_token_is_not_cached():
+    # Test case 4: Invalid tokens are rejected with a 401 every time
+    handler, calls = make_tokeninfo_stand_in({})
+    resolve = make_resolver(handler)
+
+    async def main():
+        cache = make_cache()
+        for _ in range(2):
+            with pytest.raises(HTTPException) as exc_info:
+                await cache.get('bad', lambda: resolve('bad'))
+            assert exc_info.value.status_code == 401
+        return await cache.client.keys('token_cache:*')
+
+    assert asyncio.run(main()) == []
+    assert len(calls) == 2
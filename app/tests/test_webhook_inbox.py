@@ -0,0 +1,200 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+from pymongo.errors import DuplicateKeyError
+from app.lib.webhook_inbox import WebhookInbox, EVENT_PENDING, EVENT_PROCESSED, EVENT_FAILED
+from app.routes.paddle.utils import fold_subscription_events, guarded_update
+
+# The inbox lock is released with a Lua script, fakeredis runs it with the lupa package installed.
+fakeredis = pytest.importorskip('fakeredis')
+pytest.importorskip('lupa')
+
+class Cursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        for key, direction in reversed(keys):
+            self.documents.sort(key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return self.documents
+
+class EventCollection:
+    """In memory stand-in for the events collection, with the queries the inbox uses."""
+    def __init__(self):
+        self.documents = {}
+
+    async def insert_one(self, document):
+        if document['_id'] in self.documents:
+            raise DuplicateKeyError('duplicate key')
+        self.documents[document['_id']] = dict(document)
+
+    def find(self, query):
+        return Cursor([dict(document) for document in self.documents.values() if document['status'] == query['status']])
+
+    async def update_many(self, query, update):
+        modified = 0
+        for document in self.documents.values():
+            if document['_id'] not in query['_id']['$in'] or document['attempts'] < query.get('attempts', {}).get('$gte', 0):
+                continue
+            document.update(update.get('$set', {}))
+            for field, value in update.get('$inc', {}).items():
+                document[field] += value
+            modified += 1
+        return SimpleNamespace(modified_count=modified)
+
+def evaluate(expression, document):
+    """Evaluate the aggregation expressions guarded_update uses against a document."""
+    if isinstance(expression, str) and expression.startswith('$'):
+        value = document
+        for part in expression[1:].split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+    if isinstance(expression, dict):
+        (operator, operands), = expression.items()
+        if operator == '$literal':
+            return operands
+        if operator == '$ifNull':
+            value = evaluate(operands[0], document)
+            return value if value is not None else evaluate(operands[1], document)
+        if operator == '$lt':
+            return evaluate(operands[0], document) < evaluate(operands[1], document)
+        if operator == '$cond':
+            return evaluate(operands[1] if evaluate(operands[0], document) else operands[2], document)
+    return expression
+
+def run_pipeline(pipeline, document):
+    # Every expression of a $set stage reads the document as it was before the stage.
+    updated = {key: dict(value) if isinstance(value, dict) else value for key, value in document.items()}
+    for stage in pipeline:
+        for path, expression in stage['$set'].items():
+            value = evaluate(expression, document)
+            *parents, name = path.split('.')
+            target = updated
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            if value is None:
+                target.pop(name, None)
+            else:
+                target[name] = value
+        document = updated
+    return document
+
+def subscription_event(event_id, event_type, occurred_at, email='ahmet@example.com', **data):
+    return {'_id': event_id, 'event_type': event_type, 'occurred_at': occurred_at,
+            'payload': {'id': 'sub_1', 'custom_data': {'email': email}, **data}}
+
+def make_inbox(apply, **kwargs):
+    return WebhookInbox(EventCollection(), apply, client=fakeredis.FakeAsyncRedis(decode_responses=True), **kwargs)
+
+def test_retried_delivery_is_applied_once():
+    # Test case 1: An event delivered twice is stored and applied once
+    applied = []
+
+    async def apply(events):
+        applied.extend(event['_id'] for event in events)
+
+    async def main():
+        inbox = make_inbox(apply)
+        received = [await inbox.receive('evt_1', 'subscription.updated', '2025-01-01T00:00:00Z', {}) for _ in range(2)]
+        await inbox.process()
+        await inbox.process()
+        return received, inbox
+
+    received, inbox = asyncio.run(main())
+    assert received == [True, False]
+    assert applied == ['evt_1']
+    assert inbox.collection.documents['evt_1']['status'] == EVENT_PROCESSED
+
+def test_events_are_applied_in_order_in_batches():
+    # Test case 2: Events are applied in the order they occurred, batch_size at a time
+    batches = []
+
+    async def apply(events):
+        batches.append([event['_id'] for event in events])
+
+    async def main():
+        inbox = make_inbox(apply, batch_size=2)
+        for event_id, occurred_at in [('c', '03'), ('a', '01'), ('b', '02')]:
+            await inbox.receive(event_id, 'subscription.updated', occurred_at, {})
+        return await inbox.process()
+
+    assert asyncio.run(main()) == 3
+    assert batches == [['a', 'b'], ['c']]
+
+def test_failing_batch_is_retried_then_marked_failed():
+    # Test case 3: A batch that keeps failing holds later events back until its attempts are used up
+    async def apply(events):
+        raise ConnectionError('database is down')
+
+    async def main():
+        inbox = make_inbox(apply, max_attempts=2)
+        await inbox.receive('evt_1', 'subscription.updated', '01', {})
+        statuses = []
+        for _ in range(2):
+            await inbox.process()
+            statuses.append(inbox.collection.documents['evt_1']['status'])
+        return statuses
+
+    assert asyncio.run(main()) == [EVENT_PENDING, EVENT_FAILED]
+
+def test_subscription_events_are_folded_per_customer():
+    # Test case 4: The latest event of a customer wins, unreadable and unrelated events are skipped
+    items = [{'price': {'name': 'premium'}}]
+    events = [
+        subscription_event('2', 'subscription.cancelled', '2025-01-02T00:00:00Z'),
+        subscription_event('1', 'subscription.created', '2025-01-01T00:00:00Z', items=items),
+        subscription_event('3', 'subscription.updated', '2025-01-01T12:00:00Z', email='mehmet@example.com'),
+        {'_id': '4', 'event_type': 'subscription.created', 'occurred_at': '2025-01-03T00:00:00Z', 'payload': {}},
+        subscription_event('5', 'price.updated', '2025-01-03T00:00:00Z'),
+    ]
+
+    folded = fold_subscription_events(events)
+
+    assert folded['ahmet@example.com'] == {
+        'fields': {'subscription_status': 'inactive', 'userType': 'Free', 'subscription_id': ''},
+        'occurred_at': dict.fromkeys(['subscription_status', 'userType', 'subscription_id'], '2025-01-02T00:00:00Z'),
+        'upsert': True,
+    }
+    assert folded['mehmet@example.com']['fields'] == {'subscription_status': 'active'}
+    assert len(folded) == 2
+
+def test_older_event_in_a_later_batch_sets_fields_no_newer_event_touched():
+    # Test case 5: subscription.updated applied before an older subscription.created still gets the user its tier
+    users = {'ahmet@example.com': {'email': 'ahmet@example.com', 'userType': 'Free'}}
+
+    async def apply(events):
+        for email, change in fold_subscription_events(events).items():
+            users[email] = run_pipeline(guarded_update(change['fields'], change['occurred_at']), users[email])
+
+    async def main():
+        inbox = make_inbox(apply)
+        updated = subscription_event('evt_2', 'subscription.updated', '2025-01-01T00:00:05Z',
+                                     scheduled_change={'action': 'cancel'})
+        created = subscription_event('evt_1', 'subscription.created', '2025-01-01T00:00:03Z',
+                                     items=[{'price': {'name': 'Premium'}}])
+        for event in (updated, created):
+            await inbox.receive(event['_id'], event['event_type'], event['occurred_at'], event['payload'])
+            await inbox.process()
+
+    asyncio.run(main())
+    user = users['ahmet@example.com']
+    assert user['userType'] == 'Premium'
+    assert user['subscription_id'] == 'sub_1'
+    # The status of the newer update is kept.
+    assert user['subscription_status'] == 'cancelled'
+    assert user['paddle_field_event_at'] == {
+        'subscription_status': '2025-01-01T00:00:05Z',
+        'userType': '2025-01-01T00:00:03Z',
+        'subscription_id': '2025-01-01T00:00:03Z',
+    }
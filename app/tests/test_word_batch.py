@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import json
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from app.lib.cache import RedisCache
+from app.lib.word_batch import stream_word_infos
+from app.responses.ndjson import ndjson_response
+
+fakeredis = pytest.importorskip('fakeredis')
+
+KNOWN = {'run': 'verb', 'tree': 'noun', 'quick': 'adjective'}
+
+def make_compute():
+    """
+    Stand-in for the WordNet lookup of a chunk, recording the words it was asked for.
+    """
+    calls = []
+
+    def compute(words):
+        calls.append(list(words))
+        return [(word, {'noun': [], 'verb': [], 'adjective': [], 'adverb': [], 'pos': KNOWN.get(word)}) for word in words]
+
+    return compute, calls
+
+def collect(words, cache, compute, **kwargs):
+    async def main():
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            return [line async for line in stream_word_infos(words, pool, cache=cache, compute=compute, **kwargs)]
+    return main()
+
+def make_cache():
+    return RedisCache('test_word_info', ttl=60, max_entries=100, client=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+def test_words_are_deduplicated_and_chunked():
+    # Test case 1: Each distinct word is looked up once, chunk_size words per task
+    compute, calls = make_compute()
+
+    async def main():
+        return await collect(['Run', 'tree', 'run ', 'quick', 'xyzzy'], make_cache(), compute, chunk_size=2)
+
+    lines = asyncio.run(main())
+    assert sorted(line['word'] for line in lines) == ['quick', 'run', 'tree', 'xyzzy']
+    assert sorted(word for chunk in calls for word in chunk) == ['quick', 'run', 'tree', 'xyzzy']
+    assert max(len(chunk) for chunk in calls) == 2
+    assert {'word': 'xyzzy', 'error': 'Word not found.'} in lines
+
+def test_cached_words_are_not_computed_again():
+    # Test case 2: A second batch computes only the words the first one did not have
+    compute, calls = make_compute()
+
+    async def main():
+        cache = make_cache()
+        await collect(['run', 'tree'], cache, compute)
+        calls.clear()
+        return await collect(['quick', 'tree', 'run'], cache, compute)
+
+    lines = asyncio.run(main())
+    assert calls == [['quick']]
+    # Cached words are sent before computed ones
+    assert [line['word'] for line in lines] == ['tree', 'run', 'quick']
+
+def test_error_after_first_line_is_streamed():
+    # Test case 3: A failure mid stream ends it with an error line instead of cutting it off
+    async def items():
+        yield {'word': 'run'}
+        raise LookupError('wordnet not found')
+
+    async def main():
+        response = await ndjson_response(items())
+        return [json.loads(chunk) async for chunk in response.body_iterator]
+
+    lines = asyncio.run(main())
+    assert lines == [{'word': 'run'}, {'error': {'status_code': 500, 'detail': 'Internal Server Error'}}]
@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+from word.word_info_store import WordInfoMemo, WordInfoStore
+from word.pos_table import PosTable, UNIVERSAL_TAGS
+
+def make_compute():
+    """
+    Stand-in for the WordNet lookup, recording the words it was asked for.
+    """
+    calls = []
+
+    def compute(word):
+        calls.append(word)
+        return {'noun': [], 'verb': [], 'adjective': [], 'adverb': [], 'pos': 'noun'}
+
+    return compute, calls
+
+def test_words_are_computed_once_per_process(tmp_path):
+    # Test case 1: Lookups of the same word in any case are served from the LRU after the first one
+    compute, calls = make_compute()
+    memo = WordInfoMemo(compute, store=WordInfoStore(str(tmp_path / 'word_info.sqlite3')))
+
+    assert memo.get('Tree') == memo.get('tree ') == memo.get('TREE')
+    assert calls == ['tree']
+    assert memo.stats()['local_hits'] == 2
+
+def test_store_is_shared_by_workers(tmp_path):
+    # Test case 2: A word looked up by one worker is read from disk by the others
+    path = str(tmp_path / 'word_info.sqlite3')
+    compute, calls = make_compute()
+    worker_1 = WordInfoMemo(compute, store=WordInfoStore(path))
+    worker_2 = WordInfoMemo(compute, store=WordInfoStore(path))
+
+    worker_1.get_many(['run', 'tree'])
+    infos = worker_2.get_many(['tree', 'run', 'quick'])
+
+    assert [word for word, _ in infos] == ['tree', 'run', 'quick']
+    assert calls == ['run', 'tree', 'quick']
+    assert worker_2.metrics['store_hits'] == 2
+
+def test_unusable_store_falls_back_to_compute(tmp_path):
+    # Test case 3: A store that cannot be opened does not fail lookups
+    compute, calls = make_compute()
+    memo = WordInfoMemo(compute, store=WordInfoStore(str(tmp_path / 'missing' / 'word_info.sqlite3')))
+
+    assert memo.get('tree')['pos'] == 'noun'
+    assert memo.metrics['store_errors'] == 2
+
+def test_warmup_loads_most_frequent_words(tmp_path):
+    # Test case 4: Warmup preloads the most frequent alphabetic words of the corpus
+    table = np.zeros(4, dtype=[('word', 'S8'), ('counts', np.uint32, (len(UNIVERSAL_TAGS),))])
+    table['word'] = [b'the', b',', b'tree', b'rare']
+    table['counts'][:, 0] = [100, 200, 10, 1]
+    compute, calls = make_compute()
+    memo = WordInfoMemo(compute, store=WordInfoStore(str(tmp_path / 'word_info.sqlite3')))
+
+    assert PosTable(table).most_frequent(2) == ['the', 'tree']
+    assert memo.warm(PosTable(table).most_frequent(2)) == 2
+
+    memo.get('the')
+    assert calls == ['the', 'tree']
+    assert memo.stats()['hit_rate'] == round(1 / 3, 4)
+
+def test_warmup_stops_between_chunks_and_runs_once(monkeypatch):
+    # Test case 5: A set stop event ends the warmup after the current chunk, a finished warmup is not repeated
+    import threading
+    import word.wordkit as wordkit
+
+    table = np.zeros(5, dtype=[('word', 'S8'), ('counts', np.uint32, (len(UNIVERSAL_TAGS),))])
+    table['word'] = [b'a', b'b', b'c', b'd', b'e']
+    table['counts'][:, 0] = [5, 4, 3, 2, 1]
+    stop = threading.Event()
+    calls = []
+
+    def compute(word):
+        calls.append(word)
+        stop.set()
+        return {'pos': None}
+
+    monkeypatch.setattr(wordkit, 'word_info_memo', WordInfoMemo(compute))
+    monkeypatch.setattr(wordkit, 'get_lexicon', lambda: None)
+    monkeypatch.setattr(wordkit, 'get_pos_table', lambda: PosTable(table))
+    monkeypatch.setattr(wordkit, '_word_info_warmed', False)
+
+    assert wordkit.warm_word_info(5, stop, chunk_size=2) == 2
+    assert calls == ['a', 'b']
+
+    assert wordkit.warm_word_info(5, chunk_size=2) == 5
+    assert wordkit.warm_word_info(5, chunk_size=2) == 0
+    assert calls == ['a', 'b', 'c', 'd', 'e']
@@ -3,12 +3,14 @@ from fastapi import Depends, Header
 from typing import Annotated
 from app.user.utils.helpers import *
 from typing import Literal
+import httpx
+from app.lib.resources import get_resource
 
 security = HTTPBearer(
     description="Enter your JWT token from Next Auth"
 )
 
-async def get_user_id(credentials: Annotated[str, Depends(security)], provider : Literal['google', 'credentials'] = Header(None, alias='X-Provider')):
+async def get_user_id(credentials: Annotated[str, Depends(security)], google_client: Annotated[httpx.AsyncClient, Depends(get_resource('google'))], provider : Literal['google', 'credentials'] = Header(None, alias='X-Provider')):
     # Get token from credentials
     token = credentials.credentials
 
@@ -16,5 +18,5 @@ async def get_user_id(credentials: Annotated[str, Depends(security)], provider :
         user_id = await extract_id_from_jwt(token)
         return user_id
     else:
-        user_id = await extract_id_from_email(token)
+        user_id = await extract_id_from_email(token, google_client)
         return user_id
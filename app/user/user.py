@@ -1,13 +1,13 @@
-from app.models.database import db
+from app.models.async_database import db
 from bson import ObjectId
-from pymongo.errors import WriteError
-from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from datetime import datetime
 from fastapi import HTTPException
-from pymongo import ReturnDocument
-from app.lib.rd import r
+from app.lib.tier_cache import tier_cache_from_env
+from app.lib.metrics import register_metrics
 import logging
-import time
-import json
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -42,76 +42,74 @@ USER_LIMITS = {
     }
 }
 
-def get_user_tier(user_id : str) -> str:
+# Tiers are read on every quota check but change only in Paddle webhooks, which invalidate them.
+tier_cache = tier_cache_from_env()
+register_metrics('tier_cache')(tier_cache.stats)
+
+async def get_user_tier(user_id : str) -> str:
+    """
+    Retrieve user type (free, premium, premium_plus), from the tier cache or the users collection.
+    """
+    return await tier_cache.get(user_id, load_user_tier)
+
+async def load_user_tier(user_id : str) -> str:
     """
     Retrieve user type (free, premium, premium_plus) from the users collection.
     """
     try:
-        user = db['users'].find_one({'_id' : ObjectId(user_id)}, {"userType" : 1 , "_id": 0})
+        user = await db['users'].find_one({'_id' : ObjectId(user_id)}, {"userType" : 1 , "_id": 0})
         return user.get('userType')
     except AttributeError as attr_err:
         logger.error(f'Error while accessing attr ${attr_err}')
         raise HTTPException(status_code=400, detail=f'Error while accessing attr ${attr_err}')
 
-#TODO Consider handling all actions in one atomic way instead of if else block.
+def get_request_limit(user_tier : str, request_type : str) -> int:
+    """
+    Get the daily limit of a request type for a tier. Unknown tiers get the free limits.
+    """
+    limits = USER_LIMITS.get(user_tier, USER_LIMITS['free'])
 
-def check_request_limit(user_id : str, request_type : str, increment: int = 1) -> bool:
+    try:
+        return limits[request_type]
+    except KeyError as key_err:
+        logger.error(f'Unknown request type {key_err}')
+        raise HTTPException(status_code=400, detail=f'Error while getting current plan or request type {key_err}')
 
+async def get_request_metrics(user_id : str) -> tuple[dict, Optional[datetime]]:
     """
-    Checks request limits for a specific user based on current plan.
+    Get the stored request counts and reset date of the current period, or no counts if the period is over.
     """
-    start = time.perf_counter()
-    user_tier = get_user_tier(user_id).lower().replace(' ', '_')
+    metrics = await metrics_collection.find_one({'_id' : ObjectId(user_id)}, {'_id': 0})
     now = datetime.now()
 
-    is_payment_required = False
+    if not metrics or metrics.get('reset_date', now) <= now:
+        return {}, None
 
-    try:
-        metrics = metrics_collection.find_one({'_id' : ObjectId(user_id)})
-        
-        if not metrics or metrics.get('reset_date', now) <= now:
-            #If no record, create a new with reset time
-            updated_metrics = metrics_collection.find_one_and_update(
-                {"_id" : ObjectId(user_id)},
-                {"$set" : {
-                    'sentenceReq' : 0,
-                    'generateReq' : 0,
-                    'grammarReq' : 0,
-                    'paraphraseReq' : 0,
-                    'fixSentenceReq' : 0,
-                    'compareWordsReq' : 0,
-                    'reset_date' : now + timedelta(days=1) # Reset request limits after one day.
-                }},
-                upsert=True,
-                return_document=ReturnDocument.AFTER
-                )
-        else : 
-            updated_metrics = metrics
-            
-        #Check if user exceed the limit
-        limits = USER_LIMITS.get(user_tier, USER_LIMITS['free'])
-
-        if updated_metrics[request_type] >= limits[request_type]:
-            is_payment_required = True
-            logger.info('Request limit exceeded.')
-            raise HTTPException(status_code=402, detail=f'Request limit exceed. {request_type}. Payment Required.')
-
-        #Increase request count if user has request limit
-        metrics_collection.update_one({'_id' : ObjectId(user_id) }, {"$inc" : {request_type : increment}})
-        
-        end = time.perf_counter()
-        print(f'Took {end - start} to check request limit.')
-
-        return is_payment_required
-
-    except WriteError as write_err:
-        logger.error(f'Error while writing the database {write_err}')
-        raise WriteError(f'Error while writing the database {write_err}')
-    except ValueError as v_err:
-        logger.error(f'Error while getting current plan or request type {v_err}')
-        raise HTTPException(status_code=400, detail=f'Error while getting current plan or request type {v_err}')
-    except AttributeError as attr_err:
-        logger.error(f'Error while accessing attr in reqeust limit ${attr_err}')
-        raise HTTPException(status_code=400, detail=f'Error while accessing attr in request limit ${attr_err}')
+    reset_date = metrics.pop('reset_date')
+    return {name: int(count) for name, count in metrics.items() if name in USER_LIMITS['free']}, reset_date
+
+async def save_request_metrics(records : list[dict]):
+    """
+    Store request counts kept in Redis with one bulk write, so the record survives a Redis restart and can be reported on.
+    Counts are absolute, writing the same record twice is harmless.
 
+    Args:
+        records (list[dict]): Records of QuotaEngine.read with user_id, counts and reset_at.
+    """
+    if not records:
+        return
+
+    operations = [
+        UpdateOne(
+            {'_id' : ObjectId(record['user_id'])},
+            {'$set' : {**record['counts'], 'reset_date' : datetime.fromtimestamp(record['reset_at'])}},
+            upsert=True
+        )
+        for record in records
+    ]
 
+    try:
+        await metrics_collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as bulk_err:
+        logger.error(f'Error while writing the database {bulk_err.details}')
+        raise
@@ -0,0 +1,52 @@
+import os
+import time
+import httpx
+import logging
+from typing import Optional
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_TOKENINFO_URL = os.getenv('GOOGLE_TOKENINFO_URL', 'https://oauth2.googleapis.com/tokeninfo')
+GOOGLE_TIMEOUT = float(os.getenv('GOOGLE_TIMEOUT', 10.0))
+
+def create_google_client(timeout: float = GOOGLE_TIMEOUT) -> httpx.AsyncClient:
+    """
+    Create the long lived client of Google's tokeninfo endpoint, connections are pooled and kept alive between requests.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        timeout=httpx.Timeout(timeout, connect=5.0),
+    )
+
+def token_expiry(info: dict) -> Optional[float]:
+    """
+    Get the expiry timestamp of an access token from its tokeninfo, or None if Google did not return it.
+    The timestamp only bounds how long the token is cached, Google validates the token again on a miss.
+    """
+    try:
+        if info.get('exp') is not None:
+            return float(info['exp'])
+        if info.get('expires_in') is not None:
+            return time.time() + float(info['expires_in'])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+async def fetch_google_identity(client: httpx.AsyncClient, token: str,
+                                url: str = GOOGLE_TOKENINFO_URL) -> tuple[str, Optional[float]]:
+    """
+    Get the email of the user a Google access token belongs to and the expiry timestamp of the token.
+    Access tokens are opaque, their expiry is only known from Google.
+    """
+    # Sent in the body, tokens must not end up in URLs and their logs.
+    res = await client.post(url, data={'access_token': token})
+
+    if res.status_code != 200:
+        logger.error(f"Error fetching token info: {res.status_code} - {res.text}")
+        # Google answers 400 for invalid or expired tokens.
+        status_code = 401 if res.status_code in (400, 401) else res.status_code
+        raise HTTPException(status_code=status_code, detail="Failed to fetch user info")
+
+    info = res.json()
+    return info['email'], token_expiry(info)
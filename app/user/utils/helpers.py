@@ -1,13 +1,21 @@
 import os
 import jwt
 from fastapi import HTTPException
-from app.models.database import db
+from app.models.async_database import db
 from json import JSONDecodeError
 import logging
 import httpx
+from typing import Optional
+from app.lib.token_cache import token_cache_from_env
+from app.lib.metrics import register_metrics
+from app.user.utils.google import fetch_google_identity
 
 logger = logging.getLogger(__name__)
 
+# Google tokens are resolved once per token, not on every request.
+token_cache = token_cache_from_env()
+register_metrics('token_cache')(token_cache.stats)
+
 SECRET_KEY = os.getenv('JWT_SECRET')
 ALGORITHM = 'HS256'
 
@@ -33,37 +41,30 @@ async def extract_id_from_jwt(token : str):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-async def extract_id_from_email(token: str):
+async def extract_id_from_email(token: str, client: httpx.AsyncClient):
+    """
+    Get the user id of a Google access token, from the token cache or from Google's tokeninfo and the users collection.
+    The client is the worker's pooled Google client, see app.lib.resources.
+    """
+    return await token_cache.get(token, lambda: resolve_google_user_id(token, client))
+
+async def resolve_google_user_id(token: str, client: httpx.AsyncClient) -> tuple[str, Optional[float]]:
     try:
-        async with httpx.AsyncClient() as client:
-            res = await client.get(
-                "https://www.googleapis.com/oauth2/v3/userinfo",
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=45.0
-            )
-            
+        email, expires_at = await fetch_google_identity(client, token)
 
-        if res.status_code != 200:
-            logger.error(f"Error fetching user info: {res.status_code} - {res.text}")
-            raise HTTPException(status_code=res.status_code, detail="Failed to fetch user info")
-
-        response = res.json()
-        email = response['email']
-        
-        currentUser = db['users'].find_one({'email': email})
+        currentUser = await db['users'].find_one({'email': email}, {'_id': 1})
 
         if not currentUser:
             raise HTTPException(status_code=404, detail="User not found in DB")
-        user_id = currentUser.get('_id')
+        user_id = str(currentUser.get('_id'))
 
-        return user_id
-    except httpx.HTTPStatusError as http_err:
+        return user_id, expires_at
+    except httpx.HTTPError as http_err:
         logger.error(f'HTTP error: {http_err}')
-        raise HTTPException(status_code=http_err.response.status_code, detail=str(http_err))
+        raise HTTPException(status_code=502, detail=str(http_err))
     except JSONDecodeError as json_err:
         logger.error(f'Invalid json structure from request object: {json_err}')
         raise HTTPException(status_code=400, detail=f'Invalid json structure from request object: {json_err}')
     except ValueError as v_err:
         logger.error(f'Value error: {v_err}')
         raise HTTPException(status_code=400, detail=f'Value error: {v_err}')
-
@@ -0,0 +1,39 @@
+import base64
+import binascii
+import json
+import logging
+from bson import json_util
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+def encode_cursor(last_id) -> str:
+    """
+    Encode the last seen sort key of a page into an opaque cursor token.
+
+    Args:
+        last_id: The sort key (sentence _id) of the last item on the page.
+
+    Returns:
+        str: Url safe cursor token.
+    """
+    payload = json_util.dumps({'after': last_id}).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(token: str):
+    """
+    Decode a cursor token created by encode_cursor back into the last seen sort key.
+
+    Args:
+        token (str): The cursor token from a previous response.
+
+    Returns:
+        The sort key to continue after.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return payload['after']
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as err:
+        logger.error(f'Invalid cursor token {err}')
+        raise HTTPException(status_code=400, detail='Invalid cursor token')
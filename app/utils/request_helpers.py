@@ -1,33 +1,77 @@
+import os
 import time
 import json
 import httpx
 import logging
-from typing import Optional
+from typing import AsyncIterator, Optional
 from fastapi import HTTPException
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError
+from app.lib.provider_router import ProviderError
+from app.utils.text_helpers import parse_AI_response
 
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
-def get_chat_completion(api_key: str, content: dict, temperature: int = 1.3, response_format: str = 'text'):
+LLM_BASE_URL = os.getenv('DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', 100))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', 20))
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 60.0))
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', 5.0))
+
+HF_MODEL_URL = os.getenv('HF_MODEL_URL', 'https://api-inference.huggingface.co/models/deepseek-ai/DeepSeek-R1-Distill-Qwen-32B')
+HF_TIMEOUT = float(os.getenv('HF_TIMEOUT', 30.0))
+
+def create_llm_client(api_key: str, base_url: str = LLM_BASE_URL, max_connections: int = LLM_MAX_CONNECTIONS,
+                      max_keepalive_connections: int = LLM_MAX_KEEPALIVE_CONNECTIONS, timeout: float = LLM_TIMEOUT) -> AsyncOpenAI:
     """
-    Get a chat completion response from the DeepSeek AI model.
+    Create the long lived DeepSeek client. Connections are pooled and kept alive between requests,
+    so the client should be created once per process and closed on shutdown.
 
     Args:
         api_key (str): The API key for authentication with the DeepSeek API.
-        messages (list[dict]): A list of message dictionaries containing the conversation history.
+        base_url (str): Base url of the OpenAI compatible API.
+        max_connections (int): Maximum number of open connections.
+        max_keepalive_connections (int): Maximum number of idle connections kept open.
+        timeout (float): Read timeout in seconds.
 
     Returns:
-        str: The content of the AI's response to the provided messages.
+        AsyncOpenAI: The pooled client.
+    """
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections),
+        timeout=httpx.Timeout(timeout, connect=LLM_CONNECT_TIMEOUT),
+    )
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+
+def is_provider_failure(e: Exception) -> bool:
     """
+    Whether an error of the DeepSeek or Hugging Face client is a failure of the provider: a 5xx answer,
+    a timeout or a connection error. Timeouts are subclasses of the connection errors in both clients.
+    """
+    if isinstance(e, (APIConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(e, APIStatusError):
+        return e.status_code >= 500
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500
+    return False
+
+async def get_chat_completion(client: AsyncOpenAI, content: dict, temperature: int = 1.3, response_format: str = 'text'):
+    """
+    Get a chat completion response from the DeepSeek AI model.
 
-    
-    from openai import OpenAI
+    Args:
+        client (AsyncOpenAI): The shared client from create_llm_client.
+        content (dict): The user message to send.
+
+    Returns:
+        str: The content of the AI's response to the provided messages.
+    """
 
     try:
         start = time.perf_counter()
-        client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
 
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model="deepseek-chat",
             messages=[
                 {
@@ -50,9 +94,55 @@ def get_chat_completion(api_key: str, content: dict, temperature: int = 1.3, res
         return json.loads(ai_resp) if response_format == 'json_object' else ai_resp
     except Exception as e:
         logger.error(f'Error while getting chat completion {e}')
+        if is_provider_failure(e):
+            raise ProviderError(detail=f'Error while getting chat completion {e}')
         raise HTTPException(status_code=500, detail=f'Error while getting chat completion {e}')
 
-async def make_httpx_request(api_key : str, messages: list[dict], parameters : Optional[dict] = None) -> str:
+async def stream_chat_completion(client: AsyncOpenAI, content: dict, temperature: int = 1.3) -> AsyncIterator[str]:
+    """
+    Stream a chat completion from the DeepSeek AI model, yielding text as it arrives.
+
+    Args:
+        client (AsyncOpenAI): The shared client from create_llm_client.
+        content (dict): The user message to send.
+
+    Yields:
+        str: Parts of the AI's response.
+    """
+
+    try:
+        stream = await client.chat.completions.create(
+            model="deepseek-chat",
+            messages=[
+                {
+                    "role" : "system",
+                    "content" : "You are a helpful assistant."
+                },
+                content
+            ],
+            temperature=temperature,
+            stream=True
+        )
+
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        logger.error(f'Error while streaming chat completion {e}')
+        raise HTTPException(status_code=500, detail=f'Error while streaming chat completion {e}')
+
+def create_hf_client(max_connections: int = LLM_MAX_CONNECTIONS, max_keepalive_connections: int = LLM_MAX_KEEPALIVE_CONNECTIONS,
+                     timeout: float = HF_TIMEOUT) -> httpx.AsyncClient:
+    """
+    Create the long lived Hugging Face inference client, pooled like create_llm_client.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections),
+        timeout=httpx.Timeout(timeout, connect=LLM_CONNECT_TIMEOUT),
+    )
+
+async def make_httpx_request(api_key : str, messages: list[dict], parameters : Optional[dict] = None,
+                             client: Optional[httpx.AsyncClient] = None, url: str = HF_MODEL_URL) -> str:
 
     """Make a request to the Hugging Face inference API.
 
@@ -60,6 +150,8 @@ async def make_httpx_request(api_key : str, messages: list[dict], parameters : O
         api_key (str): The API key for authentication
         messages (list[dict]): List of message dictionaries like user , content
         parameters (Optional): Request parameters like temperature and max_new_tokens
+        client (Optional): Shared client from create_hf_client. A new client is used for this request if not given.
+        url (str): Url of the model.
 
     Returns:
         str: Generated text response
@@ -75,24 +167,55 @@ async def make_httpx_request(api_key : str, messages: list[dict], parameters : O
         logger.error("No messages found in the AI response")
         raise ValueError("No messages found in the response")
 
+    if client is None:
+        async with httpx.AsyncClient(timeout=30.0) as new_client: #Increased timeout
+            return await make_httpx_request(api_key, messages, parameters, new_client, url)
+
+    response = await client.post(
+        url,
+        headers={"Authorization": f"Bearer {api_key}"},
+        json={
+            "inputs": messages[0]["content"],
+            "parameters": request_parameters
+        }
+    )
+    response.raise_for_status()  # Raise an exception for HTTP errors
+    completion = response.json()
+
+    # Prepare the request payload
+    if not completion:
+        logger.error("Invalid response from the API")
+        raise ValueError("Invalid response from the API")
+
+    response_text = completion[0]["generated_text"]
+    return response_text
+
+async def get_hf_completion(client: httpx.AsyncClient, api_key: str, content: dict, response_format: str = 'text', url: str = HF_MODEL_URL):
+    """
+    Get a chat completion from the Hugging Face inference API, the fallback of DeepSeek.
+    The reasoning model thinks out loud, so the <think> section and the echoed prompt are removed.
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api-inference.huggingface.co/models/deepseek-ai/DeepSeek-R1-Distill-Qwen-32B",
-            headers={"Authorization": f"Bearer {api_key}"},
-            json={
-                "inputs": messages[0]["content"],
-                "parameters": request_parameters
-            },
-            timeout=30.0 #Increased timeout
-        )
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        completion = response.json()
-
-        # Prepare the request payload
-        if not completion:
-            logger.error("Invalid response from the API")
-            raise ValueError("Invalid response from the API")
-        
-        response_text = completion[0]["generated_text"]
-        return response_text
\ No newline at end of file
+    Args:
+        client (httpx.AsyncClient): The shared client from create_hf_client.
+        api_key (str): The API key for the Hugging Face model.
+        content (dict): The user message to send.
+        response_format (str): 'json_object' to parse the answer as JSON, like get_chat_completion.
+
+    Returns:
+        str: The final answer of the model.
+    """
+    messages = [content]
+
+    try:
+        response_text = await make_httpx_request(api_key, messages, client=client, url=url)
+        final_answer = parse_AI_response(response_text, messages)
+
+        if response_format == 'json_object':
+            # The answer may be wrapped in text or a code block, keep the outermost object.
+            return json.loads(final_answer[final_answer.find('{'):final_answer.rfind('}') + 1])
+        return final_answer
+    except Exception as e:
+        logger.error(f'Error while getting Hugging Face completion {e}')
+        if is_provider_failure(e):
+            raise ProviderError(detail=f'Error while getting Hugging Face completion {e}')
+        raise HTTPException(status_code=500, detail=f'Error while getting Hugging Face completion {e}')
@@ -1,11 +1,65 @@
 import re
 from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Iterable, Iterator
 import logging
 
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
-def extract_sentences_from_raw_text(results : list, word: str) -> list[str]:
+@lru_cache(maxsize=1024)
+def get_sentence_pattern(word: str) -> re.Pattern:
+    """
+    Get the compiled pattern that matches a sentence containing the word. The word is escaped so it is always matched literally.
+    """
+    return re.compile(rf'\b[A-Z][^.!?]*?\b{re.escape(word)}\b[^.!?]*[.!?]', re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def get_word_pattern(word: str) -> re.Pattern:
+    """
+    Get the compiled pattern that matches the word itself.
+    """
+    return re.compile(rf'\b{re.escape(word)}\b', re.IGNORECASE)
+
+def iter_sentences_from_raw_text(results : Iterable[dict], word: str, with_offsets: bool = False) -> Iterator[dict]:
+
+    """
+    Lazily extract the sentences that contain the word. Each result is updated in place and yielded.
+
+    Args:
+        results (Iterable[dict]): The texts to search for the word. Every item should contain a 'text' field.
+        word (str): The word to search for in the text.
+        with_offsets (bool, optional): Add an 'offsets' field with [start, end] of every occurrence of the word in the extracted text.
+
+    Yields:
+        dict: The result with extracted sentences as 'text'.
+    """
+
+    sentence_pattern = get_sentence_pattern(word)
+    word_pattern = get_word_pattern(word)
+
+    for result in results:
+        text = result['text']
+        extracted_sentences = []
+        offsets = []
+        position = 0
+
+        for match in sentence_pattern.finditer(text):
+            extracted_sentences.append(match.group())
+
+            if with_offsets:
+                # Offsets are relative to the extracted sentences joined with a single space.
+                shift = position - match.start()
+                offsets.extend([found.start() + shift, found.end() + shift] for found in word_pattern.finditer(text, match.start(), match.end()))
+                position += match.end() - match.start() + 1
+
+        result['text'] = ' '.join(extracted_sentences)
+        if with_offsets:
+            result['offsets'] = offsets
+
+        yield result
+
+def extract_sentences_from_raw_text(results : list, word: str, with_offsets: bool = False) -> list[dict]:
 
     """
     Extract the sentence that contains the word. This function extract sentences from a text or sentence using a regular expression.
@@ -13,21 +67,13 @@ def extract_sentences_from_raw_text(results : list, word: str) -> list[str]:
     Args:
         results (list): The text or sentence to search for the word.
         word (str): The word to search for in the text.
+        with_offsets (bool, optional): Add start and end offsets of the word to every result.
     
     Returns:
         list: The list of extracted sentences.
     """
 
-    regex = rf'\b[A-Z][^.!?]*?\b{word}\b[^.!?]*[.!?]'
-    new_results = []
-    
-    for text in results:
-        extracted_sentences = re.findall(regex, text['text'], re.IGNORECASE)
-        new_text = ' '.join(extracted_sentences)
-        new_text_dict = {**text, 'text': new_text}  # Preserve other fields and update 'text'
-        new_results.append(new_text_dict)
-        
-    return new_results
+    return list(iter_sentences_from_raw_text(results, word, with_offsets))
 
 def highlight_corrections(original : str, corrected : str) -> tuple[str, str]:
 
@@ -92,6 +138,50 @@ def extract_paraphrase_sentences(results : str, num_sentences : int = 5) -> list
     
     return extracted_list
         
+class ParaphraseStreamParser:
+
+    """
+    Extract numbered paraphrased sentences from a streamed AI response as soon as each one is complete.
+    Sentences are split with the same rules as extract_paraphrase_sentences.
+
+    Args:
+        num_sentences (int, optional): The number of sentences to extract.
+    """
+
+    def __init__(self, num_sentences : int = 5):
+        self.num_sentences = num_sentences
+        self.buffer = ""
+        self.index = 1
+
+    def feed(self, text : str) -> list:
+        """
+        Add a part of the response and return the sentences completed by it.
+        A sentence is complete when the number of the next one arrives.
+        """
+        self.buffer += text
+        if self.buffer and self.buffer[0] != "1":
+            raise ValueError("AI Agent response is not correct. Please check your prompt.")
+
+        completed = []
+        while self.index < self.num_sentences:
+            find_first = self.buffer.find(f"{self.index}.")
+            find_next = self.buffer.find(f"{self.index + 1}.")
+            if find_first == -1 or find_next == -1:
+                break
+
+            completed.append(self.buffer[find_first + 3:find_next].strip())
+            self.index += 1
+
+        return completed
+
+    def close(self) -> list:
+        """
+        Return the remaining sentences once the response has ended.
+        """
+        remaining = extract_paraphrase_sentences(self.buffer, self.num_sentences)[self.index - 1:] if self.num_sentences else []
+        self.index = self.num_sentences + 1
+        return remaining
+
 def parse_AI_response(response_text : str , messages) -> str:
 
     """
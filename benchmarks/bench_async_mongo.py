@@ -0,0 +1,72 @@
+"""
+Requests per second of a user lookup route with the blocking pymongo client and with the async client.
+
+Needs a local mongod. Requests go through the ASGI app on one event loop, like a single uvicorn worker.
+Usage:
+    python -m benchmarks.bench_async_mongo --concurrency 100 --requests 5000
+"""
+import os
+import argparse
+import time
+import asyncio
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--uri', default=os.getenv('BENCH_DATABASE_URI', 'mongodb://localhost:27017'))
+parser.add_argument('--db', default='articlew_bench')
+parser.add_argument('--concurrency', type=int, default=100)
+parser.add_argument('--requests', type=int, default=5000)
+args = parser.parse_args()
+
+# Database modules read their settings at import time.
+os.environ['DATABASE_URI'] = args.uri
+os.environ['MONGO_DB'] = args.db
+
+import httpx
+from fastapi import FastAPI
+from app.models import database, async_database
+
+app = FastAPI()
+
+@app.get('/sync/{email}')
+async def sync_lookup(email: str):
+    user = database.db['users'].find_one({'email': email}, {'_id': 0, 'userType': 1})
+    return user
+
+@app.get('/async/{email}')
+async def async_lookup(email: str):
+    user = await async_database.db['users'].find_one({'email': email}, {'_id': 0, 'userType': 1})
+    return user
+
+async def run(path: str) -> float:
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(f'{path}/user{i % 1000}@example.com')
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        async def worker():
+            while not queue.empty():
+                response = await client.get(queue.get_nowait())
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        return args.requests / (time.perf_counter() - start)
+
+async def main():
+    users = database.db['users']
+    users.drop()
+    users.insert_many([{'email': f'user{i}@example.com', 'userType': 'Free'} for i in range(1000)])
+    users.create_index('email')
+
+    # Warm up both connection pools.
+    await run('/sync')
+    await run('/async')
+
+    sync_rps = await run('/sync')
+    async_rps = await run('/async')
+    print(f'concurrency {args.concurrency}, {args.requests} requests')
+    print(f"{'blocking pymongo':<20}{sync_rps:>10.0f} req/s")
+    print(f"{'AsyncMongoClient':<20}{async_rps:>10.0f} req/s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+Cold start of word info lookups: time to open the data, time to the first lookup and p50 of later lookups,
+reading the NLTK corpora and reading the memory mapped lexicon snapshot.
+
+Needs WordNet in NLTK_DATA and the snapshot, every mode runs in a new process so nothing is loaded yet.
+Usage:
+    python -m word.lexicon
+    python -m benchmarks.bench_lexicon_startup --lookups 1000
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import statistics
+import subprocess
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--lookups', type=int, default=1000)
+parser.add_argument('--mode', choices=['nltk', 'snapshot'], help="Run one mode in this process")
+args = parser.parse_args()
+
+WORDS = ['run', 'running', 'light', 'houses', 'better', 'quickly', 'government', 'beautiful', 'took', 'xylophone']
+
+def run_mode(mode: str):
+    start = time.perf_counter()
+    import nltk
+    nltk.data.path.append(os.getenv("NLTK_DATA", "./nltk_data"))
+    if mode == 'nltk':
+        # Without a snapshot Wordkit reads the corpora.
+        os.environ['LEXICON_PATH'] = os.devnull + '.missing'
+    from word import lexicon
+    from word.wordkit import Wordkit
+
+    if mode == 'snapshot' and lexicon.get_lexicon() is None:
+        sys.exit(f"No snapshot at {lexicon.LEXICON_PATH}, build it with python -m word.lexicon")
+    open_ms = (time.perf_counter() - start) * 1000
+
+    Wordkit(WORDS[0]).get_word_info_extended()
+    first_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for index in range(args.lookups):
+        lookup_start = time.perf_counter()
+        Wordkit(WORDS[index % len(WORDS)]).get_word_info_extended()
+        timings.append(time.perf_counter() - lookup_start)
+
+    p50 = statistics.median(timings) * 1000
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'{mode:<10}{open_ms:>10.1f}{first_ms:>16.1f}{p50:>10.3f}{peak_mb:>14.0f}')
+
+def main():
+    if args.mode:
+        run_mode(args.mode)
+        return
+
+    print(f"{'mode':<10}{'open ms':>10}{'first lookup ms':>16}{'p50 ms':>10}{'peak RSS MB':>14}")
+    for mode in ('nltk', 'snapshot'):
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_lexicon_startup', '--mode', mode, '--lookups', str(args.lookups)], check=True)
+
+if __name__ == "__main__":
+    main()
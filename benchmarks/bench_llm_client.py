@@ -0,0 +1,59 @@
+"""
+Throughput of AI calls with a new OpenAI client per call in the default thread pool,
+and with the shared pooled async client, against a local stub of the DeepSeek API.
+
+Usage:
+    python -m benchmarks.bench_llm_client --requests 400 --concurrency 200 --delay 0.5
+"""
+import time
+import asyncio
+import argparse
+from openai import OpenAI
+from app.utils.request_helpers import create_llm_client, get_chat_completion
+from benchmarks.stubs import StubServer, create_llm_stub
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--requests', type=int, default=400)
+parser.add_argument('--concurrency', type=int, default=200)
+parser.add_argument('--delay', type=float, default=0.5, help="Seconds the stub takes to answer")
+args = parser.parse_args()
+
+CONTENT = {"role": "user", "content": "Paraphrase 'hello' in a casual way."}
+
+def baseline_chat_completion(base_url: str) -> str:
+    # Implementation before the shared client: new client and connections on every call.
+    client = OpenAI(api_key='stub', base_url=base_url)
+    response = client.chat.completions.create(
+        model="deepseek-chat",
+        messages=[{"role": "system", "content": "You are a helpful assistant."}, CONTENT],
+        temperature=1.3,
+        response_format={'type': 'text'},
+        stream=False
+    )
+    return response.choices[0].message.content
+
+async def run(call) -> float:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited():
+        async with semaphore:
+            await call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(args.requests)))
+    return args.requests / (time.perf_counter() - start)
+
+async def main(base_url: str):
+    baseline_rps = await run(lambda: asyncio.to_thread(baseline_chat_completion, base_url))
+
+    client = create_llm_client('stub', base_url=base_url, max_connections=args.concurrency)
+    pooled_rps = await run(lambda: get_chat_completion(client, CONTENT))
+    await client.close()
+
+    print(f'{args.requests} requests, concurrency {args.concurrency}, stub delay {args.delay}s')
+    print(f"{'client per call + thread':<28}{baseline_rps:>10.1f} req/s")
+    print(f"{'shared async client':<28}{pooled_rps:>10.1f} req/s")
+
+if __name__ == "__main__":
+    with StubServer(create_llm_stub(args.delay)) as stub:
+        asyncio.run(main(stub.url))
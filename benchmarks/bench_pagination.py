@@ -0,0 +1,73 @@
+"""
+Compare page 1 and page 500 latency of /api/sentences/{word} with skip/limit pages and cursor tokens.
+
+Needs a local mongod with the corpus of bench_word_index. Usage:
+    python -m benchmarks.bench_word_index --sentences 2000000
+    python -m benchmarks.bench_pagination
+"""
+import os
+import argparse
+import time
+import asyncio
+import statistics
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--uri', default=os.getenv('BENCH_DATABASE_URI', 'mongodb://localhost:27017'))
+parser.add_argument('--db', default='articlew_bench')
+parser.add_argument('--page', type=int, default=500)
+parser.add_argument('--page-size', type=int, default=10)
+parser.add_argument('--repeat', type=int, default=5)
+args = parser.parse_args()
+
+# Database module reads its settings at import time.
+os.environ['DATABASE_URI'] = args.uri
+os.environ['MONGO_DB'] = args.db
+
+from app.lib.word_index import word_index_collection
+import app.routes.sentences as sentences_route
+
+async def median_ms(func) -> float:
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings) * 1000
+
+async def main():
+    # Most frequent word of the corpus so page 500 exists.
+    cursor = await word_index_collection.aggregate([
+        {'$group': {'_id': '$word', 'count': {'$sum': 1}}},
+        {'$sort': {'count': -1}},
+        {'$limit': 1}
+    ], allowDiskUse=True)
+    top = (await cursor.to_list(1))[0]
+    word = top['_id']
+    filter_query = {'text': {'$regex': rf'(?<!\w)(?:[A-Z][^.!?]*?\b{word}\b[^.!?]*[.!?])', '$options': 'i'}}
+
+    print(f"word '{word}' in {top['count']} sentences")
+    print(f"{'path':<8}{'mode':<8}{'page 1 ms':>12}{'page ' + str(args.page) + ' ms':>14}")
+
+    for use_index in (False, True):
+        sentences_route.USE_WORD_INDEX = use_index
+        path = 'index' if use_index else 'regex'
+
+        async def fetch(page: int = 1, after=None):
+            skip = 0 if after is not None else (page - 1) * args.page_size
+            return await sentences_route.get_cursors(word, filter_query, skip, args.page_size, after)
+
+        first_ms = await median_ms(fetch)
+        skip_ms = await median_ms(lambda: fetch(args.page))
+        print(f"{path:<8}{'skip':<8}{first_ms:>12.1f}{skip_ms:>14.1f}")
+
+        # Walk to the last seen key of the page before the measured one.
+        last_id = None
+        for _ in range(args.page - 1):
+            _, last_id = await fetch(after=last_id)
+
+        cursor_ms = await median_ms(lambda: fetch(after=last_id))
+        print(f"{path:<8}{'cursor':<8}{first_ms:>12.1f}{cursor_ms:>14.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
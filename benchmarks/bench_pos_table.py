@@ -0,0 +1,52 @@
+"""
+Compare the Brown corpus scan of Wordkit.most_common_pos with the precomputed tag count table.
+
+Usage:
+    python -m word.pos_table
+    python -m benchmarks.bench_pos_table
+"""
+import os
+import time
+import argparse
+import statistics
+from collections import Counter
+import nltk
+
+nltk.data.path.append(os.getenv("NLTK_DATA", "./nltk_data"))
+
+from nltk.corpus import brown
+from word.pos_table import PosTable, POS_TABLE_PATH
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--lookups', type=int, default=100_000)
+args = parser.parse_args()
+
+WORDS = ['prevent', 'run', 'the', 'beautiful', 'quickly', 'government', 'xylophone', 'light']
+
+def baseline_most_common_pos(word: str):
+    # Implementation before the precomputed table.
+    word_tags = [tag for w, tag in brown.tagged_words(tagset='universal') if w.lower() == word.lower()]
+    return Counter(word_tags).most_common(1)[0][0].lower() if word_tags else None
+
+def main():
+    timings = []
+    for word in WORDS[:3]:
+        start = time.perf_counter()
+        baseline_most_common_pos(word)
+        timings.append(time.perf_counter() - start)
+    print(f"{'corpus scan':<20}{statistics.mean(timings) * 1000:>12.1f} ms / lookup")
+
+    start = time.perf_counter()
+    table = PosTable.load(POS_TABLE_PATH)
+    print(f"{'table load':<20}{(time.perf_counter() - start) * 1000:>12.1f} ms once, {os.path.getsize(POS_TABLE_PATH) / 1024:.0f} KiB on disk")
+
+    start = time.perf_counter()
+    for i in range(args.lookups):
+        table.most_common_pos(WORDS[i % len(WORDS)])
+    print(f"{'table lookup':<20}{(time.perf_counter() - start) / args.lookups * 1e6:>12.2f} us / lookup")
+
+    mismatches = [word for word in WORDS if baseline_most_common_pos(word) != table.most_common_pos(word)]
+    print(f'mismatches with corpus scan: {mismatches or "none"}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Memory of N uvicorn workers: the spaCy model, POS table and WordNet loaded once in the master before forking,
+against every worker loading its own copy. Reports per worker RSS, PSS and unique memory (USS) after startup and
+after serving lookups, USS is what every extra worker adds.
+
+Needs the spaCy model and WordNet in NLTK_DATA, every mode runs in a new process so nothing is loaded yet.
+Usage:
+    python -m benchmarks.bench_prefork_memory --workers 4 --requests 2000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from contextlib import asynccontextmanager
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--workers', type=int, default=4)
+parser.add_argument('--requests', type=int, default=2000)
+parser.add_argument('--mode', choices=['preload', 'per-worker'], help="Run one mode in this process")
+args = parser.parse_args()
+
+WORDS = ['run', 'running', 'light', 'houses', 'better', 'quickly', 'government', 'beautiful', 'took', 'xylophone']
+
+def make_app(ready_dir: str, load_in_worker: bool):
+    from fastapi import FastAPI
+    from app.launcher import preload_assets
+    from word.wordkit import Wordkit
+    from word.spacyWord import get_similarity_engine
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if load_in_worker:
+            preload_assets()
+        open(os.path.join(ready_dir, str(os.getpid())), 'w').close()
+        yield
+
+    app = FastAPI(lifespan=lifespan)
+
+    # Same work as /api/wordInfo and the similarity of /api/sentences.
+    @app.get("/word/{word}")
+    def word_info(word: str):
+        info = Wordkit(word).get_word_info_extended()
+        return {'info': info, 'similarity': get_similarity_engine().similarity(word, 'house')}
+
+    return app
+
+def summarize(stage: str, report: list[dict]):
+    for usage in report:
+        print(f"{args.mode:<12}{stage:<10}{usage['pid']:>8}{usage['rss']:>10}{usage['pss']:>10}{usage['uss']:>10}")
+    total_uss = sum(usage['uss'] for usage in report)
+    total_pss = sum(usage['pss'] for usage in report)
+    print(f"{args.mode:<12}{stage:<10}{'total':>8}{'':>10}{total_pss:>10.1f}{total_uss:>10.1f}")
+
+def run_mode():
+    import httpx
+    from app.launcher import PreforkServer, preload_assets
+
+    ready_dir = tempfile.mkdtemp()
+    load_in_worker = args.mode == 'per-worker'
+    server = PreforkServer(make_app(ready_dir, load_in_worker), host='127.0.0.1', port=0, workers=args.workers,
+                           preload=None if load_in_worker else preload_assets, log_level='warning')
+    server.start()
+    try:
+        while len(os.listdir(ready_dir)) < args.workers:
+            if server.reap():
+                sys.exit('A worker exited during startup, check that the spaCy model and WordNet are installed')
+            time.sleep(0.1)
+        summarize('startup', server.memory_report())
+
+        with httpx.Client(base_url=f'http://127.0.0.1:{server.port}') as client:
+            for index in range(args.requests):
+                client.get(f'/word/{WORDS[index % len(WORDS)]}').raise_for_status()
+        summarize('serving', server.memory_report())
+    finally:
+        server.stop()
+
+def main():
+    if args.mode:
+        run_mode()
+        return
+
+    print(f"{'mode':<12}{'stage':<10}{'pid':>8}{'rss MB':>10}{'pss MB':>10}{'uss MB':>10}")
+    for mode in ('per-worker', 'preload'):
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_prefork_memory', '--mode', mode,
+                        '--workers', str(args.workers), '--requests', str(args.requests)], check=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Latency and error rate of AI calls to DeepSeek only, and through the provider router with the Hugging Face
+fallback, against local stubs that make a share of the DeepSeek requests slow and fail others.
+
+Usage:
+    python -m benchmarks.bench_provider_router --requests 400 --concurrency 50 --slow-rate 0.1 --error-rate 0.1
+"""
+import time
+import asyncio
+import argparse
+from fastapi import HTTPException
+from app.lib.provider_router import Backend, CircuitBreaker, ProviderRouter
+from app.utils.request_helpers import create_hf_client, create_llm_client, get_chat_completion, get_hf_completion
+from benchmarks.stubs import StubServer, create_hf_stub, create_llm_stub
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--requests', type=int, default=400)
+parser.add_argument('--concurrency', type=int, default=50)
+parser.add_argument('--delay', type=float, default=0.2, help="Seconds DeepSeek usually takes to answer")
+parser.add_argument('--slow-rate', type=float, default=0.1, help="Share of DeepSeek requests that are slow")
+parser.add_argument('--slow-delay', type=float, default=3.0, help="Seconds a slow DeepSeek request takes")
+parser.add_argument('--error-rate', type=float, default=0.1, help="Share of DeepSeek requests that fail")
+parser.add_argument('--hf-delay', type=float, default=0.4, help="Seconds Hugging Face takes to answer")
+args = parser.parse_args()
+
+CONTENT = {"role": "user", "content": "Paraphrase 'hello' in a casual way."}
+
+async def run(call) -> tuple[list[float], int]:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, errors = [], 0
+
+    async def timed():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call()
+                latencies.append(time.perf_counter() - start)
+            except HTTPException:
+                errors += 1
+
+    await asyncio.gather(*(timed() for _ in range(args.requests)))
+    return sorted(latencies), errors
+
+def report(name: str, latencies: list[float], errors: int):
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else float('nan')
+
+    print(f"{name:<24}{percentile(0.5):>10.0f}{percentile(0.95):>10.0f}{percentile(0.99):>10.0f}{errors / args.requests:>10.1%}")
+
+async def main(deepseek_url: str, hf_url: str):
+    llm_client = create_llm_client('stub', base_url=deepseek_url, max_connections=args.concurrency * 2)
+    # Retries of the OpenAI client would hide the injected errors of the direct calls.
+    llm_client = llm_client.with_options(max_retries=0)
+    hf_client = create_hf_client(max_connections=args.concurrency * 2)
+
+    direct = await run(lambda: get_chat_completion(llm_client, CONTENT))
+
+    router = ProviderRouter([
+        Backend('deepseek', lambda *call_args: get_chat_completion(llm_client, *call_args),
+                CircuitBreaker(failure_threshold=5, reset_timeout=1.0), default_hedge_delay=1.0, min_hedge_delay=0.1),
+        Backend('huggingface', lambda content, temperature, response_format:
+                get_hf_completion(hf_client, 'stub', content, response_format, url=f'{hf_url}/models/stub')),
+    ])
+    routed = await run(lambda: router.complete(CONTENT))
+
+    await llm_client.close()
+    await hf_client.aclose()
+
+    print(f'{args.requests} requests, concurrency {args.concurrency}, DeepSeek {args.delay}s, '
+          f'{args.slow_rate:.0%} slow ({args.slow_delay}s), {args.error_rate:.0%} errors, Hugging Face {args.hf_delay}s')
+    print(f"{'':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>10}")
+    report('DeepSeek only', *direct)
+    report('router with fallback', *routed)
+    print(router.stats())
+
+if __name__ == "__main__":
+    deepseek_stub = create_llm_stub(args.delay, slow_rate=args.slow_rate, slow_delay=args.slow_delay, error_rate=args.error_rate)
+    with StubServer(deepseek_stub) as deepseek, StubServer(create_hf_stub(args.hf_delay)) as hf:
+        asyncio.run(main(deepseek.url, hf.url))
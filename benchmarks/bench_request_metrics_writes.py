@@ -0,0 +1,120 @@
+"""
+Database operations per 10k requests of the quota path before and after counters moved to Redis
+with batched reconciliation. Operations are counted on a recording collection, no mongod is needed.
+Redis runs on fakeredis, which needs the lupa package for the quota scripts.
+
+Usage:
+    python -m benchmarks.bench_request_metrics_writes --requests 10000 --users 500 --rate 200 --interval 10
+"""
+import os
+import random
+import asyncio
+import argparse
+from collections import Counter
+from bson import ObjectId
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--requests', type=int, default=10000)
+parser.add_argument('--users', type=int, default=500)
+parser.add_argument('--rate', type=float, default=200, help="Requests per second")
+parser.add_argument('--interval', type=float, default=10.0, help="Seconds between reconciliations")
+parser.add_argument('--flush-size', type=int, default=500)
+args = parser.parse_args()
+
+# Database modules read their settings at import time, nothing connects until the first operation.
+os.environ.setdefault('DATABASE_URI', 'mongodb://localhost:27017')
+os.environ.setdefault('MONGO_DB', 'articlew_bench')
+
+import fakeredis
+import app.user.user as user_module
+import app.lib.request as request_module
+from app.lib.quota import QuotaEngine
+
+REQUEST_TYPES = ['sentenceReq', 'generateReq', 'paraphraseReq']
+
+class RecordingCollection:
+    """
+    Counts operations and documents written instead of sending them to the database.
+    """
+    def __init__(self):
+        self.operations = Counter()
+        self.documents = 0
+
+    async def find_one(self, *args, **kwargs):
+        self.operations['find_one'] += 1
+        return {'userType': 'premium'}
+
+    async def find_one_and_update(self, *args, **kwargs):
+        self.operations['find_one_and_update'] += 1
+        self.documents += 1
+        return {request_type: 0 for request_type in REQUEST_TYPES}
+
+    async def update_one(self, *args, **kwargs):
+        self.operations['update_one'] += 1
+        self.documents += 1
+
+    async def bulk_write(self, operations, **kwargs):
+        self.operations['bulk_write'] += 1
+        self.documents += len(operations)
+
+def make_requests() -> list[tuple[str, str]]:
+    random.seed(1)
+    user_ids = [str(ObjectId()) for _ in range(args.users)]
+    return [(random.choice(user_ids), random.choice(REQUEST_TYPES)) for _ in range(args.requests)]
+
+async def baseline(requests: list[tuple[str, str]]) -> RecordingCollection:
+    # Operations of the previous track_requests: every fifth request of a type ran check_request_limit.
+    collection = RecordingCollection()
+    tracked = Counter()
+    started = set()
+
+    for user_id, request_type in requests:
+        if tracked[(user_id, request_type)] % 5 == 0:
+            await collection.find_one()  # get_user_tier
+            await collection.find_one()  # userMetrics
+            if user_id not in started:
+                started.add(user_id)
+                await collection.find_one_and_update()
+            await collection.update_one()
+            tracked[(user_id, request_type)] += 1
+        tracked[(user_id, request_type)] += 1
+
+    return collection
+
+async def reconciled(requests: list[tuple[str, str]]) -> RecordingCollection:
+    collection = RecordingCollection()
+    user_module.metrics_collection = collection
+    request_module.quota_engine = QuotaEngine(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    engine = request_module.quota_engine
+
+    last_run = 0.0
+    for index, (user_id, request_type) in enumerate(requests):
+        now = index / args.rate
+        await collection.find_one()  # get_user_tier
+        status, _ = await engine.consume(user_id, request_type, 100000)
+        if status < 0:
+            await collection.find_one()  # userMetrics of the period
+            await engine.seed(user_id, {})
+            await engine.consume(user_id, request_type, 100000)
+
+        if now - last_run >= args.interval or await engine.dirty_count() >= args.flush_size:
+            last_run = now
+            await request_module.reconcile_request_metrics(args.flush_size)
+
+    await request_module.reconcile_request_metrics(args.flush_size)
+    return collection
+
+def report(name: str, collection: RecordingCollection):
+    per_10k = 10000 / args.requests
+    writes = sum(count for operation, count in collection.operations.items() if operation != 'find_one')
+    print(f"{name:<28}{collection.operations['find_one'] * per_10k:>10.0f}{writes * per_10k:>10.0f}{collection.documents * per_10k:>12.0f}")
+
+async def main():
+    requests = make_requests()
+    print(f'{args.requests} requests of {args.users} users at {args.rate} req/s, reconciled every {args.interval}s or {args.flush_size} users')
+    print(f"{'per 10k requests':<28}{'reads':>10}{'writes':>10}{'documents':>12}")
+    report('quota check in Mongo', await baseline(requests))
+    report('Redis quota + bulk_write', await reconciled(requests))
+
+if __name__ == "__main__":
+    asyncio.run(main())
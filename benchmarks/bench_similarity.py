@@ -0,0 +1,61 @@
+"""
+p50/p99 latency and peak RSS of /api/wordSimilarity scoring, loading spaCy per call and with the shared engine.
+
+Needs en_core_web_sm. Every mode runs in its own process so peak RSS is measured separately.
+Usage:
+    python -m benchmarks.bench_similarity --requests 200
+"""
+import sys
+import random
+import argparse
+import resource
+import subprocess
+import time
+import statistics
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--requests', type=int, default=200)
+parser.add_argument('--mode', choices=['baseline', 'engine'], help="Run one mode in this process")
+args = parser.parse_args()
+
+WORDS = ['happy', 'glad', 'sad', 'car', 'vehicle', 'run', 'walk', 'quick', 'fast', 'slow', 'house', 'home', 'tree', 'forest']
+
+def baseline_score(word1: str, word2: str) -> float:
+    # Implementation before the shared engine.
+    import spacy
+    nlp = spacy.load("en_core_web_sm")
+    return nlp(word1).similarity(nlp(word2))
+
+def run_mode(mode: str):
+    if mode == 'baseline':
+        score = baseline_score
+    else:
+        from word.spacyWord import calculate_similarity_score, get_similarity_engine
+        get_similarity_engine()
+        score = calculate_similarity_score
+
+    rng = random.Random(1)
+    timings = []
+    for _ in range(args.requests):
+        word1, word2 = rng.sample(WORDS, 2)
+        start = time.perf_counter()
+        score(word1, word2)
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    p50 = statistics.median(timings) * 1000
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'{mode:<10}{p50:>10.2f}{p99:>10.2f}{peak_mb:>14.0f}')
+
+def main():
+    if args.mode:
+        run_mode(args.mode)
+        return
+
+    print(f"{'mode':<10}{'p50 ms':>10}{'p99 ms':>10}{'peak RSS MB':>14}")
+    for mode in ('baseline', 'engine'):
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_similarity', '--mode', mode, '--requests', str(args.requests)], check=True)
+
+if __name__ == "__main__":
+    main()
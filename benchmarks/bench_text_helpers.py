@@ -0,0 +1,60 @@
+"""
+Microbenchmarks of sentence extraction in app/utils/text_helpers.py on long article texts.
+
+Usage:
+    python -m benchmarks.bench_text_helpers
+"""
+import re
+import random
+import argparse
+import timeit
+from app.utils.text_helpers import extract_sentences_from_raw_text, iter_sentences_from_raw_text
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--articles', type=int, default=20)
+parser.add_argument('--sentences-per-article', type=int, default=400)
+parser.add_argument('--number', type=int, default=20)
+args = parser.parse_args()
+
+WORDS = ['the', 'market', 'visited', 'policy', 'growth', 'people', 'research', 'climate', 'new', 'said', 'report', 'city']
+
+def baseline_extract(results: list, word: str) -> list:
+    # Implementation before the compiled pattern cache.
+    regex = rf'\b[A-Z][^.!?]*?\b{word}\b[^.!?]*[.!?]'
+    new_results = []
+    for text in results:
+        extracted_sentences = re.findall(regex, text['text'], re.IGNORECASE)
+        new_results.append({**text, 'text': ' '.join(extracted_sentences)})
+    return new_results
+
+def make_articles() -> list[dict]:
+    rng = random.Random(1)
+    articles = []
+    for _ in range(args.articles):
+        sentences = [' '.join(rng.choices(WORDS, k=rng.randint(8, 30))).capitalize() + rng.choice('.!?') for _ in range(args.sentences_per_article)]
+        articles.append({'text': ' '.join(sentences), 'category': 'news', 'source': 'bench'})
+    return articles
+
+def main():
+    articles = make_articles()
+    size = sum(len(article['text']) for article in articles)
+    print(f'{len(articles)} articles, {size / 1024:.0f} KiB of text')
+
+    cases = {
+        'baseline (recompile + copy)': lambda: baseline_extract(articles, 'visited'),
+        'cached pattern': lambda: extract_sentences_from_raw_text([dict(article) for article in articles], 'visited'),
+        'cached pattern + offsets': lambda: extract_sentences_from_raw_text([dict(article) for article in articles], 'visited', with_offsets=True),
+        'lazy, first result only': lambda: next(iter_sentences_from_raw_text([dict(article) for article in articles], 'visited')),
+    }
+
+    # One page of /api/sentences results, where pattern building is a larger share of the work.
+    page = [{'text': article['text'][:300]} for article in articles[:10]]
+    cases['baseline, one page'] = lambda: baseline_extract(page, 'visited')
+    cases['cached pattern, one page'] = lambda: extract_sentences_from_raw_text([dict(result) for result in page], 'visited')
+
+    for name, func in cases.items():
+        seconds = min(timeit.repeat(func, number=args.number, repeat=3)) / args.number
+        print(f'{name:<30}{seconds * 1000:>10.2f} ms')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare the inverted word index with the regex scan of /api/sentences/{word} on a synthetic corpus.
+
+Needs a local mongod. Usage:
+    python -m benchmarks.bench_word_index --sentences 2000000
+"""
+import os
+import random
+import argparse
+import time
+import asyncio
+import statistics
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--uri', default=os.getenv('BENCH_DATABASE_URI', 'mongodb://localhost:27017'))
+parser.add_argument('--db', default='articlew_bench')
+parser.add_argument('--sentences', type=int, default=2_000_000)
+parser.add_argument('--vocabulary', type=int, default=50_000)
+parser.add_argument('--repeat', type=int, default=5)
+parser.add_argument('--skip-load', action='store_true', help="Reuse the corpus of a previous run")
+args = parser.parse_args()
+
+# Database module reads its settings at import time.
+os.environ['DATABASE_URI'] = args.uri
+os.environ['MONGO_DB'] = args.db
+
+from app.models.async_database import sentences_collection
+from app.lib.word_index import rebuild_index
+import app.routes.sentences as sentences_route
+
+CATEGORIES = ['technology', 'science', 'business', 'health', 'sports', 'politics', 'culture', 'travel']
+
+def make_vocabulary(size: int) -> list[str]:
+    rng = random.Random(1)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(3, 10))) + str(i) for i in range(size)]
+
+async def load_corpus(vocabulary: list[str], count: int, batch_size: int = 10_000):
+    rng = random.Random(2)
+    # Zipf like weights so a few words are very common and most are rare.
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    await sentences_collection.drop()
+    batch = []
+    for _ in range(count):
+        words = rng.choices(vocabulary, weights=weights, k=rng.randint(6, 25))
+        text = ' '.join(words).capitalize() + '.'
+        batch.append({'text': text, 'category': rng.choice(CATEGORIES), 'source': 'bench', 'length': len(words)})
+
+        if len(batch) >= batch_size:
+            await sentences_collection.insert_many(batch)
+            batch = []
+
+    if batch:
+        await sentences_collection.insert_many(batch)
+
+async def measure(word: str, filter_query: dict, use_index: bool) -> float:
+    sentences_route.USE_WORD_INDEX = use_index
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        await sentences_route.get_cursors(word, filter_query, 0, 10)
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings) * 1000
+
+async def main():
+    vocabulary = make_vocabulary(args.vocabulary)
+
+    if not args.skip_load:
+        start = time.perf_counter()
+        await load_corpus(vocabulary, args.sentences)
+        print(f'Loaded {args.sentences} sentences in {time.perf_counter() - start:.1f}s')
+
+        start = time.perf_counter()
+        await rebuild_index()
+        print(f'Built word index in {time.perf_counter() - start:.1f}s')
+
+    cases = [
+        ('common', vocabulary[0], {}),
+        ('mid', vocabulary[500], {}),
+        ('rare', vocabulary[-1], {}),
+        ('mid + filters', vocabulary[500], {'category': {'$in': ['science', 'health']}, 'length': {'$gte': 10, '$lte': 20}}),
+    ]
+
+    print(f"{'case':<16}{'regex ms':>12}{'index ms':>12}{'speedup':>10}")
+    for name, word, extra_filters in cases:
+        filter_query = {
+            'text': {'$regex': rf'(?<!\w)(?:[A-Z][^.!?]*?\b{word}\b[^.!?]*[.!?])', '$options': 'i'},
+            **extra_filters
+        }
+        regex_ms = await measure(word, filter_query, use_index=False)
+        index_ms = await measure(word, filter_query, use_index=True)
+        print(f'{name:<16}{regex_ms:>12.1f}{index_ms:>12.1f}{regex_ms / index_ms:>9.1f}x')
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Time to first result and total time of 1,000 word infos: one /api/wordInfo lookup per word, the NDJSON batch
+on the word pool with an empty cache, and the same batch again with the cache warm.
+
+Needs the WordNet corpus in NLTK_DATA. The cache runs on fakeredis.
+Usage:
+    python -m benchmarks.bench_word_info_batch --words 1000 --workers 4
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import nltk
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--words', type=int, default=1000)
+parser.add_argument('--duplicates', type=float, default=0.1, help="Share of repeated words in the batch")
+parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+parser.add_argument('--chunk-size', type=int, default=25)
+args = parser.parse_args()
+
+nltk.data.path.append(os.getenv("NLTK_DATA", "./nltk_data"))
+
+import fakeredis
+from nltk.corpus import wordnet
+from word.wordkit import Wordkit, load_wordkit
+from app.lib.cache import RedisCache
+from app.lib.word_batch import create_word_pool, stream_word_infos
+
+def make_words() -> list[str]:
+    rng = random.Random(1)
+    lemmas = sorted(name for name in wordnet.all_lemma_names() if name.isalpha())
+    unique = rng.sample(lemmas, int(args.words * (1 - args.duplicates)))
+    return unique + rng.choices(unique, k=args.words - len(unique))
+
+async def per_word(words: list[str]) -> tuple[float, float]:
+    # One request per word before the batch endpoint, a new Wordkit on a thread each time.
+    start = time.perf_counter()
+    first = None
+    for word in words:
+        await asyncio.to_thread(Wordkit(word).get_word_info_extended)
+        first = first or time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+async def batch(words: list[str], pool, cache: RedisCache) -> tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    async for _ in stream_word_infos(words, pool, cache=cache, chunk_size=args.chunk_size):
+        first = first or time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+def report(name: str, timings: tuple[float, float]):
+    first, total = timings
+    print(f"{name:<22}{first * 1000:>14.1f}{total * 1000:>12.1f}")
+
+async def main():
+    try:
+        load_wordkit()
+    except LookupError:
+        sys.exit("WordNet is not installed, run nltk.download('wordnet') with NLTK_DATA set.")
+
+    words = make_words()
+    cache = RedisCache('bench_word_info', ttl=3600, max_entries=100000, client=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    pool = create_word_pool(args.workers)
+    # Start the pool workers and load WordNet in them before timing, the app does it at startup.
+    if pool:
+        await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(pool, load_wordkit) for _ in range(args.workers)))
+
+    print(f"{len(words)} words, {len(set(words))} distinct, {args.workers} workers")
+    print(f"{'mode':<22}{'first line ms':>14}{'total ms':>12}")
+    try:
+        report('one request per word', await per_word(words))
+        report('batch, cold cache', await batch(words, pool, cache))
+        report('batch, warm cache', await batch(words, pool, cache))
+    finally:
+        if pool:
+            pool.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+Local stand-ins of external APIs for benchmarks, served by uvicorn in a background thread.
+"""
+import time
+import random
+import socket
+import asyncio
+import threading
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+
+def inject_faults(delay: float, slow_rate: float, slow_delay: float, error_rate: float):
+    """
+    Sleep like the upstream API would and fail some requests, slow_rate of them take slow_delay instead of delay.
+    """
+    async def fault():
+        await asyncio.sleep(slow_delay if random.random() < slow_rate else delay)
+        if random.random() < error_rate:
+            raise HTTPException(status_code=503, detail='Injected error')
+    return fault
+
+def create_llm_stub(delay: float = 0.5, content: str = "1. First. 2. Second. 3. Third. 4. Fourth. 5. Fifth.",
+                    slow_rate: float = 0.0, slow_delay: float = 0.0, error_rate: float = 0.0) -> FastAPI:
+    """
+    OpenAI compatible chat completions API answering every request after a fixed delay, like DeepSeek would.
+    A share of the requests can be made slow or fail with 503.
+    """
+    stub = FastAPI()
+    fault = inject_faults(delay, slow_rate, slow_delay, error_rate)
+
+    @stub.post('/chat/completions')
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await fault()
+
+        message = '{"check": "ok", "analysis": "ok"}' if body.get('response_format', {}).get('type') == 'json_object' else content
+        return {
+            "id": "stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get('model'),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": message}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        }
+
+    return stub
+
+def create_hf_stub(delay: float = 1.0, content: str = "1. First. 2. Second. 3. Third. 4. Fourth. 5. Fifth.",
+                   slow_rate: float = 0.0, slow_delay: float = 0.0, error_rate: float = 0.0) -> FastAPI:
+    """
+    Hugging Face inference API of a reasoning model, the prompt and a <think> section come before the answer.
+    """
+    stub = FastAPI()
+    fault = inject_faults(delay, slow_rate, slow_delay, error_rate)
+
+    @stub.post('/models/{model:path}')
+    async def inference(model: str, request: Request):
+        body = await request.json()
+        await fault()
+        return [{"generated_text": f"{body['inputs']}<think>Thinking about it.</think>{content}"}]
+
+    return stub
+
+class StubServer:
+    """
+    Run an ASGI app on a free local port until stopped.
+    """
+    def __init__(self, app: FastAPI):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+
+        self.server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=self.port, log_level='error', backlog=4096))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    def __enter__(self) -> 'StubServer':
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
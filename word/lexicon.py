@@ -0,0 +1,344 @@
+import os
+import json
+import mmap
+import struct
+import logging
+import argparse
+import threading
+from typing import Optional
+import numpy as np
+from word.pos_table import most_common_tag
+
+logger = logging.getLogger(__name__)
+
+LEXICON_PATH = os.getenv('LEXICON_PATH', os.path.join(os.getenv('NLTK_DATA', './nltk_data'), 'lexicon.bin'))
+
+# Bumped when the layout changes, older snapshots are not loaded. 002 added the first seen order of tags.
+MAGIC = b'WKLEX002'
+ALIGNMENT = 64
+
+# Parts of speech wordnet.synsets looks up, in its order. Satellite adjectives are found through 'a'.
+POS_LIST = 'nvar'
+
+# Same rules as WordNetCorpusReader.MORPHOLOGICAL_SUBSTITUTIONS.
+MORPHOLOGICAL_SUBSTITUTIONS = {
+    'n': [('s', ''), ('ses', 's'), ('ves', 'f'), ('xes', 'x'), ('zes', 'z'), ('ches', 'ch'), ('shes', 'sh'),
+          ('men', 'man'), ('ies', 'y')],
+    'v': [('s', ''), ('ies', 'y'), ('es', 'e'), ('es', ''), ('ed', 'e'), ('ed', ''), ('ing', 'e'), ('ing', '')],
+    'a': [('er', ''), ('est', ''), ('er', 'e'), ('est', 'e')],
+    'r': [],
+}
+
+# Strings are stored once in the text blob and referenced by row of the refs array.
+REF_DTYPE = np.dtype([('offset', '<u4'), ('length', '<u4')])
+SYNSET_DTYPE = np.dtype([('pos', 'S1'), ('definition', '<u4'), ('lemmas', '<u4'), ('lemma_count', '<u2'),
+                         ('examples', '<u4'), ('example_count', '<u2')])
+# The lemma index and the exception lists have sorted fixed width keys, searched with np.searchsorted, and one
+# (start, count) slot per part of speech. A count of -1 marks a key without the part of speech.
+SLOT_DTYPE = np.dtype([('start', '<u4'), ('count', '<i4')])
+
+class LexiconSynset:
+    """
+    Synset of the snapshot, with the methods of nltk's Synset that Wordkit uses.
+    """
+    __slots__ = ('_pos', '_definition', '_lemma_names', '_examples')
+
+    def __init__(self, pos: str, definition: str, lemma_names: list[str], examples: list[str]):
+        self._pos = pos
+        self._definition = definition
+        self._lemma_names = lemma_names
+        self._examples = examples
+
+    def pos(self) -> str:
+        return self._pos
+
+    def definition(self) -> str:
+        return self._definition
+
+    def lemma_names(self) -> list[str]:
+        return self._lemma_names
+
+    def examples(self) -> list[str]:
+        return self._examples
+
+class Lexicon:
+    """
+    Read only snapshot of what Wordkit needs from WordNet and the Brown corpus, memory mapped from one file.
+
+    Opening it reads only the header, pages are loaded by the kernel when lookups touch them and are shared by every
+    process that maps the file, forked workers included. Lookups follow wordnet.synsets, morphology included.
+    """
+    def __init__(self, buffer, arrays: dict[str, np.ndarray], text_offset: int, meta: dict):
+        self._buffer = buffer
+        self._text_offset = text_offset
+        self.refs = arrays['refs']
+        self.synset_table = arrays['synsets']
+        self.index_keys = arrays['index_keys']
+        self.index_slots = arrays['index_slots'].reshape(-1, len(POS_LIST))
+        self.index_synsets = arrays['index_synsets']
+        self.exception_keys = arrays['exception_keys']
+        self.exception_slots = arrays['exception_slots'].reshape(-1, len(POS_LIST))
+        self.pos_counts = arrays['pos_counts']
+        self.meta = meta
+
+    @classmethod
+    def load(cls, path: str = LEXICON_PATH) -> 'Lexicon':
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not a lexicon snapshot of this version')
+        header_length, = struct.unpack_from('<Q', buffer, len(MAGIC))
+        header = json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + header_length])
+
+        arrays = {
+            name: np.frombuffer(buffer, dtype=np.lib.format.descr_to_dtype(spec['dtype']), count=spec['count'],
+                                offset=spec['offset'])
+            for name, spec in header['arrays'].items()
+        }
+        return cls(buffer, arrays, header['text_offset'], header['meta'])
+
+    def _bytes(self, ref: int) -> bytes:
+        offset, length = self.refs[ref].tolist()
+        start = self._text_offset + offset
+        return self._buffer[start:start + length]
+
+    def _text(self, ref: int) -> str:
+        return self._bytes(ref).decode('utf-8')
+
+    def _texts(self, start: int, count: int) -> list[str]:
+        return [self._text(ref) for ref in range(start, start + count)]
+
+    def _slot(self, keys: np.ndarray, slots: np.ndarray, key: str, pos: str) -> Optional[tuple[int, int]]:
+        """
+        Get the (start, count) of a key and part of speech in the lemma index or the exception lists.
+        """
+        encoded = key.encode('utf-8')
+        if len(encoded) > keys.dtype.itemsize:
+            return None
+
+        row = int(np.searchsorted(keys, encoded))
+        if row == len(keys) or keys[row] != encoded:
+            return None
+
+        start, count = slots[row, POS_LIST.index(pos)].tolist()
+        return None if count < 0 else (start, count)
+
+    def _morphy(self, form: str, pos: str) -> list[tuple[int, int]]:
+        # Same as WordNetCorpusReader._morphy: the exception list or the rules applied once, then the forms in the index.
+        # Returns the index slots of the forms.
+        exception = self._slot(self.exception_keys, self.exception_slots, form, pos)
+        if exception is not None:
+            forms = self._texts(*exception)
+        else:
+            forms = [form[:-len(old)] + new for old, new in MORPHOLOGICAL_SUBSTITUTIONS[pos] if form.endswith(old)]
+
+        slots = {}
+        for candidate in [form] + forms:
+            if candidate not in slots:
+                slot = self._slot(self.index_keys, self.index_slots, candidate, pos)
+                if slot is not None:
+                    slots[candidate] = slot
+        return list(slots.values())
+
+    def synset(self, synset_id: int) -> LexiconSynset:
+        row = self.synset_table[synset_id]
+        return LexiconSynset(
+            row['pos'].decode('ascii'),
+            self._text(int(row['definition'])),
+            self._texts(int(row['lemmas']), int(row['lemma_count'])),
+            self._texts(int(row['examples']), int(row['example_count'])),
+        )
+
+    def synsets(self, word: str) -> list[LexiconSynset]:
+        """
+        Get the synsets of a word in the order wordnet.synsets returns them.
+        """
+        word = word.lower()
+        synsets = []
+        for pos in POS_LIST:
+            for start, count in self._morphy(word, pos):
+                synsets.extend(self.synset(int(synset_id)) for synset_id in self.index_synsets[start:start + count])
+        return synsets
+
+    def most_common_pos(self, word: str) -> Optional[str]:
+        """
+        Same as PosTable.most_common_pos. Words of the table are sorted, so they are binary searched in place.
+        """
+        key = word.lower().encode('utf-8')
+        words = self.pos_counts['word']
+        if len(key) > words.dtype.itemsize:
+            return None
+        row = int(np.searchsorted(words, key))
+        if row == len(words) or words[row] != key:
+            return None
+
+        return most_common_tag(self.pos_counts['counts'][row], self.pos_counts['first_seen'][row])
+
+class _StringTable:
+    def __init__(self):
+        self.text = bytearray()
+        self.refs: list[tuple[int, int]] = []
+        self._offsets: dict[str, tuple[int, int]] = {}
+
+    def add(self, value: str) -> int:
+        # Equal strings share their bytes, every reference gets its own row so lists stay contiguous.
+        if value not in self._offsets:
+            encoded = value.encode('utf-8')
+            self._offsets[value] = (len(self.text), len(encoded))
+            self.text += encoded
+        self.refs.append(self._offsets[value])
+        return len(self.refs) - 1
+
+    def add_list(self, values: list[str]) -> tuple[int, int]:
+        start = len(self.refs)
+        for value in values:
+            self.add(value)
+        return start, len(values)
+
+def compile_lexicon(reader, pos_counts: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Compile the lemma index, exception lists and synsets of a WordNet reader and the Brown tag counts into arrays.
+    """
+    strings = _StringTable()
+    synset_ids: dict[tuple[str, int], int] = {}
+    synsets = []
+
+    def synset_id(pos: str, offset: int) -> int:
+        if (pos, offset) not in synset_ids:
+            synset = reader.synset_from_pos_and_offset(pos, offset)
+            definition = strings.add(synset.definition())
+            lemmas, lemma_count = strings.add_list(synset.lemma_names())
+            examples, example_count = strings.add_list(synset.examples())
+            synset_ids[(pos, offset)] = len(synsets)
+            synsets.append((synset.pos().encode('ascii'), definition, lemmas, lemma_count, examples, example_count))
+        return synset_ids[(pos, offset)]
+
+    def slots(entries: dict[str, dict[str, tuple[int, int]]]) -> tuple[np.ndarray, np.ndarray]:
+        keys = sorted(entries, key=lambda key: key.encode('utf-8'))
+        table = np.zeros((len(keys), len(POS_LIST)), dtype=SLOT_DTYPE)
+        table['count'] = -1
+        for row, key in enumerate(keys):
+            for pos, slot in entries[key].items():
+                table[row, POS_LIST.index(pos)] = slot
+        encoded = [key.encode('utf-8') for key in keys]
+        return np.array(encoded, dtype=f'S{max(map(len, encoded), default=1)}'), table.reshape(-1)
+
+    index, index_synsets = {}, []
+    lemma_map = reader._lemma_pos_offset_map
+    for key in sorted(lemma_map):
+        for pos in POS_LIST:
+            if pos in lemma_map[key]:
+                offsets = lemma_map[key][pos]
+                index.setdefault(key, {})[pos] = (len(index_synsets), len(offsets))
+                index_synsets.extend(synset_id(pos, offset) for offset in offsets)
+
+    exceptions = {}
+    for pos in POS_LIST:
+        for form, bases in sorted(reader._exception_map[pos].items()):
+            exceptions.setdefault(form, {})[pos] = strings.add_list(bases)
+
+    index_keys, index_slots = slots(index)
+    exception_keys, exception_slots = slots(exceptions)
+
+    return {
+        'text': np.frombuffer(bytes(strings.text), dtype=np.uint8),
+        'refs': np.array(strings.refs, dtype=REF_DTYPE),
+        'synsets': np.array(synsets, dtype=SYNSET_DTYPE),
+        'index_keys': index_keys,
+        'index_slots': index_slots,
+        'index_synsets': np.array(index_synsets, dtype='<u4'),
+        'exception_keys': exception_keys,
+        'exception_slots': exception_slots,
+        'pos_counts': np.sort(pos_counts, order='word'),
+    }
+
+def write_lexicon(path: str, arrays: dict[str, np.ndarray], meta: Optional[dict] = None):
+    """
+    Write arrays to one snapshot file: the magic, a JSON header with the offset of every array, then the arrays.
+    """
+    def header_bytes(offsets: dict[str, int]) -> bytes:
+        return json.dumps({
+            'meta': meta or {},
+            'text_offset': offsets.get('text', 0),
+            'arrays': {
+                name: {'dtype': np.lib.format.dtype_to_descr(array.dtype), 'count': len(array), 'offset': offsets.get(name, 0)}
+                for name, array in arrays.items() if name != 'text'
+            },
+        }).encode('utf-8')
+
+    def align(position: int) -> int:
+        return -(-position // ALIGNMENT) * ALIGNMENT
+
+    # The header holds the offsets, so it is sized with placeholder offsets that are padded to the final length.
+    offsets = {name: 0 for name in arrays}
+    header_length = len(header_bytes({name: 2 ** 40 for name in arrays}))
+    position = align(len(MAGIC) + 8 + header_length)
+    for name, array in arrays.items():
+        offsets[name] = position
+        position = align(position + array.nbytes)
+
+    header = header_bytes(offsets).ljust(header_length)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(MAGIC + struct.pack('<Q', header_length) + header)
+        for name, array in arrays.items():
+            file.seek(offsets[name])
+            file.write(np.ascontiguousarray(array).tobytes())
+        file.truncate(position)
+
+    # Workers that already mapped the previous snapshot keep reading it.
+    os.replace(tmp_path, path)
+
+def build_lexicon(path: str = LEXICON_PATH) -> int:
+    """
+    Build the snapshot from the bundled WordNet and Brown data and save it to disk.
+
+    Returns:
+        int: Number of synsets in the snapshot.
+    """
+    from nltk.corpus import wordnet
+    from word.pos_table import get_pos_table
+
+    # Load the lazy corpus, the index and exception lists are read from the loaded reader.
+    wordnet.synsets('word')
+    arrays = compile_lexicon(wordnet, np.asarray(get_pos_table().table))
+    write_lexicon(path, arrays, {'wordnet': wordnet.get_version()})
+    logger.info(f"Saved {len(arrays['synsets'])} synsets and {len(arrays['index_keys'])} lemmas to {path}")
+    return len(arrays['synsets'])
+
+_lexicon = None
+_lexicon_loaded = False
+_lexicon_lock = threading.Lock()
+
+def get_lexicon() -> Optional[Lexicon]:
+    """
+    Get the process wide snapshot, or None if it was not built. Wordkit falls back to the NLTK corpora without it.
+    """
+    global _lexicon, _lexicon_loaded
+
+    if not _lexicon_loaded:
+        with _lexicon_lock:
+            if not _lexicon_loaded:
+                if os.path.exists(LEXICON_PATH):
+                    try:
+                        _lexicon = Lexicon.load(LEXICON_PATH)
+                    except ValueError as e:
+                        logger.warning(f'{e}, reading the NLTK corpora. Rebuild it with python -m word.lexicon.')
+                else:
+                    logger.warning(f'Lexicon snapshot not found at {LEXICON_PATH}, reading the NLTK corpora.')
+                _lexicon_loaded = True
+
+    return _lexicon
+
+if __name__ == "__main__":
+    import nltk
+
+    parser = argparse.ArgumentParser(description="Build the WordNet and Brown snapshot read by Wordkit.")
+    parser.add_argument('--output', default=LEXICON_PATH, help="Path of the snapshot file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    nltk.data.path.append(os.getenv("NLTK_DATA", "./nltk_data"))
+
+    build_lexicon(args.output)
@@ -0,0 +1,152 @@
+import os
+import logging
+import argparse
+import threading
+from collections import Counter
+from typing import Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Universal tagset used by brown.tagged_words(tagset='universal'), one column per tag.
+UNIVERSAL_TAGS = ('ADJ', 'ADP', 'ADV', 'CONJ', 'DET', 'NOUN', 'NUM', 'PRT', 'PRON', 'VERB', '.', 'X')
+
+POS_TABLE_PATH = os.getenv('POS_TABLE_PATH', os.path.join(os.getenv('NLTK_DATA', './nltk_data'), 'pos_counts.npy'))
+
+def table_dtype(word_width: int) -> np.dtype:
+    # first_seen ranks the tags of a word by their first occurrence in the corpus, it breaks ties between counts.
+    return np.dtype([
+        ('word', f'S{word_width}'),
+        ('counts', np.uint32, (len(UNIVERSAL_TAGS),)),
+        ('first_seen', np.uint8, (len(UNIVERSAL_TAGS),)),
+    ])
+
+def most_common_tag(counts: np.ndarray, first_seen: np.ndarray) -> str:
+    """
+    Get the tag with the highest count in lowercase. Ties go to the tag seen first, like Counter.most_common over
+    the tags of the corpus does.
+    """
+    return UNIVERSAL_TAGS[int(np.argmax(counts.astype(np.int64) * len(UNIVERSAL_TAGS) - first_seen))].lower()
+
+class PosTable:
+    """
+    Word to tag count table of the Brown corpus. Rows are stored in a numpy structured array
+    which can be memory mapped from disk, words are resolved to rows with a dictionary.
+    """
+    def __init__(self, table: np.ndarray):
+        self.table = table
+        self.rows = {word.decode('utf-8'): row for row, word in enumerate(table['word'].tolist())}
+
+    @classmethod
+    def load(cls, path: str = POS_TABLE_PATH) -> 'PosTable':
+        return cls(np.load(path, mmap_mode='r'))
+
+    def tag_counts(self, word: str) -> dict[str, int]:
+        """
+        Get how many times the word is tagged with each part of speech.
+        """
+        row = self.rows.get(word.lower())
+        if row is None:
+            return {}
+
+        counts = self.table['counts'][row]
+        return {tag: int(count) for tag, count in zip(UNIVERSAL_TAGS, counts) if count}
+
+    def most_common_pos(self, word: str) -> Optional[str]:
+        """
+        Get the most common part of speech for a word, or None if the word is not in the corpus.
+        """
+        row = self.rows.get(word.lower())
+        if row is None:
+            return None
+
+        return most_common_tag(self.table['counts'][row], self.table['first_seen'][row])
+
+    def most_frequent(self, count: int) -> list[str]:
+        """
+        Get the count most frequent alphabetic words of the corpus, most frequent first.
+        """
+        totals = self.table['counts'].sum(axis=1, dtype=np.uint64)
+        words = []
+        for row in np.argsort(totals, kind='stable')[::-1]:
+            word = self.table['word'][row].decode('utf-8')
+            if word.isalpha():
+                words.append(word)
+                if len(words) == count:
+                    break
+        return words
+
+def count_tags() -> np.ndarray:
+    """
+    Count tags of every lowercased word in the Brown corpus. This walks the whole corpus and takes a few seconds.
+    """
+    from nltk.corpus import brown
+
+    tag_columns = {tag: column for column, tag in enumerate(UNIVERSAL_TAGS)}
+    pair_counts = Counter((word.lower(), tag) for word, tag in brown.tagged_words(tagset='universal'))
+    words = sorted({word for word, _ in pair_counts})
+    rows = {word: row for row, word in enumerate(words)}
+    encoded_words = [word.encode('utf-8') for word in words]
+
+    # Words are stored as utf-8 bytes, which takes a quarter of the space of numpy unicode strings.
+    table = np.zeros(len(words), dtype=table_dtype(max(len(word) for word in encoded_words)))
+    table['word'] = encoded_words
+
+    # Pairs are counted in the order they first occur, so the tags of a word come in first seen order.
+    seen = Counter()
+    for (word, tag), count in pair_counts.items():
+        table['counts'][rows[word], tag_columns[tag]] = count
+        table['first_seen'][rows[word], tag_columns[tag]] = seen[word]
+        seen[word] += 1
+
+    return table
+
+def build_pos_table(path: str = POS_TABLE_PATH) -> int:
+    """
+    Build the table from the bundled Brown corpus and save it to disk.
+
+    Returns:
+        int: Number of words in the table.
+    """
+    table = count_tags()
+    np.save(path, table)
+    logger.info(f'Saved {len(table)} words to {path}')
+    return len(table)
+
+_pos_table = None
+_pos_table_lock = threading.Lock()
+
+def get_pos_table() -> PosTable:
+    """
+    Get the process wide table. It is loaded from disk once, or counted from the corpus once if it was not built yet.
+    """
+    global _pos_table
+
+    if _pos_table is None:
+        with _pos_table_lock:
+            if _pos_table is None:
+                table = None
+                if not os.path.exists(POS_TABLE_PATH):
+                    logger.warning(f'POS table not found at {POS_TABLE_PATH}, counting tags from the Brown corpus.')
+                else:
+                    table = PosTable.load(POS_TABLE_PATH)
+                    if 'first_seen' not in table.table.dtype.names:
+                        # Tables built before ties were broken by first seen tag give other results, rebuild them.
+                        logger.warning(f'POS table at {POS_TABLE_PATH} is outdated, counting tags from the Brown corpus.')
+                        table = None
+
+                _pos_table = table or PosTable(count_tags())
+
+    return _pos_table
+
+if __name__ == "__main__":
+    import nltk
+
+    parser = argparse.ArgumentParser(description="Build the word to tag count table from the Brown corpus.")
+    parser.add_argument('--output', default=POS_TABLE_PATH, help="Path of the table file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    nltk.data.path.append(os.getenv("NLTK_DATA", "./nltk_data"))
+
+    build_pos_table(args.output)
@@ -1,5 +1,120 @@
+import os
+import threading
+from typing import Optional
+import numpy as np
 import spacy
 
+SPACY_MODEL = "en_core_web_sm"
+
+# Doc vectors of the small model come from the tok2vec tensor, the other components are not needed for similarity.
+SIMILARITY_EXCLUDE = ["tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"]
+
+VECTOR_CACHE_SIZE = int(os.getenv('SIMILARITY_CACHE_SIZE', 50000))
+
+class SimilarityEngine:
+    """
+    Scores word similarity as a cosine over cached unit length doc vectors.
+    Vectors are kept as rows of one numpy matrix, so a score is a single dot product.
+    """
+    def __init__(self, nlp, cache_size: int = VECTOR_CACHE_SIZE):
+        self.nlp = nlp
+        self.cache_size = cache_size
+        self.rows: dict[str, int] = {}
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def _embed(self, words: list[str]) -> np.ndarray:
+        vectors = np.array([doc.vector for doc in self.nlp.pipe(words)], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        # Zero vectors stay zero so they score 0.0 like Doc.similarity does.
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def _store(self, words: list[str], vectors: np.ndarray):
+        # Start over when the cache is full, the vocabulary users ask for is mostly small and stable.
+        if len(self.rows) + len(words) > self.cache_size:
+            self.rows = {}
+
+        start = len(self.rows)
+        end = start + len(words)
+
+        if self.vectors.shape[0] < end:
+            capacity = min(self.cache_size, max(end, 2 * self.vectors.shape[0]))
+            grown = np.zeros((capacity, vectors.shape[1]), dtype=np.float32)
+            if start:
+                grown[:start] = self.vectors[:start]
+            self.vectors = grown
+
+        self.vectors[start:end] = vectors
+        self.rows.update(zip(words, range(start, end)))
+
+    def vectorize(self, words: list[str]) -> np.ndarray:
+        """
+        Get unit length vectors of the words, one row per word.
+        Words that are not cached yet are run through the pipeline in one batch.
+
+        :param words: The words to vectorize
+        :return: Matrix of shape (len(words), vector size)
+        """
+        unique_words = list(dict.fromkeys(words))
+        if len(unique_words) > self.cache_size:
+            return self._embed(words)
+
+        with self._lock:
+            missing = [word for word in unique_words if word not in self.rows]
+            if len(self.rows) + len(missing) > self.cache_size:
+                # Cached rows are dropped when the cache is full, so embed every word again.
+                missing = unique_words
+
+            if missing:
+                self._store(missing, self._embed(missing))
+
+            return self.vectors[[self.rows[word] for word in words]]
+
+    def similarity(self, word1: str, word2: str) -> float:
+        vectors = self.vectorize([word1, word2])
+        return float(vectors[0] @ vectors[1])
+
+    def similarities(self, anchor: str, candidates: list[str]) -> np.ndarray:
+        """
+        Score one anchor word against many candidates with a single matrix product.
+
+        :param anchor: The word to compare against
+        :param candidates: The words to score
+        :return: Scores in the order of candidates
+        """
+        vectors = self.vectorize([anchor, *candidates])
+        return vectors[1:] @ vectors[0]
+
+    def rank(self, anchor: str, candidates: list[str], top_k: Optional[int] = None) -> list[tuple[str, float]]:
+        """
+        Get (candidate, score) pairs. With top_k only the k best candidates are returned, sorted by score.
+        """
+        scores = self.similarities(anchor, candidates)
+        if top_k is None:
+            return [(candidate, float(score)) for candidate, score in zip(candidates, scores)]
+
+        top_k = min(top_k, len(candidates))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(candidates[index], float(scores[index])) for index in best]
+
+_similarity_engine = None
+_similarity_engine_lock = threading.Lock()
+
+def get_similarity_engine() -> SimilarityEngine:
+    """
+    Get the process wide similarity engine. The spaCy model is loaded once, on first use or at startup.
+    """
+    global _similarity_engine
+
+    if _similarity_engine is None:
+        with _similarity_engine_lock:
+            if _similarity_engine is None:
+                _similarity_engine = SimilarityEngine(spacy.load(SPACY_MODEL, exclude=SIMILARITY_EXCLUDE))
+
+    return _similarity_engine
+
 def calculate_similarity_score(word1 : str, word2 : str) -> float:
     """
         Calculate the similarity between two words.
@@ -8,11 +123,4 @@ def calculate_similarity_score(word1 : str, word2 : str) -> float:
         :return: The similarity between the two words
     """
 
-    nlp = spacy.load("en_core_web_sm")
-
-    word1 = nlp(word1)
-    word2 = nlp(word2)
-
-    similarity_score = word1.similarity(word2)
-
-    return similarity_score
\ No newline at end of file
+    return get_similarity_engine().similarity(word1, word2)
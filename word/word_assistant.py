@@ -1,53 +1,151 @@
-from app.utils.request_helpers import get_chat_completion
+from app.utils.request_helpers import get_chat_completion, stream_chat_completion
 from app.utils.text_helpers import *
+from app.lib.cache import RedisCache
+from app.lib.single_flight import SingleFlight, single_flight_from_env
+from app.lib.admission import AdmissionController, admission_from_env
+from app.lib.provider_router import ProviderRouter
+from app.lib.metrics import register_metrics
+from app.models.aiResponse import AIFeedbackResponse, CompareResponse
+from app.responses.validate import validate_json_response
+from openai import AsyncOpenAI
+from typing import AsyncIterator, Awaitable, Callable, Optional
 import asyncio
+import hashlib
+import os
+
+ANALYZE_WORD_PROMPT = "Analyze '{word}' and give an example of its usage. Return a json like this: {{\"check\": \"'prevent' is a correct and usable word in written English.\",\"analysis\" : \"It can be used to describe a situation in which something bad is avoided from happening. For example: 'Taking precautions helped us prevent the spread of the virus.'\"}}"
+
+FIX_GRAMMAR_PROMPT = "Identify and fix any grammar errors for '{sentence}'. If the sentence is already correct, say nothing to fix. Provide the corrected version in plain text without additional explanations. Return only corrected sentence."
+
+PARAPHRASE_PROMPT = "Paraphrase '{sentence}' in a {context} way. Return five different examples in plain text without additional explanations. Lastly number the examples."
+
+ANALYZE_SENTENCE_PROMPT = "Analyze the grammar structure of '{sentence}' and explain how '{word}' is used in it. Return the analysis in plain text without additional formatting."
+
+COMPARE_WORDS_PROMPT = "Compare '{word_1}' and '{word_2}'. Explain their similarities and differences. Format the response as valid JSON with the following structure: {{ \"similarities\": \"...\", \"differences\": \"...\", \"examples_word1\": [\"...\"], \"examples_word2\": [\"...\"] }}."
+
+def prompt_version(prompt: str) -> str:
+    """
+    Version of a prompt template, part of cache keys so cached answers are dropped when the prompt changes.
+    """
+    return hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:12]
+
+# Answers for the same word or pair are interchangeable, so they are cached and served without a paid LLM call.
+ai_cache = RedisCache(
+    'ai_cache',
+    ttl=int(os.getenv('AI_CACHE_TTL', 7 * 86400)),
+    max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', 50000)),
+)
+
+# Concurrent identical AI calls share one upstream call, across workers too if SINGLE_FLIGHT_REDIS is set.
+ai_flights = single_flight_from_env('ai_flight')
+
+# Upstream calls of a worker are bounded, waiting requests are served by tier and shed with 503 when the queue is full.
+ai_admission = admission_from_env()
+
+register_metrics('ai_cache')(ai_cache.stats)
+register_metrics('ai_single_flight')(ai_flights.stats)
+register_metrics('ai_admission')(ai_admission.stats)
+
+# Whether cache hits are free for users. When false, every call counts against the quota as before.
+AI_CACHE_SKIP_QUOTA = os.getenv('AI_CACHE_SKIP_QUOTA', 'false').lower() == 'true'
+
+def normalize_word(word: str) -> str:
+    return word.strip().lower()
+
+def swap_examples(comparison: dict) -> dict:
+    """
+    Swap the examples of a comparison so they match the reversed word order.
+    """
+    return {**comparison, 'examples_word1': comparison['examples_word2'], 'examples_word2': comparison['examples_word1']}
 
 class WordAssistant:
-    def __init__(self, api_key: str):
-        self.api_key = api_key
+    def __init__(self, client: AsyncOpenAI, cache: RedisCache = ai_cache, flights: SingleFlight = ai_flights,
+                 admission: AdmissionController = ai_admission, router: Optional[ProviderRouter] = None):
+        self.client = client
+        self.cache = cache
+        self.flights = flights
+        self.admission = admission
+        self.router = router
+
+    async def _charge(self, charge: Optional[Callable[[], Awaitable]], cached: Optional[dict]):
+        # Quota is always tracked before an upstream call, cache hits are free only if the policy allows it.
+        if charge and (cached is None or not AI_CACHE_SKIP_QUOTA):
+            await charge()
+
+    async def _complete(self, tier: Optional[str], content: dict, temperature: float = 1.3, response_format: str = 'text') -> str:
+        # Every upstream call takes a slot, requests are queued or shed when the provider is saturated.
+        async with self.admission.slot(tier):
+            if self.router:
+                return await self.router.complete(content, temperature, response_format)
+            return await get_chat_completion(self.client, content, temperature, response_format)
+
+    async def _stream(self, tier: Optional[str], content: dict) -> AsyncIterator[str]:
+        # The slot is held until the stream ends or the client goes away.
+        async with self.admission.slot(tier):
+            async for text in stream_chat_completion(self.client, content):
+                yield text
     
-    async def analyze_word(self, word: str) -> str:
+    async def analyze_word(self, word: str, charge: Optional[Callable[[], Awaitable]] = None, tier: Optional[str] = None) -> dict:
         """
         Analyze a word and provide an example of its usage in a sentence. 
         Additionally checks if word itself is correct or not in writing English.
 
         Args:
             word (str): The word to analyze.
-            api_key (str): The API key for the Hugging Face model.
+            charge (Callable, optional): Quota check to run before the answer is served.
+            tier (str, optional): User tier, sets the priority of the upstream call when the provider is busy.
         Returns:
-            str: The analysis of the word with an example sentence.
+            dict: The analysis of the word with an example sentence.
         """
+        key = self.cache.make_key('analyze_word', prompt_version(ANALYZE_WORD_PROMPT), normalize_word(word))
+        cached = await self.cache.get(key)
+        await self._charge(charge, cached)
+
+        if cached is not None:
+            return cached
+
         content = {
                 "role": "user",
-                "content": f"Analyze '{word}' and give an example of its usage. Return a json like this: {{\"check\": \"'prevent' is a correct and usable word in written English.\",\"analysis\" : \"It can be used to describe a situation in which something bad is avoided from happening. For example: 'Taking precautions helped us prevent the spread of the virus.'\"}}"
+                "content": ANALYZE_WORD_PROMPT.format(word=word)
             }
 
-        response_text = await asyncio.to_thread(get_chat_completion, self.api_key, content, 1.3, 'json_object')
-        return response_text
+        async def fetch():
+            response_text = await self._complete(tier, content, 1.3, 'json_object')
+            if not response_text:
+                return response_text
+
+            analysis = validate_json_response(AIFeedbackResponse, response_text).model_dump()
+            await self.cache.set(key, analysis)
+            return analysis
+
+        # Identical concurrent requests share one upstream call.
+        return await self.flights.run(key, fetch)
     
-    async def fix_grammar_errors(self, sentence : str) -> tuple[str, str]:
+    async def fix_grammar_errors(self, sentence : str, tier: Optional[str] = None) -> tuple[str, str]:
         """
         Identify and fix any grammar errors in a sentence. If the sentence is already correct, return the original sentence.
 
         Args:
             sentence (str): The sentence to correct.
             api_key (str): The API key for the Hugging Face model.
+            tier (str, optional): User tier, sets the priority of the upstream call when the provider is busy.
         Returns:
             str: The corrected sentence.
         """
         
         content = {
                 "role": "user",
-                "content": f"Identify and fix any grammar errors for '{sentence}'. If the sentence is already correct, say nothing to fix. Provide the corrected version in plain text without additional explanations. Return only corrected sentence."
+                "content": FIX_GRAMMAR_PROMPT.format(sentence=sentence)
         }
 
-        response_text = await asyncio.to_thread(get_chat_completion, self.api_key, content)
+        flight_key = self.cache.make_key('fix_grammar_errors', sentence)
+        response_text = await self.flights.run(flight_key, lambda: self._complete(tier, content))
 
         # Extract the corrected texts from the response
         original_text, corrected_text = await asyncio.to_thread(highlight_corrections, sentence, response_text)
 
         return original_text, corrected_text, response_text # TIP: Return response_text as plain text so we do not have to extract span contents from our frontend.
-    async def paraphrase(self, sentence : str, context: str = 'casual') -> list:
+    async def paraphrase(self, sentence : str, context: str = 'casual', tier: Optional[str] = None) -> list:
         """
         Paraphrase a sentence in a specific context and provide five different examples.
 
@@ -55,35 +153,132 @@ class WordAssistant:
             sentence (str): The sentence to paraphrase.
             api_key (str): The API key for the Hugging Face model.
             context (str): The context in which to paraphrase the sentence (e.g., casual, formal, academic).
+            tier (str, optional): User tier, sets the priority of the upstream call when the provider is busy.
         Returns:
             list: The paraphrased sentence list with five different examples.
         """
         content = {
                 "role": "user",
-                "content": f"Paraphrase '{sentence}' in a {context} way. Return five different examples in plain text without additional explanations. Lastly number the examples."
+                "content": PARAPHRASE_PROMPT.format(sentence=sentence, context=context)
             }
 
-        response_text = await asyncio.to_thread(get_chat_completion, self.api_key, content)
+        flight_key = self.cache.make_key('paraphrase', sentence, context)
+        response_text = await self.flights.run(flight_key, lambda: self._complete(tier, content))
 
         # Ensure the final answer is clean and does not contain any tags
         final_answer = await asyncio.to_thread(extract_paraphrase_sentences, response_text)
         return final_answer
+
+    async def analyze_sentence_with_word(self, sentence : str, word : str, tier: Optional[str] = None) -> str:
+        """
+        Analyze the grammar structure of a sentence and how a word is used in it.
+
+        Args:
+            sentence (str): The sentence to analyze.
+            word (str): The word to explain in the sentence.
+            tier (str, optional): User tier, sets the priority of the upstream call when the provider is busy.
+        Returns:
+            str: The analysis in plain text.
+        """
+        content = {
+                "role": "user",
+                "content": ANALYZE_SENTENCE_PROMPT.format(sentence=sentence, word=word)
+            }
+
+        flight_key = self.cache.make_key('analyze_sentence_with_word', sentence, word)
+        return await self.flights.run(flight_key, lambda: self._complete(tier, content))
+
+    async def stream_sentence_analysis(self, sentence : str, word : str, tier: Optional[str] = None) -> AsyncIterator[tuple[str, dict]]:
+        """
+        Streaming variant of analyze_sentence_with_word. Yields ('token', {'text': ...}) events as the analysis arrives.
+        """
+        content = {
+                "role": "user",
+                "content": ANALYZE_SENTENCE_PROMPT.format(sentence=sentence, word=word)
+            }
+
+        async for text in self._stream(tier, content):
+            yield 'token', {'text': text}
+
+    async def stream_grammar_fix(self, sentence : str, tier: Optional[str] = None) -> AsyncIterator[tuple[str, dict]]:
+        """
+        Streaming variant of fix_grammar_errors. Yields ('token', {'text': ...}) events as the corrected sentence arrives,
+        then a ('result', {...}) event with the highlighted sentences.
+        """
+        content = {
+                "role": "user",
+                "content": FIX_GRAMMAR_PROMPT.format(sentence=sentence)
+        }
+
+        parts = []
+        async for text in self._stream(tier, content):
+            parts.append(text)
+            yield 'token', {'text': text}
+
+        response_text = ''.join(parts)
+        original_text, corrected_text = await asyncio.to_thread(highlight_corrections, sentence, response_text)
+        yield 'result', {"original_sentence": original_text, "corrected_sentence": corrected_text, "raw_sentence": response_text}
+
+    async def stream_paraphrase(self, sentence : str, context: str = 'casual', tier: Optional[str] = None) -> AsyncIterator[tuple[str, dict]]:
+        """
+        Streaming variant of paraphrase. Yields ('sentence', {'index': ..., 'sentence': ...}) events,
+        each one as soon as the numbered example is complete.
+        """
+        content = {
+                "role": "user",
+                "content": PARAPHRASE_PROMPT.format(sentence=sentence, context=context)
+            }
+
+        parser = ParaphraseStreamParser()
+        index = 0
+        async for text in self._stream(tier, content):
+            for paraphrased in parser.feed(text):
+                index += 1
+                yield 'sentence', {'index': index, 'sentence': paraphrased}
+
+        for paraphrased in parser.close():
+            index += 1
+            yield 'sentence', {'index': index, 'sentence': paraphrased}
     
-    async def compare_words(self, word_1 : str, word_2 : str) -> str:
+    async def compare_words(self, word_1 : str, word_2 : str, charge: Optional[Callable[[], Awaitable]] = None, tier: Optional[str] = None) -> dict:
         """
         Compare two words and provide examples of how each word is used in a sentence.
         Args:
             word_1 (str): The first word to compare.
             word_2 (str): The second word to compare.
-            api_key (str): The API key for the Hugging Face model.
+            charge (Callable, optional): Quota check to run before the answer is served.
+            tier (str, optional): User tier, sets the priority of the upstream call when the provider is busy.
         Returns:
-            str: The comparison of the two words with examples
+            dict: The comparison of the two words with examples
         """
 
+        # Pairs are cached in alphabetical order, examples are swapped when the words come in reverse.
+        first, second = normalize_word(word_1), normalize_word(word_2)
+        reversed_order = first > second
+
+        key = self.cache.make_key('compare_words', prompt_version(COMPARE_WORDS_PROMPT), *sorted((first, second)))
+        cached = await self.cache.get(key)
+        await self._charge(charge, cached)
+
+        if cached is not None:
+            return swap_examples(cached) if reversed_order else cached
+
         content = {
                 "role": "user",
-                "content": f"Compare '{word_1}' and '{word_2}'. Explain their similarities and differences. Format the response as valid JSON with the following structure: {{ \"similarities\": \"...\", \"differences\": \"...\", \"examples_word1\": [\"...\"], \"examples_word2\": [\"...\"] }}."
+                "content": COMPARE_WORDS_PROMPT.format(word_1=word_1, word_2=word_2)
             }
 
-        response_text = await asyncio.to_thread(get_chat_completion, self.api_key, content, 1.3, 'json_object')
-        return response_text
\ No newline at end of file
+        async def fetch():
+            response_text = await self._complete(tier, content, 1.3, 'json_object')
+            if not response_text:
+                return response_text
+
+            # Shared result is in alphabetical order, like the cached one.
+            comparison = validate_json_response(CompareResponse, response_text).model_dump()
+            comparison = swap_examples(comparison) if reversed_order else comparison
+            await self.cache.set(key, comparison)
+            return comparison
+
+        # Identical concurrent requests share one upstream call, whatever order the words come in.
+        comparison = await self.flights.run(key, fetch)
+        return swap_examples(comparison) if comparison and reversed_order else comparison
\ No newline at end of file
@@ -0,0 +1,146 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from typing import Callable, Iterable, Optional
+from app.lib.tier_cache import LocalTTLCache
+
+logger = logging.getLogger(__name__)
+
+WORD_INFO_STORE_PATH = os.getenv('WORD_INFO_STORE_PATH', os.path.join(os.getenv('NLTK_DATA', './nltk_data'), 'word_info.sqlite3'))
+
+# SQLite limits the number of parameters of a statement.
+MAX_PARAMETERS = 500
+
+class WordInfoStore:
+    """
+    Word info results on disk, shared by the workers of a host. WordNet does not change between deploys,
+    so entries never expire, delete the file when the NLTK data is updated.
+
+    The database runs in WAL mode so readers don't wait for writers, every thread uses its own connection.
+    """
+    def __init__(self, path: str = WORD_INFO_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS word_info (word TEXT PRIMARY KEY, info TEXT NOT NULL)')
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        """
+        Close the connection of this thread, e.g. before forking workers that must not share it.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def get_many(self, words: list[str]) -> dict[str, dict]:
+        found = {}
+        connection = self._connection()
+        for start in range(0, len(words), MAX_PARAMETERS):
+            chunk = words[start:start + MAX_PARAMETERS]
+            rows = connection.execute(
+                f"SELECT word, info FROM word_info WHERE word IN ({','.join('?' * len(chunk))})", chunk
+            )
+            found.update((word, json.loads(info)) for word, info in rows)
+        return found
+
+    def put_many(self, items: dict[str, dict]):
+        if not items:
+            return
+
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                'INSERT OR IGNORE INTO word_info (word, info) VALUES (?, ?)',
+                [(word, json.dumps(info)) for word, info in items.items()]
+            )
+
+    def __len__(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM word_info').fetchone()[0]
+
+class WordInfoMemo:
+    """
+    Memoized word info lookups by lowercased word: an in-process LRU in front of the on-disk store in front of compute.
+    A store that cannot be used, like on a read only disk, is skipped and lookups fall back to compute.
+    """
+    def __init__(self, compute: Callable[[str], dict], max_entries: int = 50000, store: Optional[WordInfoStore] = None):
+        self.compute = compute
+        self.local = LocalTTLCache(max_entries, float('inf'))
+        self.store = store
+        self.metrics = {'local_hits': 0, 'store_hits': 0, 'misses': 0, 'store_errors': 0}
+
+    def _read_store(self, words: list[str]) -> dict[str, dict]:
+        if self.store is None or not words:
+            return {}
+        try:
+            return self.store.get_many(words)
+        except sqlite3.Error as db_err:
+            self.metrics['store_errors'] += 1
+            logger.error(f'Error while reading word info store {db_err}')
+            return {}
+
+    def _write_store(self, items: dict[str, dict]):
+        if self.store is None or not items:
+            return
+        try:
+            self.store.put_many(items)
+        except sqlite3.Error as db_err:
+            self.metrics['store_errors'] += 1
+            logger.error(f'Error while writing word info store {db_err}')
+
+    def get_many(self, words: Iterable[str]) -> list[tuple[str, dict]]:
+        """
+        Get the info of many words, reading the store and writing new results in one statement each.
+
+        Returns:
+            list[tuple[str, dict]]: Each distinct lowercased word with its info, in input order.
+        """
+        keys = list(dict.fromkeys(word.strip().lower() for word in words))
+        found = {}
+
+        for key in keys:
+            info = self.local.get(key)
+            if info is not None:
+                self.metrics['local_hits'] += 1
+                found[key] = info
+
+        stored = self._read_store([key for key in keys if key not in found])
+        self.metrics['store_hits'] += len(stored)
+
+        computed = {key: self.compute(key) for key in keys if key not in found and key not in stored}
+        self.metrics['misses'] += len(computed)
+        self._write_store(computed)
+
+        for key, info in {**stored, **computed}.items():
+            self.local.set(key, info)
+            found[key] = info
+
+        return [(key, found[key]) for key in keys]
+
+    def get(self, word: str) -> dict:
+        return self.get_many([word])[0][1]
+
+    def warm(self, words: Iterable[str]) -> int:
+        """
+        Load words into the LRU, computing and storing the ones no worker has looked up yet.
+        """
+        return len(self.get_many(words))
+
+    def stats(self) -> dict:
+        lookups = self.metrics['local_hits'] + self.metrics['store_hits'] + self.metrics['misses']
+        hits = self.metrics['local_hits'] + self.metrics['store_hits']
+        return {
+            **self.metrics,
+            'local_entries': len(self.local),
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+        }
@@ -1,6 +1,14 @@
+import os
+import nltk
+import threading
+from typing import Optional
 from nltk.corpus import wordnet
-from nltk.corpus import brown
-from collections import Counter
+import logging
+from word.pos_table import PosTable, get_pos_table
+from word.lexicon import get_lexicon
+from word.word_info_store import WordInfoMemo, WordInfoStore, WORD_INFO_STORE_PATH
+
+logger = logging.getLogger(__name__)
 
 class Wordkit:
     def __init__(self, word):
@@ -16,7 +24,9 @@ class Wordkit:
         dict : A dictionary containing the word's information
         """
         # Retrieve synsets for the word (could be adjective, adverb, verb, noun, etc.)
-        synsets = wordnet.synsets(self.word)
+        # from the snapshot when it was built, it is memory mapped and needs no corpus loading.
+        lexicon = get_lexicon()
+        synsets = lexicon.synsets(self.word) if lexicon else wordnet.synsets(self.word)
         
         # Prepare a dictionary to hold information
         info = {
@@ -32,7 +42,7 @@ class Wordkit:
             pos = synset.pos()
             word_info = {
                 "definition": synset.definition(),
-                "synonyms": [lemma.name().replace('_' , ' ') for lemma in synset.lemmas()],
+                "synonyms": [name.replace('_' , ' ') for name in synset.lemma_names()],
                 "examples": synset.examples() if synset.examples() else [],
             }
             
@@ -56,21 +66,79 @@ class Wordkit:
         @returns: 
             str: The most common part of speech for the word.
         """
-        # Normalize the word to lowercase
-        word = self.word.lower()
-        
-        # Get tagged words from the Brown corpus using the universal tagset
-        tagged_words = brown.tagged_words(tagset='universal')
-        
-        # Filter tags for the specified word
-        word_tags = [tag for w, tag in tagged_words if w.lower() == word]
-        
-        # If the word is not found in the corpus
-        if not word_tags:
-            return None
-        
-        # Count the frequency of each tag
-        tag_counts = Counter(word_tags)
-        
-        # Return the most common tag
-        return tag_counts.most_common(1)[0][0].lower()
\ No newline at end of file
+        # Counts are precomputed from the Brown corpus, see word/pos_table.py and word/lexicon.py
+        lexicon = get_lexicon()
+        return lexicon.most_common_pos(self.word) if lexicon else get_pos_table().most_common_pos(self.word)
+
+def load_wordkit():
+    """
+    Load the lexicon snapshot, or WordNet and the POS table without it, so the first lookups of a pool worker
+    don't pay for it.
+    """
+    if get_lexicon():
+        return
+
+    # Spawned workers don't inherit the data path of the app
+    if os.getenv("NLTK_DATA", "./nltk_data") not in nltk.data.path:
+        nltk.data.path.append(os.getenv("NLTK_DATA", "./nltk_data"))
+    wordnet.synsets('word')
+    get_pos_table()
+
+def compute_word_info(word: str) -> dict:
+    return Wordkit(word).get_word_info_extended()
+
+# WordNet results never change between deploys, they are memoized per process and stored on disk for all workers.
+word_info_memo = WordInfoMemo(
+    compute_word_info,
+    max_entries=int(os.getenv('WORD_INFO_MEMO_MAX_ENTRIES', 50000)),
+    store=WordInfoStore(WORD_INFO_STORE_PATH) if os.getenv('WORD_INFO_STORE', 'true').lower() == 'true' else None,
+)
+
+def get_word_info(word: str) -> dict:
+    """
+    Get the result of Wordkit.get_word_info_extended for a word, memoized by lowercased word.
+    """
+    return word_info_memo.get(word)
+
+def get_word_infos(words: list[str]) -> list[tuple[str, dict]]:
+    """
+    Get the information of many words, in a worker of the word info pool.
+
+    @params:
+        words (list[str]): The words to look up in WordNet.
+    @returns:
+        list[tuple[str, dict]]: Each distinct lowercased word with the result of Wordkit.get_word_info_extended.
+    """
+    return word_info_memo.get_many(words)
+
+_word_info_warmed = False
+
+def warm_word_info(count: int, stop: Optional[threading.Event] = None, chunk_size: int = 100) -> int:
+    """
+    Load the info of the count most frequent words of the Brown corpus, so their first lookups are served from memory.
+    Words are loaded in chunks and the warmup ends early once stop is set, e.g. on shutdown. A warmup runs once per
+    process, workers forked from a process that warmed up inherit its entries and skip it.
+
+    @returns:
+        int: The number of words loaded.
+    """
+    global _word_info_warmed
+
+    if _word_info_warmed:
+        return 0
+
+    loaded = 0
+    try:
+        lexicon = get_lexicon()
+        table = PosTable(lexicon.pos_counts) if lexicon else get_pos_table()
+        words = table.most_frequent(count)
+        for start in range(0, len(words), chunk_size):
+            if stop is not None and stop.is_set():
+                return loaded
+            loaded += word_info_memo.warm(words[start:start + chunk_size])
+    except LookupError as e:
+        logger.error(f'Word info warmup skipped, NLTK data not found {e}')
+        return loaded
+
+    _word_info_warmed = True
+    return loaded